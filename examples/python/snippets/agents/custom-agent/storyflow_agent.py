@@ -12,11 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
+import os
+import re
 from typing import AsyncGenerator
 from typing_extensions import override
 
-from google.adk.agents import LlmAgent, BaseAgent, LoopAgent, SequentialAgent
+from google.adk.agents import LlmAgent, BaseAgent, LoopAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.genai import types
 from google.adk.sessions import InMemorySessionService
@@ -35,6 +38,149 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# --8<-- [start:event_logging]
+# --- Event Logging ---
+class LoggedEvent:
+    """
+    An event as a log record argument: it is serialized only when a handler
+    writes the record, as the full JSON or as a one-line summary.
+    """
+
+    __slots__ = ("event", "summary")
+
+    def __init__(self, event: Event, summary: bool):
+        self.event = event
+        self.summary = summary
+
+    def __str__(self):
+        if not self.summary:
+            return self.event.model_dump_json(indent=2, exclude_none=True)
+        parts = self.event.content.parts if self.event.content else None
+        part_types = [
+            "+".join(name for name, value in part if value is not None)
+            for part in parts or []
+        ]
+        return f"author={self.event.author} id={self.event.id} parts={part_types}"
+
+
+class EventLogger:
+    """
+    Logs the events a custom agent yields. The level is checked before
+    anything else, so with the level disabled an event costs a method call.
+    With `sample_every` n, only every n-th event is logged; with `summary`,
+    only its author, ID and part types.
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.INFO,
+                 sample_every: int = 1, summary: bool = False):
+        self.logger = logger
+        self.level = level
+        self.sample_every = sample_every
+        self.summary = summary
+        self.seen = 0
+
+    def log(self, agent_name: str, source: str, event: Event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.seen += 1
+        if self.sample_every > 1 and self.seen % self.sample_every:
+            return
+        self.logger.log(
+            self.level, "[%s] Event from %s: %s",
+            agent_name, source, LoggedEvent(event, self.summary),
+        )
+
+
+# EVENT_LOG_MODE=summary logs one line per event, EVENT_LOG_SAMPLE_EVERY=n
+# every n-th event
+event_log = EventLogger(
+    logger,
+    sample_every=int(os.getenv("EVENT_LOG_SAMPLE_EVERY", "1")),
+    summary=os.getenv("EVENT_LOG_MODE", "full") == "summary",
+)
+# --8<-- [end:event_logging]
+
+
+# --8<-- [start:scheduling]
+# --- Dependency-Aware Scheduling ---
+# A `{key}` or `{{key}}` placeholder in an instruction reads that state key
+STATE_PLACEHOLDER = re.compile(r"{+([^{}]*)}+")
+# What an LlmAgent's model sees besides state: the whole conversation, or
+# with include_contents "none" the current turn, from the latest user
+# message or reply of another agent. Either way that includes the reply of
+# the agent just before it.
+HISTORY = "<history>"
+TURN = "<turn>"
+CALLBACKS = (
+    "before_agent_callback", "after_agent_callback",
+    "before_model_callback", "after_model_callback",
+    "before_tool_callback", "after_tool_callback",
+)
+
+
+def state_dependencies(agent: BaseAgent):
+    """
+    Returns the state keys an agent reads and writes, or None if they
+    can't be known from its definition: only an LlmAgent with a text
+    instruction, no tools, callbacks or sub-agents reads nothing but its
+    placeholders and HISTORY or TURN, and writes nothing but its
+    `output_key`.
+    """
+    if not isinstance(agent, LlmAgent) or not isinstance(agent.instruction, str):
+        return None
+    if agent.tools or agent.sub_agents or any(getattr(agent, name) for name in CALLBACKS):
+        return None
+    reads = set()
+    for placeholder in STATE_PLACEHOLDER.findall(agent.instruction):
+        key = placeholder.strip().removesuffix("?")
+        if key.isidentifier():
+            reads.add(key)
+    reads.add(TURN if agent.include_contents == "none" else HISTORY)
+    writes = {agent.output_key} if agent.output_key else set()
+    return reads, writes
+
+
+def schedule_stages(
+    agents: list[BaseAgent], same_inputs: bool = True
+) -> list[list[BaseAgent]]:
+    """
+    Splits agents that would run in order into stages whose agents can run
+    at the same time: they don't read or write state another one of them
+    writes. In order, an LlmAgent's model also sees the reply of the agent
+    just before it, which doesn't exist yet when both run at once, so each
+    LlmAgent starts a stage and the models get the same inputs as in order.
+    With `same_inputs=False`, LlmAgents with include_contents "none" may
+    share a stage; each of them then sees the reply from before the stage
+    instead, so their answers can differ from a run in order.
+    """
+    stages = []
+    stage_reads, stage_writes = set(), set()
+    for agent in agents:
+        dependencies = state_dependencies(agent)
+        if dependencies is None:
+            stages.append([agent])
+            # Nothing may join an agent of unknown dependencies
+            stage_reads, stage_writes = None, None
+            continue
+        reads, writes = dependencies
+        if (
+            stages
+            and stage_writes is not None
+            and HISTORY not in reads
+            and not (same_inputs and TURN in reads)
+            and not reads & stage_writes
+            and not writes & (stage_reads | stage_writes)
+        ):
+            stages[-1].append(agent)
+            stage_reads |= reads
+            stage_writes |= writes
+        else:
+            stages.append([agent])
+            stage_reads, stage_writes = set(reads), set(writes)
+    return stages
+# --8<-- [end:scheduling]
+
+
 # --- Custom Orchestrator Agent ---
 # --8<-- [start:init]
 class StoryFlowAgent(BaseAgent):
@@ -43,7 +189,9 @@ class StoryFlowAgent(BaseAgent):
 
     This agent orchestrates a sequence of LLM agents to generate a story,
     critique it, revise it, check grammar and tone, and potentially
-    regenerate the story if the tone is negative.
+    regenerate the story if the tone is negative. The grammar and tone
+    checks don't read each other's results, so they can run at the same
+    time.
     """
 
     # --- Field Declarations for Pydantic ---
@@ -55,7 +203,8 @@ class StoryFlowAgent(BaseAgent):
     tone_check: LlmAgent
 
     loop_agent: LoopAgent
-    sequential_agent: SequentialAgent
+    # Post-processing agents, in stages of agents that run at the same time
+    post_processing: list[list[BaseAgent]]
 
     # model_config allows setting Pydantic configurations if needed, e.g., arbitrary_types_allowed
     model_config = {"arbitrary_types_allowed": True}
@@ -68,6 +217,7 @@ class StoryFlowAgent(BaseAgent):
         reviser: LlmAgent,
         grammar_check: LlmAgent,
         tone_check: LlmAgent,
+        parallel_post_processing: bool = False,
     ):
         """
         Initializes the StoryFlowAgent.
@@ -79,20 +229,26 @@ class StoryFlowAgent(BaseAgent):
             reviser: An LlmAgent to revise the story based on criticism.
             grammar_check: An LlmAgent to check the grammar.
             tone_check: An LlmAgent to analyze the tone.
+            parallel_post_processing: Run the post-processing agents that
+                don't read each other's state at the same time. The tone
+                check then sees the Reviser's reply instead of the grammar
+                check's, so its answer can differ from a run in order.
         """
         # Create internal agents *before* calling super().__init__
         loop_agent = LoopAgent(
             name="CriticReviserLoop", sub_agents=[critic, reviser], max_iterations=2
         )
-        sequential_agent = SequentialAgent(
-            name="PostProcessing", sub_agents=[grammar_check, tone_check]
-        )
+        post_processing_agents = [grammar_check, tone_check]
+        if parallel_post_processing:
+            post_processing = schedule_stages(post_processing_agents, same_inputs=False)
+        else:
+            post_processing = [[agent] for agent in post_processing_agents]
 
         # Define the sub_agents list for the framework
         sub_agents_list = [
             story_generator,
             loop_agent,
-            sequential_agent,
+            *post_processing_agents,
         ]
 
         # Pydantic will validate and assign them based on the class annotations.
@@ -104,7 +260,7 @@ class StoryFlowAgent(BaseAgent):
             grammar_check=grammar_check,
             tone_check=tone_check,
             loop_agent=loop_agent,
-            sequential_agent=sequential_agent,
+            post_processing=post_processing,
             sub_agents=sub_agents_list, # Pass the sub_agents list directly
         )
 # --8<-- [end:init]
@@ -123,7 +279,7 @@ class StoryFlowAgent(BaseAgent):
         # 1. Initial Story Generation
         logger.info(f"[{self.name}] Running StoryGenerator...")
         async for event in self.story_generator.run_async(ctx):
-            logger.info(f"[{self.name}] Event from StoryGenerator: {event.model_dump_json(indent=2, exclude_none=True)}")
+            event_log.log(self.name, "StoryGenerator", event)
             yield event
 
         # Check if story was generated before proceeding
@@ -138,17 +294,17 @@ class StoryFlowAgent(BaseAgent):
         logger.info(f"[{self.name}] Running CriticReviserLoop...")
         # Use the loop_agent instance attribute assigned during init
         async for event in self.loop_agent.run_async(ctx):
-            logger.info(f"[{self.name}] Event from CriticReviserLoop: {event.model_dump_json(indent=2, exclude_none=True)}")
+            event_log.log(self.name, "CriticReviserLoop", event)
             yield event
 
         logger.info(f"[{self.name}] Story state after loop: {ctx.session.state.get('current_story')}")
 
-        # 3. Sequential Post-Processing (Grammar and Tone Check)
+        # 3. Post-Processing (Grammar and Tone Check), stage by stage
         logger.info(f"[{self.name}] Running PostProcessing...")
-        # Use the sequential_agent instance attribute assigned during init
-        async for event in self.sequential_agent.run_async(ctx):
-            logger.info(f"[{self.name}] Event from PostProcessing: {event.model_dump_json(indent=2, exclude_none=True)}")
-            yield event
+        for stage in self.post_processing:
+            async for event in self._run_stage(ctx, stage):
+                event_log.log(self.name, "PostProcessing", event)
+                yield event
 
         # 4. Tone-Based Conditional Logic
         tone_check_result = ctx.session.state.get("tone_check_result")
@@ -157,13 +313,50 @@ class StoryFlowAgent(BaseAgent):
         if tone_check_result == "negative":
             logger.info(f"[{self.name}] Tone is negative. Regenerating story...")
             async for event in self.story_generator.run_async(ctx):
-                logger.info(f"[{self.name}] Event from StoryGenerator (Regen): {event.model_dump_json(indent=2, exclude_none=True)}")
+                event_log.log(self.name, "StoryGenerator (Regen)", event)
                 yield event
         else:
             logger.info(f"[{self.name}] Tone is not negative. Keeping current story.")
             pass
 
         logger.info(f"[{self.name}] Workflow finished.")
+
+    async def _run_stage(
+        self, ctx: InvocationContext, stage: list[BaseAgent]
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Runs the agents of a stage at the same time and yields their events
+        in stage order, as if they had run one after the other. The events of
+        the first agent are yielded as they come, the others' once the agents
+        before them are done.
+        """
+        if len(stage) == 1:
+            async for event in stage[0].run_async(ctx):
+                yield event
+            return
+
+        queues = [asyncio.Queue() for _ in stage]
+
+        async def run(agent, queue):
+            try:
+                async for event in agent.run_async(ctx):
+                    await queue.put(event)
+            finally:
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(run(agent, queue)) for agent, queue in zip(stage, queues)]
+        try:
+            for queue in queues:
+                while (event := await queue.get()) is not None:
+                    yield event
+            # Raises the error of an agent that failed
+            for task in tasks:
+                await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let the cancelled agents finish before going on
+            await asyncio.gather(*tasks, return_exceptions=True)
     # --8<-- [end:executionlogic]
 
 # --8<-- [start:llmagents]
@@ -200,6 +393,7 @@ grammar_check = LlmAgent(
     instruction="""You are a grammar checker. Check the grammar of the story provided: {current_story}. Output only the suggested
 corrections as a list, or output 'Grammar is good!' if there are no errors.""",
     input_schema=None,
+    include_contents="none",  # The current turn only, not the whole conversation
     output_key="grammar_suggestions",
 )
 
@@ -210,6 +404,7 @@ tone_check = LlmAgent(
 the tone is generally positive, 'negative' if the tone is generally negative, or 'neutral'
 otherwise.""",
     input_schema=None,
+    include_contents="none",  # The current turn only, not the whole conversation
     output_key="tone_check_result", # This agent's output determines the conditional flow
 )
 # --8<-- [end:llmagents]
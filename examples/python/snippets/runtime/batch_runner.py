@@ -0,0 +1,308 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# --8<-- [start:batch_runner]
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions import State
+from google.genai import types
+
+
+class BatchItem(NamedTuple):
+    user_id: str
+    session_id: str
+    # Text, or a types.Content
+    message: object
+
+
+class BatchResult(NamedTuple):
+    # Position of the item in the batch
+    index: int
+    user_id: str
+    session_id: str
+    # SHA-256 of the message, which a checkpoint matches items by
+    message_hash: str
+    # The final response, or None if the item failed
+    text: Optional[str]
+    error: Optional[str]
+    attempts: int
+    seconds: float
+
+
+class ModelRateLimiter(BasePlugin):
+    """Runner plugin that spaces out the calls to each model.
+
+    `requests_per_minute` maps model names to their limit; "*" applies to
+    every other model. A call that would go over the limit waits for its
+    turn, so concurrent runs share the limit instead of failing on it.
+    """
+
+    def __init__(self, requests_per_minute):
+        super().__init__(name="model_rate_limiter")
+        self.requests_per_minute = requests_per_minute
+        # Model -> when its next call may start
+        self._next_call = {}
+
+        # Counters
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        model = llm_request.model
+        limit = self.requests_per_minute.get(model) or self.requests_per_minute.get("*")
+        self.calls += 1
+        if not limit:
+            return None
+        now = time.monotonic()
+        start = max(now, self._next_call.get(model, now))
+        self._next_call[model] = start + 60.0 / limit
+        if start > now:
+            self.waits += 1
+            self.wait_seconds += start - now
+            await asyncio.sleep(start - now)
+        return None
+
+
+class BatchRunner:
+    """Runs many queries through a Runner, a bounded number at a time.
+
+    `run(items)` takes an iterable of BatchItems, which it reads as workers
+    free up, and yields a BatchResult for each as it finishes, so not in
+    batch order. Items of the same session run one after the other, in
+    batch order; a session is created on first use.
+
+    A failed item is tried again up to `max_attempts` times, after an
+    exponential backoff with jitter. After a failed attempt the session is
+    put back as it was, so the retry doesn't send the message a second time
+    and a failed item leaves no trace in the conversation. With
+    `checkpoint_path`, every finished item is appended to a JSON lines file,
+    and running the batch again skips the items that succeeded in an
+    earlier run: same user, session and message, in batch order.
+
+    Close the results with `await results.aclose()` to stop a batch before
+    its end. For per-model rate limits, give the runner a ModelRateLimiter
+    plugin.
+    """
+
+    def __init__(self, runner, workers=8, max_attempts=3, backoff=1.0,
+                 checkpoint_path=None):
+        self.runner = runner
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.checkpoint_path = checkpoint_path
+        # (user_id, session_id) -> [lock, items waiting for it]
+        self._session_locks = {}
+
+        # Counters
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.skipped = 0
+
+    async def run(self, items):
+        done, complete = self._read_checkpoint()
+        checkpoint = None
+        if self.checkpoint_path:
+            checkpoint = open(self.checkpoint_path, "a")
+            if not complete:
+                checkpoint.write("\n")
+        pending = asyncio.Queue(maxsize=self.workers)
+        results = asyncio.Queue()
+        feed_errors = []
+
+        async def feed():
+            try:
+                for index, item in enumerate(items):
+                    item = BatchItem(*item)
+                    key = (item.user_id, item.session_id, _message_hash(item.message))
+                    if done[key]:
+                        done[key] -= 1
+                        self.skipped += 1
+                        continue
+                    await pending.put((index, item, key[2]))
+            except Exception as error:
+                # Raised once the workers are done with the items so far
+                feed_errors.append(error)
+            for _ in range(self.workers):
+                await pending.put(None)
+
+        async def work():
+            try:
+                while (entry := await pending.get()) is not None:
+                    result = await self._run_item(*entry)
+                    if checkpoint:
+                        checkpoint.write(json.dumps(result._asdict()) + "\n")
+                        checkpoint.flush()
+                    await results.put(result)
+            finally:
+                await results.put(None)
+
+        tasks = [asyncio.create_task(feed())]
+        tasks += [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            running = self.workers
+            while running:
+                result = await results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+            # Raises if a worker failed, e.g. writing the checkpoint, before
+            # waiting for the feed, which may be stuck without workers
+            for task in tasks[1:] + tasks[:1]:
+                await task
+            if feed_errors:
+                raise feed_errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if checkpoint:
+                checkpoint.close()
+
+    def stats(self):
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retries,
+            "skipped": self.skipped,
+        }
+
+    async def _run_item(self, index, item, message_hash):
+        start = time.perf_counter()
+        key = (item.user_id, item.session_id)
+        entry = self._session_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                for attempt in range(1, self.max_attempts + 1):
+                    try:
+                        text = await self._query(item)
+                    except Exception as error:
+                        if attempt == self.max_attempts:
+                            self.failed += 1
+                            return BatchResult(
+                                index, *key, message_hash, None,
+                                f"{type(error).__name__}: {error}",
+                                attempt, time.perf_counter() - start,
+                            )
+                        self.retries += 1
+                        delay = self.backoff * 2 ** (attempt - 1)
+                        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                    else:
+                        self.succeeded += 1
+                        return BatchResult(
+                            index, *key, message_hash, text, None, attempt,
+                            time.perf_counter() - start,
+                        )
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[key]
+
+    async def _query(self, item):
+        session_service = self.runner.session_service
+        app_name = self.runner.app_name
+        session = await session_service.get_session(
+            app_name=app_name, user_id=item.user_id, session_id=item.session_id
+        )
+        if session is None:
+            session = await session_service.create_session(
+                app_name=app_name, user_id=item.user_id, session_id=item.session_id
+            )
+        message = item.message
+        if isinstance(message, str):
+            message = types.Content(role="user", parts=[types.Part(text=message)])
+        text = None
+        try:
+            async for event in self.runner.run_async(
+                user_id=item.user_id, session_id=item.session_id, new_message=message
+            ):
+                if event.error_code:
+                    raise RuntimeError(f"{event.error_code}: {event.error_message}")
+                if event.is_final_response() and event.content and event.content.parts:
+                    text = "".join(part.text or "" for part in event.content.parts)
+        except Exception:
+            await self._roll_back(session)
+            raise
+        return text
+
+    async def _roll_back(self, snapshot):
+        """Puts a session back as it was before a failed attempt.
+
+        Session services can't remove events, so the session is created
+        again with its ID, state and earlier events. The events are appended
+        without their state deltas, as the state is restored whole. What the
+        attempt wrote to `app:` and `user:` state stays.
+        """
+        session_service = self.runner.session_service
+        ids = {
+            "app_name": snapshot.app_name,
+            "user_id": snapshot.user_id,
+            "session_id": snapshot.id,
+        }
+        session = await session_service.get_session(**ids)
+        if session is not None and len(session.events) == len(snapshot.events):
+            return
+        await session_service.delete_session(**ids)
+        prefixes = (State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX)
+        session = await session_service.create_session(**ids, state={
+            key: value for key, value in snapshot.state.items()
+            if not key.startswith(prefixes)
+        })
+        for event in snapshot.events:
+            actions = event.actions.model_copy(update={"state_delta": {}})
+            await session_service.append_event(
+                session, event.model_copy(update={"actions": actions})
+            )
+
+    def _read_checkpoint(self):
+        """Returns how many items of each user, session and message
+        succeeded in earlier runs, and whether the last line is complete
+        """
+        done = Counter()
+        complete = True
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return done, complete
+        with open(self.checkpoint_path) as checkpoint:
+            for line in checkpoint:
+                complete = line.endswith("\n")
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of a run that crashed while writing it
+                    continue
+                if result["error"] is None and "message_hash" in result:
+                    done[
+                        result["user_id"], result["session_id"], result["message_hash"]
+                    ] += 1
+        return done, complete
+
+
+def _message_hash(message):
+    """Returns the SHA-256 of a message, text or types.Content"""
+    if isinstance(message, types.Content):
+        message = message.model_dump_json(exclude_none=True)
+    return hashlib.sha256(str(message).encode()).hexdigest()
+# --8<-- [end:batch_runner]
@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Throughput of a batch of queries, one at a time like the snippets'
+# call_agent, and with a BatchRunner:
+#
+#   sequential  one query after the other, no retries
+#   batch       --workers queries at a time, failed ones tried again
+#   resume      the batch with a checkpoint file, stopped after half of the
+#               items as if it crashed, then run again
+#
+# Every query is on a session of its own and makes two calls to a scripted
+# model that takes --latency seconds per call: a tool call and the answer.
+# --failure-rate of the calls fail, like a model that is overloaded, and
+# --rpm limits the model calls per minute with a ModelRateLimiter.
+#
+# Run from this folder:
+#   python bench_batch_runner.py
+#   python bench_batch_runner.py --items 1000 --modes batch --rpm 3000
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from batch_runner import BatchRunner, ModelRateLimiter
+from scripted_llm import ScriptedLlm, function_call
+
+APP_NAME = "batch_app"
+MODES = ("sequential", "batch", "resume")
+failures = random.Random(0)
+
+
+class FlakyLlm(ScriptedLlm):
+    """ScriptedLlm that fails some of the calls"""
+
+    failure_rate: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if failures.random() < self.failure_rate:
+            await asyncio.sleep(self.latency)
+            raise ConnectionError("model overloaded")
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+def get_capital_city(country: str) -> str:
+    """Retrieves the capital city of a given country."""
+    return {"france": "Paris", "japan": "Tokyo"}.get(country.lower(), "unknown")
+
+
+def create_runner(args):
+    agent = LlmAgent(
+        name="capital_agent",
+        model=FlakyLlm(
+            model="gemini-2.0-flash",
+            responses=[function_call("get_capital_city", country="France"), "Paris."],
+            latency=args.latency,
+            failure_rate=args.failure_rate,
+        ),
+        instruction="Use the get_capital_city tool to answer.",
+        tools=[get_capital_city],
+    )
+    plugins = [ModelRateLimiter({"*": args.rpm})] if args.rpm else []
+    return Runner(
+        agent=agent, app_name=APP_NAME, session_service=InMemorySessionService(),
+        plugins=plugins,
+    )
+
+
+def batch_items(args):
+    for i in range(args.items):
+        yield f"user_{i % 100}", f"session_{i}", '{"country": "France"}'
+
+
+async def run_sequential(args, runner):
+    latencies = []
+    errors = 0
+    for user_id, session_id, query in batch_items(args):
+        start = time.perf_counter()
+        await runner.session_service.create_session(
+            app_name=APP_NAME, user_id=user_id, session_id=session_id
+        )
+        content = types.Content(role="user", parts=[types.Part(text=query)])
+        try:
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session_id, new_message=content
+            ):
+                pass
+        except ConnectionError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, {"failed": errors}
+
+
+async def run_batch(args, runner, checkpoint_path=None, stop_after=None):
+    batch = BatchRunner(
+        runner, workers=args.workers, max_attempts=args.max_attempts,
+        backoff=args.backoff, checkpoint_path=checkpoint_path,
+    )
+    latencies = []
+    # Closing the results stops the workers at once, like a crash would
+    results = batch.run(batch_items(args))
+    try:
+        async for result in results:
+            latencies.append(result.seconds)
+            if len(latencies) == stop_after:
+                break
+    finally:
+        await results.aclose()
+    return latencies, batch.stats()
+
+
+async def run_mode(args, mode):
+    runner = create_runner(args)
+    start = time.perf_counter()
+    if mode == "sequential":
+        latencies, stats = await run_sequential(args, runner)
+    elif mode == "batch":
+        latencies, stats = await run_batch(args, runner)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.jsonl")
+            first, _ = await run_batch(args, runner, path, stop_after=args.items // 2)
+            latencies, stats = await run_batch(args, runner, path)
+            with open(path) as checkpoint:
+                lines = sum(1 for _ in checkpoint)
+        latencies = first + latencies
+        stats["checkpoint_lines"] = lines
+    elapsed = time.perf_counter() - start
+    await runner.close()
+
+    def ms(q):
+        return statistics.quantiles(latencies, n=100)[q - 1] * 1000
+
+    print(f"{mode:>10}: {len(latencies)} items in {elapsed:.1f}s, "
+          f"{len(latencies) / elapsed:.0f} items/s, item p50 {ms(50):.0f}ms p95 {ms(95):.0f}ms")
+    limiter = runner.plugin_manager.get_plugin("model_rate_limiter")
+    if limiter:
+        stats["rate_limit_waits"] = limiter.waits
+    print(f"{'':>12}{stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch queries, one at a time and concurrently")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Seconds per model call")
+    parser.add_argument("--failure-rate", type=float, default=0.02,
+                        help="Share of the model calls that fail")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.1,
+                        help="Seconds before the first retry")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="Model calls per minute, 0 for no limit")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{args.items} items, {args.workers} workers, {args.latency * 1000:g}ms per model "
+          f"call, {args.failure_rate:.0%} of the calls fail, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        asyncio.run(run_mode(args, mode))
+
+
+if __name__ == "__main__":
+    main()
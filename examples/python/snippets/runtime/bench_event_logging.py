@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Per-event cost of StoryFlowAgent's event logging, on a long critic/reviser
+# loop:
+#
+#   eager_off  every event serialized in an f-string, as the agent used to,
+#              with INFO disabled
+#   lazy_off   the EventLogger with INFO disabled
+#   eager_on   the f-string, with INFO enabled
+#   full       the EventLogger, full JSON
+#   summary    the EventLogger, author, ID and part types only
+#   sampled    the EventLogger, full JSON of every --sample-every-th event
+#
+# The agents run on a ScriptedLlm that answers at once, and log records go
+# to /dev/null after they have been formatted. "logging" is the time spent
+# in the agent's event_log.log calls per event, "event" the whole time of a
+# workflow per event, which grows with the session history.
+#
+# Run from this folder:
+#   python bench_event_logging.py
+#   python bench_event_logging.py --iterations 50 --workflows 10
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from bench_examples import SCENARIOS, SNIPPETS, load_example, silence_logging
+from scripted_llm import use_scripted_model
+
+APP_NAME = "story_app"
+USER_ID = "user_1"
+MODES = ("eager_off", "lazy_off", "eager_on", "full", "summary", "sampled")
+SCENARIO = next(scenario for scenario in SCENARIOS if scenario.name == "storyflow")
+
+
+class EagerEventLogger:
+    """Logs events the way StoryFlowAgent did before the EventLogger"""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def log(self, agent_name, source, event):
+        self.logger.info(f"[{agent_name}] Event from {source}: {event.model_dump_json(indent=2, exclude_none=True)}")
+
+
+class TimedEventLogger:
+    """Measures the time spent in another event logger"""
+
+    def __init__(self, event_log):
+        self.event_log = event_log
+        self.calls = 0
+        self.seconds = 0.0
+
+    def log(self, agent_name, source, event):
+        start = time.perf_counter()
+        self.event_log.log(agent_name, source, event)
+        self.seconds += time.perf_counter() - start
+        self.calls += 1
+
+
+def event_logger(module, args, mode):
+    if mode.startswith("eager"):
+        return EagerEventLogger(module.logger)
+    return module.EventLogger(
+        module.logger,
+        sample_every=args.sample_every if mode == "sampled" else 1,
+        summary=mode == "summary",
+    )
+
+
+async def run_mode(args, module, agent, mode):
+    module.logger.setLevel(logging.WARNING if mode.endswith("_off") else logging.INFO)
+    # The agent looks up the module's event_log on every event
+    timed = module.event_log = TimedEventLogger(event_logger(module, args, mode))
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+    content = types.Content(role="user", parts=[types.Part(text=SCENARIO.query)])
+    events = 0
+    elapsed = 0.0
+    for _ in range(args.workflows):
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, state=SCENARIO.state
+        )
+        start = time.perf_counter()
+        async for event in runner.run_async(
+            user_id=USER_ID, session_id=session.id, new_message=content
+        ):
+            events += 1
+        elapsed += time.perf_counter() - start
+    await runner.close()
+    return events, elapsed, timed.seconds / timed.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StoryFlowAgent event logging cost")
+    parser.add_argument("--workflows", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="Critic/reviser loop iterations per workflow")
+    parser.add_argument("--sample-every", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    module = load_example(os.path.join(SNIPPETS, SCENARIO.path))
+    silence_logging()
+    agent = module.story_flow_agent
+    agent.loop_agent.max_iterations = args.iterations
+    use_scripted_model(agent, SCENARIO.scripts)
+    # Warm up
+    asyncio.run(run_mode(args, module, agent, "lazy_off"))
+
+    results = {mode: asyncio.run(run_mode(args, module, agent, mode)) for mode in args.modes}
+    print(f"{args.workflows} workflows of {args.iterations} loop iterations, "
+          f"{os.cpu_count()} CPUs")
+    for mode, (events, elapsed, logging_seconds) in results.items():
+        print(f"{mode:>9}: logging {logging_seconds * 1e6:7.1f}us per event, "
+              f"event {elapsed / events * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
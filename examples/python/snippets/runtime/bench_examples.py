@@ -0,0 +1,302 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Runs the example agents end to end on a ScriptedLlm, so what is measured is
+# ADK's own work: Runner.run_async, callbacks, tool calls, agent transfers and
+# state writes, and whatever the example does around them.
+#
+# Every example file is loaded as it is, without its top-level `await` demo
+# call, and every LlmAgent in its tree gets a ScriptedLlm that replays the
+# responses below, including the tool calls. A turn is one run_async on a new
+# session; prints go to /dev/null, and so do log records, after they have
+# been formatted.
+#
+#   events/s   events of all turns over their time
+#   turn       the time of a turn, the framework overhead when --latency is 0
+#   alloc      the peak and the retained memory of a turn, from tracemalloc
+#              in separate --alloc-turns turns
+#
+# Run from this folder:
+#   python bench_examples.py
+#   python bench_examples.py --stream --latency 0.01 --chunk-delay 0.001
+#   python bench_examples.py --scenarios storyflow callbacks.after_tool
+
+import argparse
+import ast
+import asyncio
+import contextlib
+import logging
+import os
+import statistics
+import time
+import tracemalloc
+import types as python_types
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from scripted_llm import function_call, use_scripted_model
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SNIPPETS = os.path.dirname(HERE)
+APP_NAME = "bench_app"
+USER_ID = "user_1"
+
+STORY = "A brave kitten crept into the haunted house and found a friendly ghost."
+WEATHER = [function_call("get_weather", city="London"), "It's cloudy in London, 15°C."]
+WEATHER_STATEFUL = [
+    function_call("get_weather_stateful", city="London"),
+    "It's cloudy in London, 15°C.",
+]
+CAPITAL = [function_call("get_capital_city", country="Canada"), "The capital is Ottawa."]
+
+
+class Scenario:
+    def __init__(self, name, path, agent, query, scripts, state=None):
+        self.name = name
+        self.path = path
+        # Name of the agent variable in the example
+        self.agent = agent
+        self.query = query
+        self.scripts = scripts
+        self.state = state
+
+
+SCENARIOS = [
+    Scenario(
+        "capital_agent.tool", "agents/llm-agent/capital_agent.py", "capital_agent_with_tool",
+        '{"country": "France"}',
+        {"capital_agent_tool": [
+            function_call("get_capital_city", country="France"),
+            "The capital of France is Paris.",
+        ]},
+    ),
+    Scenario(
+        "capital_agent.schema", "agents/llm-agent/capital_agent.py",
+        "structured_info_agent_schema", '{"country": "France"}',
+        {"structured_info_agent_schema": [
+            '{"capital": "Paris", "population_estimate": "2.1 million"}',
+        ]},
+    ),
+    Scenario(
+        "storyflow", "agents/custom-agent/storyflow_agent.py", "story_flow_agent",
+        "Generate a story about: a brave kitten",
+        {
+            "StoryGenerator": [STORY],
+            "Critic": ["Give the ghost a reason to be in the house."],
+            "Reviser": [STORY + " The ghost had been waiting for a friend."],
+            "GrammarCheck": ["Grammar is good!"],
+            "ToneCheck": ["positive"],
+        },
+        state={"topic": "a brave kitten exploring a haunted house"},
+    ),
+    Scenario(
+        "parallel_research", "agents/workflow-agents/parallel_agent_web_research.py",
+        "root_agent", "Summarize recent sustainable technology advancements.",
+        {
+            "RenewableEnergyResearcher": ["Solar cell efficiency keeps rising."],
+            "EVResearcher": ["Solid-state batteries are getting closer."],
+            "CarbonCaptureResearcher": ["Direct air capture costs are falling."],
+            "SynthesisAgent": ["## Summary of Recent Sustainable Technology Advancements"],
+        },
+    ),
+    Scenario(
+        "tutorial.step_1", "../tutorial/agent_team/adk-tutorial/step_1/agent.py",
+        "root_agent", "What's the weather in London?", {"weather_agent_v1": WEATHER},
+    ),
+    Scenario(
+        "tutorial.step_2_gpt4", "../tutorial/agent_team/adk-tutorial/step_2_gpt4/agent.py",
+        "root_agent", "What's the weather in London?", {"weather_agent_gpt": WEATHER},
+    ),
+    Scenario(
+        "tutorial.step_2_anthropic",
+        "../tutorial/agent_team/adk-tutorial/step_2 _anthropic/agent.py",
+        "root_agent", "What's the weather in London?", {"weather_agent_claude": WEATHER},
+    ),
+    Scenario(
+        "tutorial.step_3", "../tutorial/agent_team/adk-tutorial/step_3/agent.py",
+        "root_agent", "Hello, this is Alice",
+        {
+            "weather_agent_v2": [function_call("transfer_to_agent", agent_name="greeting_agent")],
+            "greeting_agent": [function_call("say_hello", name="Alice"), "Hello, Alice!"],
+        },
+    ),
+    Scenario(
+        "tutorial.step_5", "../tutorial/agent_team/adk-tutorial/step_5/agent.py",
+        "root_agent", "What's the weather in London?",
+        {"weather_agent_v5_model_guardrail": WEATHER_STATEFUL},
+    ),
+    Scenario(
+        "tutorial.step_6", "../tutorial/agent_team/adk-tutorial/step_6/agent.py",
+        "root_agent", "What's the weather in London?",
+        {"weather_agent_v6_tool_guardrail": WEATHER_STATEFUL},
+    ),
+    Scenario(
+        "callbacks.before_agent", "callbacks/before_agent_callback.py",
+        "llm_agent_with_before_cb", "Hello, please respond.",
+        {"MyControlledAgent": ["Hello!"]},
+    ),
+    Scenario(
+        "callbacks.after_agent", "callbacks/after_agent_callback.py",
+        "llm_agent_with_after_cb", "Hello, please respond.",
+        {"MySimpleAgentWithAfter": ["Hello!"]}, state={"add_concluding_note": True},
+    ),
+    Scenario(
+        "callbacks.before_model", "callbacks/before_model_callback.py", "my_llm_agent",
+        "write a joke on pizza", {"ModelCallbackAgent": ["Why did the pizza..."]},
+    ),
+    Scenario(
+        "callbacks.after_model", "callbacks/after_model_callback.py", "my_llm_agent",
+        "write a joke", {"AfterModelCallbackAgent": ["Here is a joke about a joke."]},
+    ),
+    Scenario(
+        "callbacks.before_tool", "callbacks/before_tool_callback.py", "my_llm_agent",
+        "Canada", {"ToolCallbackAgent": CAPITAL},
+    ),
+    Scenario(
+        "callbacks.after_tool", "callbacks/after_tool_callback.py", "my_llm_agent",
+        "united states", {"AfterToolCallbackAgent": [
+            function_call("get_capital_city", country="united states"),
+            "The capital is Washington, D.C.",
+        ]},
+    ),
+    Scenario(
+        "callbacks.basic", "callbacks/callback_basic.py", "my_agent",
+        "write a short joke", {"MyCallbackAgent": ["A short joke."]},
+    ),
+]
+
+
+def load_example(path):
+    """Loads an example file as a module, without its top-level awaits.
+
+    The snippets end with a notebook-style `await main()` demo, which would
+    call the real model; every other statement runs as written.
+    """
+    with open(path, encoding="utf-8") as source:
+        tree = ast.parse(source.read(), path)
+    tree.body = [
+        node for node in tree.body
+        if not (isinstance(node, (ast.Expr, ast.Assign)) and isinstance(node.value, ast.Await))
+    ]
+    module = python_types.ModuleType(os.path.splitext(os.path.basename(path))[0])
+    module.__file__ = path
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        exec(compile(tree, path, "exec"), module.__dict__)
+    return module
+
+
+def silence_logging():
+    """Sends log records that got past their level to /dev/null"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(os.devnull, "w"))
+
+
+async def run_turn(runner, scenario, session_id, run_config):
+    await runner.session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state=scenario.state
+    )
+    content = types.Content(role="user", parts=[types.Part(text=scenario.query)])
+    events = 0
+    async for event in runner.run_async(
+        user_id=USER_ID, session_id=session_id, new_message=content, run_config=run_config
+    ):
+        events += 1
+    return events
+
+
+async def run_scenario(args, scenario, agent):
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+    run_config = RunConfig(
+        streaming_mode=StreamingMode.SSE if args.stream else StreamingMode.NONE
+    )
+    for i in range(args.warmup):
+        await run_turn(runner, scenario, f"warmup_{i}", run_config)
+
+    turns = []
+    events = 0
+    for i in range(args.turns):
+        start = time.perf_counter()
+        events += await run_turn(runner, scenario, f"turn_{i}", run_config)
+        turns.append(time.perf_counter() - start)
+
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    for i in range(args.alloc_turns):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await run_turn(runner, scenario, f"alloc_{i}", run_config)
+        after, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(after - before)
+    tracemalloc.stop()
+    await runner.close()
+    return turns, events, peaks, retained
+
+
+def ms(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Example agents on a scripted model")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds before every model response")
+    parser.add_argument("--stream", action="store_true", help="Stream text in partial responses")
+    parser.add_argument("--chunk-words", type=int, default=1)
+    parser.add_argument("--chunk-delay", type=float, default=0.0,
+                        help="Seconds between streamed chunks")
+    parser.add_argument("--scenarios", nargs="+",
+                        choices=[scenario.name for scenario in SCENARIOS],
+                        default=[scenario.name for scenario in SCENARIOS])
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns per example, model latency {args.latency * 1000:g}ms, "
+          f"{'streaming' if args.stream else 'not streaming'}")
+    print(f"{'example':<27}{'events/turn':>12}{'events/s':>10}"
+          f"{'turn p50':>11}{'turn p95':>11}{'alloc peak':>12}{'retained':>11}")
+    modules = {}
+    for scenario in SCENARIOS:
+        if scenario.name not in args.scenarios:
+            continue
+        path = os.path.normpath(os.path.join(SNIPPETS, scenario.path))
+        try:
+            if path not in modules:
+                modules[path] = load_example(path)
+        except ImportError as error:
+            print(f"{scenario.name:<27}skipped: {error}")
+            continue
+        silence_logging()
+        agent = getattr(modules[path], scenario.agent)
+        use_scripted_model(
+            agent, scenario.scripts, latency=args.latency,
+            chunk_words=args.chunk_words, chunk_delay=args.chunk_delay,
+        )
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            turns, events, peaks, retained = asyncio.run(run_scenario(args, scenario, agent))
+        print(f"{scenario.name:<27}{events / len(turns):>12.1f}{events / sum(turns):>10.0f}"
+              f"{ms(turns, 50):>9.2f}ms{ms(turns, 95):>9.2f}ms"
+              f"{statistics.mean(peaks) / 1024:>9.0f}KiB"
+              f"{statistics.mean(retained) / 1024:>8.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
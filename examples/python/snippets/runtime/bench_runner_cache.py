@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Per-query overhead of setting up the runner and session for every query,
+# as the snippets' setup_session_and_runner() did, and of a RunnerCache:
+#
+#   cold           a new session service, session and Runner per query
+#   warm           one cached runner and session for every query
+#   warm_sessions  one cached runner, and a new session per query, with the
+#                  least recently used beyond --max-sessions dropped from
+#                  the cache
+#
+# The agent runs on a stub model that answers at once, so what is measured is
+# ADK's own work. "setup" is getting the session and runner, "query" the
+# whole call including run_async. With --session-service sqlite, the sessions
+# live in a DatabaseSessionService, whose engine and tables a cold query sets
+# up again.
+#
+# Run from this folder:
+#   python bench_runner_cache.py
+#   python bench_runner_cache.py --session-service sqlite
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+from google.genai import types
+
+from runner_cache import RunnerCache
+
+APP_NAME = "bench_app"
+USER_ID = "user_1"
+SESSION_ID = "session_001"
+MODES = ("cold", "warm", "warm_sessions")
+
+
+class StubLlm(BaseLlm):
+    """Model that answers every request with the same text, at once"""
+
+    model: str = "stub"
+
+    async def generate_content_async(self, llm_request, stream=False):
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+
+def get_weather(city: str) -> dict:
+    """Returns the weather of a city."""
+    return {"city": city, "weather": "sunny"}
+
+
+agent = LlmAgent(
+    name="bench_agent",
+    model=StubLlm(),
+    instruction="Be helpful.",
+    tools=[get_weather],
+)
+
+
+def create_session_service(args):
+    if args.session_service == "sqlite":
+        return DatabaseSessionService(f"sqlite:///{args.db_path}")
+    return InMemorySessionService()
+
+
+async def setup_session_and_runner(args):
+    session_service = create_session_service(args)
+    # A persistent service already has the session after the first query
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    ) or await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    return session, runner
+
+
+async def run_query(runner, session_id, content):
+    async for event in runner.run_async(
+        user_id=USER_ID, session_id=session_id, new_message=content
+    ):
+        pass
+
+
+async def run_mode(args, mode):
+    cache = RunnerCache(create_session_service(args), max_sessions=args.max_sessions)
+    content = types.Content(role="user", parts=[types.Part(text="hello")])
+    setups = []
+    queries = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        if mode == "cold":
+            session, runner = await setup_session_and_runner(args)
+        elif mode == "warm":
+            session, runner = await cache.get(APP_NAME, agent, USER_ID, SESSION_ID)
+        else:
+            session, runner = await cache.get(APP_NAME, agent, USER_ID, f"session_{i}")
+        setup_done = time.perf_counter()
+        await run_query(runner, session.id, content)
+        setups.append(setup_done - start)
+        queries.append(time.perf_counter() - start)
+
+    def ms(values, q):
+        return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+    print(f"{mode:>13}: setup p50 {ms(setups, 50):.3f}ms p95 {ms(setups, 95):.3f}ms, "
+          f"query p50 {ms(queries, 50):.2f}ms p95 {ms(queries, 95):.2f}ms")
+    if mode != "cold":
+        print(f"{'':>15}cache: {cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold and warm runner setup per query")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--max-sessions", type=int, default=100,
+                        help="Sessions the cache keeps in warm_sessions mode")
+    parser.add_argument("--session-service", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{args.queries} queries, {args.session_service} sessions")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes:
+            args.db_path = os.path.join(directory, f"{mode}.db")
+            asyncio.run(run_mode(args, mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Wall-clock time of the StoryFlowAgent workflow with its post-processing
+# agents run one after the other and at the same time:
+#
+#   sequential  the default: GrammarCheck, then ToneCheck
+#   parallel    parallel_post_processing=True: both in one stage, as neither
+#               reads what the other writes
+#
+# Every agent runs on a ScriptedLlm that answers after --latency seconds;
+# GrammarCheck takes --grammar-latency and ToneCheck --tone-latency. The
+# workflow makes seven model calls in order, so the parallel one should save
+# the shorter of the two checks. A ScriptedLlm ignores its request, so this
+# measures time only: in the parallel workflow ToneCheck's model sees the
+# Reviser's reply instead of GrammarCheck's, and a real model may answer
+# differently.
+#
+# Run from this folder:
+#   python bench_storyflow.py
+#   python bench_storyflow.py --grammar-latency 0.4 --tone-latency 0.1
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from bench_examples import SCENARIOS, SNIPPETS, load_example, silence_logging
+from scripted_llm import use_scripted_model
+
+APP_NAME = "story_app"
+USER_ID = "user_1"
+MODES = ("sequential", "parallel")
+SCENARIO = next(scenario for scenario in SCENARIOS if scenario.name == "storyflow")
+
+
+def create_agent(module, mode):
+    return module.StoryFlowAgent(
+        name="StoryFlowAgent",
+        story_generator=module.story_generator.clone(),
+        critic=module.critic.clone(),
+        reviser=module.reviser.clone(),
+        grammar_check=module.grammar_check.clone(),
+        tone_check=module.tone_check.clone(),
+        parallel_post_processing=mode == "parallel",
+    )
+
+
+async def run_mode(args, module, mode):
+    agent = create_agent(module, mode)
+    use_scripted_model(agent, SCENARIO.scripts, latency=args.latency)
+    agent.grammar_check.model.latency = args.grammar_latency
+    agent.tone_check.model.latency = args.tone_latency
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+    content = types.Content(role="user", parts=[types.Part(text=SCENARIO.query)])
+    turns = []
+    for _ in range(args.turns):
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, state=SCENARIO.state
+        )
+        start = time.perf_counter()
+        authors = []
+        async for event in runner.run_async(
+            user_id=USER_ID, session_id=session.id, new_message=content
+        ):
+            authors.append(event.author)
+        turns.append(time.perf_counter() - start)
+    session = await runner.session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+    )
+    await runner.close()
+    stages = [[stage_agent.name for stage_agent in stage] for stage in agent.post_processing]
+    print(f"{mode:>10}: workflow p50 {statistics.median(turns) * 1000:.0f}ms, "
+          f"max {max(turns) * 1000:.0f}ms, post-processing stages {stages}")
+    return authors, session.state, statistics.median(turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StoryFlowAgent with sequential and parallel checks")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1,
+                        help="Seconds per model call of the other agents")
+    parser.add_argument("--grammar-latency", type=float, default=0.3)
+    parser.add_argument("--tone-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    module = load_example(os.path.join(SNIPPETS, SCENARIO.path))
+    silence_logging()
+    print(f"{args.turns} workflows, model latency {args.latency * 1000:g}ms, GrammarCheck "
+          f"{args.grammar_latency * 1000:g}ms, ToneCheck {args.tone_latency * 1000:g}ms")
+    results = {mode: asyncio.run(run_mode(args, module, mode)) for mode in MODES}
+    sequential_authors, sequential_state, sequential_time = results["sequential"]
+    parallel_authors, parallel_state, parallel_time = results["parallel"]
+    print(f"saved {(sequential_time - parallel_time) * 1000:.0f}ms per workflow; "
+          f"same event authors: {sequential_authors == parallel_authors}, "
+          f"same state keys: {sequential_state.keys() == parallel_state.keys()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# --8<-- [start:runner_cache]
+import asyncio
+from collections import OrderedDict
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+
+class RunnerCache:
+    """Keeps runners and sessions warm across queries.
+
+    Building a session service, a session and a `Runner` for every query
+    repeats the same setup and starts every query with an empty session. The
+    cache builds one runner per app and agent object on a shared session
+    service, and creates each session once. Both are kept in LRU order: past
+    `max_runners` or `max_sessions`, the least recently used one is dropped
+    from the cache only. The runner may still be running a query, and the
+    session stays in the session service, so the next query for it picks up
+    its history. `invalidate` closes a runner and `invalidate_session`
+    deletes a session explicitly.
+    """
+
+    def __init__(self, session_service=None, max_runners=32, max_sessions=1024):
+        self.session_service = session_service or InMemorySessionService()
+        self.max_runners = max_runners
+        self.max_sessions = max_sessions
+        # (app_name, id(agent)) -> Runner; the runner holds the agent, so
+        # the ID isn't reused while the entry exists
+        self._runners = OrderedDict()
+        # (app_name, user_id, session_id) -> Session
+        self._sessions = OrderedDict()
+        self._session_locks = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_runner(self, app_name, agent):
+        """Returns the runner of an app and agent, creating it on first use.
+
+        Runners are keyed by the agent object, not its name: two agents with
+        the same name, or a rebuilt agent, get runners of their own.
+        """
+        key = (app_name, id(agent))
+        runner = self._runners.get(key)
+        if runner is not None:
+            self._runners.move_to_end(key)
+            return runner
+        runner = Runner(agent=agent, app_name=app_name, session_service=self.session_service)
+        self._runners[key] = runner
+        while len(self._runners) > self.max_runners:
+            self._runners.popitem(last=False)
+            self.evictions += 1
+        return runner
+
+    async def get_session(self, app_name, user_id, session_id):
+        """Returns the session, creating it on first use.
+
+        The session is a snapshot from when it was created; the runner loads
+        the current one by its ID.
+        """
+        key = (app_name, user_id, session_id)
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            self.hits += 1
+            return session
+        lock = self._session_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            session = self._sessions.get(key)
+            if session is None:
+                self.misses += 1
+                session = await self.session_service.get_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+                if session is None:
+                    session = await self.session_service.create_session(
+                        app_name=app_name, user_id=user_id, session_id=session_id
+                    )
+                self._sessions[key] = session
+        while len(self._sessions) > self.max_sessions:
+            evicted_key, _ = self._sessions.popitem(last=False)
+            self._session_locks.pop(evicted_key, None)
+            self.evictions += 1
+        return session
+
+    async def get(self, app_name, agent, user_id, session_id):
+        """Returns `(session, runner)`, like a per-query setup would"""
+        runner = self.get_runner(app_name, agent)
+        session = await self.get_session(app_name, user_id, session_id)
+        return session, runner
+
+    async def invalidate(self, app_name, agent):
+        """Closes the runner of an app and agent; the next query builds a new one"""
+        runner = self._runners.pop((app_name, id(agent)), None)
+        if runner is not None:
+            await runner.close()
+
+    async def invalidate_session(self, app_name, user_id, session_id):
+        """Deletes a session; the next query starts a new one"""
+        self._sessions.pop((app_name, user_id, session_id), None)
+        self._session_locks.pop((app_name, user_id, session_id), None)
+        await self.session_service.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def close(self):
+        """Closes every runner"""
+        runners = list(self._runners.values())
+        self._runners.clear()
+        for runner in runners:
+            await runner.close()
+
+    def stats(self):
+        return {
+            "runners": len(self._runners),
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+# --8<-- [end:runner_cache]
@@ -0,0 +1,118 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# --8<-- [start:scripted_llm]
+import asyncio
+from typing import Any
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+DEFAULT_RESPONSE = "OK."
+
+
+def function_call(name, /, **args):
+    """Returns a scripted response that calls a tool"""
+    return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+
+class ScriptedLlm(BaseLlm):
+    """Model stand-in that replays the same responses on every turn.
+
+    `responses` is what the model answers in a turn, in order: text, a
+    `function_call(...)`, or a list of parts. Which one a request gets
+    follows from the request alone, the number of model contents since the
+    last user text, so a tool call is followed by the next response and
+    every turn, session and concurrent run starts over at the first one.
+    Past the end, the last text is repeated.
+
+    `latency` is the seconds before the first response. With streaming,
+    text comes in partial responses of `chunk_words` words, `chunk_delay`
+    seconds apart, then in full, like from Gemini.
+    """
+
+    model: str = "scripted"
+    responses: list[Any] = []
+    latency: float = 0.0
+    chunk_words: int = 1
+    chunk_delay: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        parts = self._parts(self._step(llm_request))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = "".join(part.text or "" for part in parts)
+        if stream and text and not any(part.function_call for part in parts):
+            words = text.split(" ")
+            for start in range(0, len(words), self.chunk_words):
+                chunk = " ".join(words[start:start + self.chunk_words])
+                if start + self.chunk_words < len(words):
+                    chunk += " "
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                    partial=True,
+                )
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+        yield LlmResponse(content=types.Content(role="model", parts=parts))
+
+    @staticmethod
+    def _step(llm_request):
+        step = 0
+        for content in reversed(llm_request.contents):
+            if content.role == "model":
+                step += 1
+            elif any(part.text for part in content.parts or []):
+                break
+        return step
+
+    def _parts(self, step):
+        if step >= len(self.responses):
+            texts = [response for response in self.responses if isinstance(response, str)]
+            return [types.Part(text=texts[-1] if texts else DEFAULT_RESPONSE)]
+        response = self.responses[step]
+        if isinstance(response, str):
+            return [types.Part(text=response)]
+        if isinstance(response, types.Part):
+            return [response]
+        return list(response)
+
+
+def use_scripted_model(agent, scripts, **options):
+    """Gives every LlmAgent in the tree a ScriptedLlm.
+
+    `scripts` maps agent names to their responses; the others answer
+    DEFAULT_RESPONSE. The model keeps the agent's model name, which e.g. the
+    google_search tool checks. `options` go to every ScriptedLlm. Returns
+    the number of agents changed.
+    """
+    changed = 0
+    if isinstance(agent, LlmAgent):
+        if isinstance(agent.model, str) and agent.model:
+            name = agent.model
+        else:
+            # A model object, or the model of the parent agent
+            name = agent.canonical_model.model
+        agent.model = ScriptedLlm(
+            model=name,
+            responses=scripts.get(agent.name, [DEFAULT_RESPONSE]),
+            **options,
+        )
+        changed += 1
+    for sub_agent in agent.sub_agents:
+        changed += use_scripted_model(sub_agent, scripts, **options)
+    return changed
+# --8<-- [end:scripted_llm]
@@ -0,0 +1,162 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+
+try:
+    import av
+except ImportError:
+    # PyAV is optional, without it every connection uses PCM
+    av = None
+
+#
+# Opus audio
+#
+# A client that connects with `?codec=opus` sends and receives Opus instead
+# of 16-bit PCM, about a tenth of the bandwidth. The server decodes inbound
+# Opus to PCM before `send_realtime` and encodes the agent's PCM to Opus, so
+# the live model still sees PCM. Opus travels in binary frames (see
+# binary_frames.py) of type FRAME_AUDIO_OPUS, whose payload is one or more
+# 20 ms Opus packets, each prefixed with its length:
+#
+#   +----------------+-----------------+----------------+-----
+#   |  length uint16 |  packet ...     |  length uint16 |  ...
+#   +----------------+-----------------+----------------+-----
+#
+# The codecs come from PyAV (`pip install av`), which bundles libopus.
+#
+
+AUDIO_CODEC_PCM = "pcm"
+AUDIO_CODEC_OPUS = "opus"
+
+OPUS_FRAME_MS = 20
+OPUS_DECODED_SAMPLE_RATE = 48000
+SAMPLE_WIDTH = 2
+
+PACKET_LENGTH = struct.Struct("!H")
+
+
+def opus_available():
+    """Returns True if PyAV, and with it libopus, is installed"""
+    return av is not None
+
+
+def pack_packets(packets):
+    """Encodes Opus packets into a frame payload"""
+    return b"".join(PACKET_LENGTH.pack(len(packet)) + packet for packet in packets)
+
+
+def unpack_packets(payload):
+    """Decodes a frame payload into Opus packets, as views of the payload"""
+    packets = []
+    view = memoryview(payload)
+    offset = 0
+    while offset < len(view):
+        if offset + PACKET_LENGTH.size > len(view):
+            raise ValueError("Truncated Opus packet length")
+        (length,) = PACKET_LENGTH.unpack_from(view, offset)
+        offset += PACKET_LENGTH.size
+        if offset + length > len(view):
+            raise ValueError("Truncated Opus packet")
+        packets.append(view[offset:offset + length])
+        offset += length
+    return packets
+
+
+class OpusEncoder:
+    """Encodes a stream of 16-bit mono PCM into 20 ms Opus packets.
+
+    PCM that doesn't fill a packet is kept for the next call, or padded with
+    silence by `flush()` at the end of a turn. Not thread-safe: one stream
+    calls it from one thread at a time.
+    """
+
+    def __init__(self, sample_rate, bitrate=24000):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * OPUS_FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        self._context = av.CodecContext.create("libopus", "w")
+        self._context.sample_rate = sample_rate
+        self._context.layout = "mono"
+        self._context.format = "s16"
+        self._context.bit_rate = bitrate
+        self._context.options = {"application": "voip"}
+        self._context.open()
+        self._pending = bytearray()
+        self._pts = 0
+
+    def encode(self, pcm):
+        """Adds PCM and returns the packets of every full 20 ms frame"""
+        self._pending += pcm
+        packets = []
+        while len(self._pending) >= self.frame_bytes:
+            packets += self._encode_frame(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+        return packets
+
+    def flush(self):
+        """Pads the kept PCM with silence to a full frame and encodes it"""
+        if not self._pending:
+            return []
+        self._pending += bytes(self.frame_bytes - len(self._pending))
+        return self.encode(b"")
+
+    def discard(self):
+        """Drops the kept PCM, e.g. when the agent was interrupted"""
+        self._pending.clear()
+
+    def _encode_frame(self, pcm):
+        frame = av.AudioFrame(format="s16", layout="mono", samples=self.frame_samples)
+        frame.sample_rate = self.sample_rate
+        frame.pts = self._pts
+        frame.planes[0].update(bytes(pcm))
+        self._pts += self.frame_samples
+        return [bytes(packet) for packet in self._context.encode(frame)]
+
+
+class OpusDecoder:
+    """Decodes Opus packets into 16-bit mono PCM at `sample_rate`.
+
+    The PCM of a call collects in a buffer the decoder reuses, so the bytes
+    it returns are the only copy. Not thread-safe: one stream calls it from
+    one thread at a time.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self._context = av.CodecContext.create("libopus", "r")
+        self._context.layout = "mono"
+        self._context.format = "s16"
+        # libopus decodes at 48 kHz
+        self._resampler = None
+        if sample_rate != OPUS_DECODED_SAMPLE_RATE:
+            self._resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        self._pcm = bytearray()
+
+    def decode(self, packets):
+        """Decodes packets and returns their PCM"""
+        pcm = self._pcm
+        size = 0
+        for packet in packets:
+            for frame in self._context.decode(av.Packet(packet)):
+                frames = self._resampler.resample(frame) if self._resampler else [frame]
+                for pcm_frame in frames:
+                    # Planes are padded, so only take the samples
+                    length = pcm_frame.samples * SAMPLE_WIDTH
+                    if size + length > len(pcm):
+                        pcm.extend(bytes(size + length - len(pcm)))
+                    pcm[size:size + length] = memoryview(pcm_frame.planes[0])[:length]
+                    size += length
+        with memoryview(pcm) as view:
+            return bytes(view[:size])
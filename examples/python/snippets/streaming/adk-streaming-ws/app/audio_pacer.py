@@ -0,0 +1,63 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#
+# Audio pacing
+#
+# The live model sends its audio faster than real time. Sent as it comes, an
+# answer piles up in the socket buffers and in the client's player, where an
+# interruption can't take it back: on a slow link the user hears the agent
+# for seconds after talking over it. The pacer holds each audio message back
+# until the client has no more than `ahead_ms` of audio left to play, so the
+# rest of the answer waits in the outbound queue, which drops it when the
+# turn is interrupted.
+#
+
+
+class AudioPacer:
+    """Tracks the audio a client has yet to play"""
+
+    def __init__(self, ahead_ms=500, sample_rate=24000, sample_width=2):
+        self.ahead = ahead_ms / 1000
+        self.bytes_per_second = sample_rate * sample_width
+        # When the client will have played the audio sent so far
+        self._played_at = 0.0
+
+        # Counters
+        self.held = 0
+        self.held_seconds = 0.0
+
+    def delay(self, now):
+        """Returns how long to hold the next audio message"""
+        delay = self._played_at - self.ahead - now
+        if delay <= 0:
+            return 0.0
+        self.held += 1
+        self.held_seconds += delay
+        return delay
+
+    def sent(self, nbytes, now):
+        """Records audio sent to the client"""
+        self._played_at = max(self._played_at, now) + nbytes / self.bytes_per_second
+
+    def reset(self):
+        """The client dropped its audio, e.g. when the turn was interrupted"""
+        self._played_at = 0.0
+
+    def stats(self):
+        return {
+            "ahead_ms": self.ahead * 1000,
+            "held": self.held,
+            "held_seconds": round(self.held_seconds, 3),
+        }
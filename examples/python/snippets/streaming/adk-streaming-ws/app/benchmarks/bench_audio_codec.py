@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Bandwidth and server CPU per voice stream for each audio mode:
+#
+#   json    PCM as Base64 in JSON messages
+#   binary  PCM in binary frames (?binary=true)
+#   opus    Opus in binary frames (?codec=opus), needs PyAV
+#
+# Every talker streams a second of microphone audio in real time, in 200 ms
+# frames like app.js, and waits for the fake model's answer: a second of
+# agent audio. Both sides send a tone, which Opus compresses about like
+# speech; silence would compress to almost nothing.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_audio_codec --talkers 50
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+
+import websockets
+
+from audio_codec import OpusEncoder, opus_available, pack_packets
+from benchmarks.common import ProcessMonitor, start_fake_server, wait_for_port
+from binary_frames import FRAME_AUDIO_OPUS, FRAME_AUDIO_PCM, FrameSequencer, encode_frame
+from fake_live_model import tone
+
+HOST = "127.0.0.1"
+MODES = ("json", "binary", "opus")
+
+# Microphone audio: 16 kHz 16-bit mono, sent every 200 ms
+INPUT_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BATCH_MS = 200
+TURN_SECONDS = 1
+
+
+class Totals:
+    def __init__(self):
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.turns = 0
+        self.timeouts = 0
+        self.errors = 0
+
+
+def microphone_messages(mode):
+    """Returns the messages of one second of microphone audio"""
+    batch_bytes = INPUT_SAMPLE_RATE * SAMPLE_WIDTH * BATCH_MS // 1000
+    pcm = tone(INPUT_SAMPLE_RATE * TURN_SECONDS, 300, INPUT_SAMPLE_RATE)
+    batches = [pcm[i:i + batch_bytes] for i in range(0, len(pcm), batch_bytes)]
+    if mode == "json":
+        return [
+            json.dumps({"mime_type": "audio/pcm", "data": base64.b64encode(batch).decode("ascii")})
+            for batch in batches
+        ]
+    sequencer = FrameSequencer()
+    if mode == "binary":
+        return [encode_frame(FRAME_AUDIO_PCM, batch, sequencer.next()) for batch in batches]
+    encoder = OpusEncoder(INPUT_SAMPLE_RATE)
+    return [
+        encode_frame(FRAME_AUDIO_OPUS, pack_packets(encoder.encode(batch)), sequencer.next())
+        for batch in batches
+    ]
+
+
+async def talk(args, mode, user_id, messages, deadline, totals):
+    binary = "false" if mode == "json" else "true"
+    codec = "opus" if mode == "opus" else "pcm"
+    url = f"ws://{HOST}:{args.port}/ws/{user_id}?is_audio=true&binary={binary}&codec={codec}"
+    turn_done = asyncio.Event()
+
+    async def receive(websocket):
+        nonlocal turn_done
+        async for message in websocket:
+            totals.received_bytes += len(message)
+            if isinstance(message, str) and '"turn_complete":true' in message:
+                turn_done.set()
+
+    try:
+        async with websockets.connect(url, max_size=None, compression=None) as websocket:
+            negotiated = json.loads(await websocket.recv())["audio_codec"]
+            if negotiated != codec:
+                raise RuntimeError(f"Server negotiated {negotiated}, not {codec}")
+            reader = asyncio.create_task(receive(websocket))
+            try:
+                while time.perf_counter() < deadline:
+                    turn_done = asyncio.Event()
+                    next_send = time.perf_counter()
+                    for message in messages:
+                        delay = next_send - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        await websocket.send(message)
+                        totals.sent_bytes += len(message)
+                        next_send += BATCH_MS / 1000
+                    try:
+                        await asyncio.wait_for(turn_done.wait(), 10)
+                        totals.turns += 1
+                    except asyncio.TimeoutError:
+                        totals.timeouts += 1
+            finally:
+                reader.cancel()
+    except (OSError, RuntimeError, websockets.WebSocketException) as e:
+        totals.errors += 1
+        print(f"Talker #{user_id} failed: {e!r}")
+
+
+async def run_load(args, mode, pid):
+    messages = microphone_messages(mode)
+    totals = Totals()
+    monitor = ProcessMonitor([pid])
+    monitor.start()
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(
+        talk(args, mode, user_id, messages, deadline, totals)
+        for user_id in range(args.talkers)
+    ))
+    elapsed = time.perf_counter() - start
+    cpu = await monitor.stop()
+    return totals, elapsed, cpu
+
+
+def run_mode(args, mode):
+    server = start_fake_server(args.port, env={
+        "LOG_MODE": "metrics",
+        "FAKE_TEXT_CHUNKS": "0",
+        "FAKE_AUDIO_CHUNKS": str(TURN_SECONDS * 50),
+        "FAKE_AUDIO_TONE_HZ": "440",
+        # A bit less than a second: decoded Opus lags a few samples behind
+        "FAKE_AUDIO_BYTES_PER_TURN": str(INPUT_SAMPLE_RATE * SAMPLE_WIDTH * TURN_SECONDS * 9 // 10),
+    })
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+        totals, elapsed, cpu = asyncio.run(run_load(args, mode, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    # Per stream and per second of audio, in each direction
+    audio_seconds = totals.turns * TURN_SECONDS
+    up = totals.sent_bytes / max(1, audio_seconds) / 1000
+    down = totals.received_bytes / max(1, audio_seconds) / 1000
+    print(
+        f"{mode:>7}: up {up:6.1f} kB, down {down:6.1f} kB per audio second, "
+        f"CPU {cpu * 1000 / args.talkers / elapsed:5.1f} ms/s per stream, "
+        f"{totals.turns} turns, {totals.timeouts} timeouts, {totals.errors} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandwidth and CPU per stream by audio mode")
+    parser.add_argument("--talkers", type=int, default=50, help="Concurrent voice streams")
+    parser.add_argument("--seconds", type=float, default=20, help="Duration per mode")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8830)
+    args = parser.parse_args()
+
+    print(f"{args.talkers} talkers, {args.seconds:.0f} s per mode, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        if mode == "opus" and not opus_available():
+            print("   opus: skipped, pip install av to measure it")
+            continue
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# How long a user keeps hearing the agent after talking over it, depending on
+# what happens to the outbound audio of the interrupted turn:
+#
+#   purge       audio is paced to playback (AUDIO_SEND_AHEAD_MS) and the
+#               turn's queued audio is dropped on `interrupted`
+#   no_pacing   audio is sent as the model sends it, the queued audio is
+#               dropped on `interrupted` (AUDIO_SEND_AHEAD_MS=0)
+#   keep        audio is paced, and the turn's queued audio is sent ahead of
+#               `interrupted` (PURGE_AUDIO_ON_INTERRUPT=false)
+#
+# The fake model answers with audio faster than real time, like Gemini Live,
+# so the audio queues up on the server when the client's link is slow. Each
+# client reads its socket at --link-kbps, listens for --listen seconds and
+# then sends a message, which the fake model treats as the user talking over
+# it. "barge-in" is the time from that message to the `interrupted` message,
+# when the client stops playing; "stale audio" is the audio of the
+# interrupted turn the client received in between. Without pacing, most of it
+# sits in the socket buffers, where purging can't reach it.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_barge_in --clients 10 --interruptions 5
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+import urllib.request
+
+import websockets
+
+from benchmarks.common import format_latencies, start_fake_server, wait_for_port
+from binary_frames import FRAME_HEADER_SIZE, decode_frame
+
+HOST = "127.0.0.1"
+MODES = ("purge", "no_pacing", "keep")
+# 100 ms of 24 kHz 16-bit PCM per model chunk
+AUDIO_CHUNK_BYTES = 4800
+
+
+class Totals:
+    def __init__(self):
+        self.barge_in_latencies = []
+        self.stale_bytes = []
+        self.missed = 0
+        self.errors = 0
+
+
+async def client(args, user_id, totals):
+    url = f"ws://{HOST}:{args.port}/ws/{user_id}?is_audio=true&binary=true"
+    # A small receive buffer, so that the slow link backs up into the server
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16384)
+    sock.connect((HOST, args.port))
+    bytes_per_second = args.link_kbps * 1000 / 8
+    try:
+        async with websockets.connect(url, sock=sock, compression=None, max_queue=1) as websocket:
+            await websocket.recv()  # the audio_codec message
+
+            async def receive():
+                """Returns the next message, read at the pace of the link"""
+                message = await websocket.recv()
+                await asyncio.sleep(len(message) / bytes_per_second)
+                return message
+
+            await websocket.send(json.dumps({"mime_type": "text/plain", "data": "hi"}))
+            for _ in range(args.interruptions):
+                # Listen to the answer for a while, then talk over it
+                listen_until = time.perf_counter() + args.listen
+                turn = None
+                while time.perf_counter() < listen_until:
+                    message = await receive()
+                    if isinstance(message, bytes):
+                        turn = decode_frame(message)[1]
+                await websocket.send(json.dumps({"mime_type": "text/plain", "data": "stop"}))
+                sent = time.perf_counter()
+                stale = 0
+                try:
+                    # The model only interrupts an answer it is still
+                    # generating, not one the client is still playing
+                    async with asyncio.timeout(args.answer_seconds + 5):
+                        while True:
+                            message = await receive()
+                            if isinstance(message, bytes):
+                                if decode_frame(message)[1] == turn:
+                                    stale += len(message) - FRAME_HEADER_SIZE
+                            elif json.loads(message).get("interrupted"):
+                                break
+                except TimeoutError:
+                    totals.missed += 1
+                    return
+                totals.barge_in_latencies.append(time.perf_counter() - sent)
+                totals.stale_bytes.append(stale)
+    except (OSError, websockets.WebSocketException):
+        totals.errors += 1
+
+
+def server_barge_in(port):
+    """Returns the count and mean of the server's barge-in histogram"""
+    with urllib.request.urlopen(f"http://{HOST}:{port}/metrics") as response:
+        metrics = response.read().decode()
+    values = {}
+    for line in metrics.splitlines():
+        for name in ("sum", "count"):
+            if line.startswith(f"adk_streaming_barge_in_seconds_{name} "):
+                values[name] = float(line.split()[1])
+    count = int(values.get("count", 0))
+    return count, values.get("sum", 0.0) / count if count else 0.0
+
+
+def run_mode(args, mode):
+    server = start_fake_server(args.port, env={
+        "LOG_MODE": "metrics",
+        "PURGE_AUDIO_ON_INTERRUPT": "false" if mode == "keep" else "true",
+        "AUDIO_SEND_AHEAD_MS": "0" if mode == "no_pacing" else str(args.ahead_ms),
+        "FAKE_BARGE_IN": "true",
+        "FAKE_TEXT_CHUNKS": "0",
+        "FAKE_AUDIO_CHUNKS": str(args.answer_seconds * 10),
+        "FAKE_AUDIO_CHUNK_BYTES": str(AUDIO_CHUNK_BYTES),
+        # Audio comes in faster than real time
+        "FAKE_AUDIO_CHUNK_INTERVAL": str(0.1 / args.speedup),
+        "FAKE_AUDIO_TONE_HZ": "300",
+    })
+    totals = Totals()
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+
+        async def run_clients():
+            await asyncio.gather(*(client(args, user_id, totals) for user_id in range(args.clients)))
+
+        asyncio.run(run_clients())
+        count, mean = server_barge_in(args.port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    stale_seconds = [stale / (AUDIO_CHUNK_BYTES * 10) for stale in totals.stale_bytes]
+    print(f"{mode:>9}: {len(totals.barge_in_latencies)} interruptions, "
+          f"{totals.missed} missed, {totals.errors} errors")
+    print(f"{'':>11}barge-in at the client: {format_latencies(totals.barge_in_latencies)}")
+    print(f"{'':>11}stale audio received, in ms of audio: {format_latencies(stale_seconds)}")
+    print(f"{'':>11}barge-in on the server: {count} interruptions, mean {mean * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barge-in latency with and without purging and pacing")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--interruptions", type=int, default=5, help="Interruptions per client")
+    parser.add_argument("--listen", type=float, default=1.0,
+                        help="Seconds of an answer a client hears before interrupting")
+    parser.add_argument("--link-kbps", type=float, default=512,
+                        help="Client link speed in kbit/s (PCM audio takes 384)")
+    parser.add_argument("--answer-seconds", type=int, default=20, help="Audio per answer")
+    parser.add_argument("--speedup", type=float, default=5,
+                        help="How much faster than real time the model sends audio")
+    parser.add_argument("--ahead-ms", type=int, default=500,
+                        help="Audio a paced client gets ahead of its playback")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8870)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients on {args.link_kbps:g} kbit/s links, "
+          f"{os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares the server-side cost of JSON + Base64 audio messages with binary
+# WebSocket frames for one audio stream.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_binary_frames --seconds 600
+
+import argparse
+import base64
+import json
+import os
+import time
+
+from binary_frames import FRAME_AUDIO_PCM, decode_frame, encode_frame
+
+FRAME_MS = 20
+SAMPLE_WIDTH = 2  # 16-bit PCM
+AGENT_SAMPLE_RATE = 24000  # Agent to client audio
+CLIENT_SAMPLE_RATE = 16000  # Client to agent audio
+
+
+def pcm_chunk(sample_rate):
+    """Returns one FRAME_MS chunk of (random) mono PCM audio"""
+    return os.urandom(sample_rate * SAMPLE_WIDTH * FRAME_MS // 1000)
+
+
+def json_mode(outbound, inbound, frames):
+    """Encodes outbound and decodes inbound audio as JSON + Base64"""
+    inbound_message = json.dumps({
+        "mime_type": "audio/pcm",
+        "data": base64.b64encode(inbound).decode("ascii"),
+    })
+    wire_bytes = 0
+    start = time.process_time()
+    for _ in range(frames):
+        message = json.dumps({
+            "mime_type": "audio/pcm",
+            "data": base64.b64encode(outbound).decode("ascii"),
+        })
+        wire_bytes += len(message)
+        decoded = json.loads(inbound_message)
+        base64.b64decode(decoded["data"])
+        wire_bytes += len(inbound_message)
+    return time.process_time() - start, wire_bytes
+
+
+def binary_mode(outbound, inbound, frames):
+    """Encodes outbound and decodes inbound audio as binary frames"""
+    inbound_frame = encode_frame(FRAME_AUDIO_PCM, inbound)
+    wire_bytes = 0
+    start = time.process_time()
+    for sequence in range(frames):
+        frame = encode_frame(FRAME_AUDIO_PCM, outbound, sequence)
+        wire_bytes += len(frame)
+        decode_frame(inbound_frame)
+        wire_bytes += len(inbound_frame)
+    return time.process_time() - start, wire_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="JSON + Base64 vs. binary WebSocket audio frames")
+    parser.add_argument("--seconds", type=int, default=600,
+                        help="Seconds of simulated two-way audio per stream")
+    args = parser.parse_args()
+
+    frames = args.seconds * 1000 // FRAME_MS
+    outbound = pcm_chunk(AGENT_SAMPLE_RATE)
+    inbound = pcm_chunk(CLIENT_SAMPLE_RATE)
+
+    print(f"{args.seconds}s of audio per stream, {FRAME_MS}ms frames "
+          f"({len(outbound)} bytes out / {len(inbound)} bytes in per frame)")
+    print(f"{'mode':<8} {'CPU ms/s audio':>15} {'us/frame':>10} {'wire KB/s':>10}")
+    results = {}
+    for name, run in (("json", json_mode), ("binary", binary_mode)):
+        cpu, wire_bytes = run(outbound, inbound, frames)
+        results[name] = (cpu, wire_bytes)
+        print(f"{name:<8} {cpu * 1000 / args.seconds:>15.3f} "
+              f"{cpu * 1e6 / frames:>10.2f} "
+              f"{wire_bytes / args.seconds / 1024:>10.1f}")
+
+    json_cpu, json_bytes = results["json"]
+    binary_cpu, binary_bytes = results["binary"]
+    print(f"binary frames use {binary_cpu / json_cpu:.1%} of the JSON CPU time "
+          f"and {binary_bytes / json_bytes:.1%} of the JSON wire bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Memory allocated per inbound audio message, from the parsed client message
+# to the Blob in the LiveRequestQueue:
+#
+#   json    Base64 from a JSON text frame, with base64.b64decode as the app
+#           used to, and with binascii.a2b_base64 straight from the str
+#   binary  PCM binary frame (?binary=true)
+#   opus    Opus binary frame (?codec=opus), with the packet and plane copies
+#           the decoder used to make, and with packet views and the PCM
+#           buffer it reuses; needs PyAV
+#
+# tracemalloc measures every message on its own: "peak" is the most memory
+# the message had allocated at once on its way in, "kept" what stays
+# allocated while its Blob waits in the queue, and "objects" the objects it
+# keeps that the garbage collector tracks. The binary path is the floor: the
+# Blob holds one copy of the PCM, since the live model only takes bytes and
+# the queue keeps them until the model connection sends them.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_inbound_audio --messages 2000
+
+import argparse
+import base64
+import binascii
+import gc
+import time
+import tracemalloc
+
+from google.adk.agents import LiveRequestQueue
+from google.genai.types import Blob
+
+from audio_codec import (
+    OpusDecoder,
+    OpusEncoder,
+    SAMPLE_WIDTH,
+    av,
+    opus_available,
+    pack_packets,
+    unpack_packets,
+)
+from binary_frames import FRAME_AUDIO_OPUS, FRAME_AUDIO_PCM, decode_frame, encode_frame
+from fake_live_model import tone
+
+# Microphone audio: 16 kHz 16-bit mono, sent every 200 ms like app.js
+INPUT_SAMPLE_RATE = 16000
+BATCH_MS = 200
+
+
+def binary_payload(frame):
+    return decode_frame(frame)[3]
+
+
+def copying_opus(decoder):
+    """OpusDecoder.decode as it was, with a copy of every packet and plane"""
+    def decode(frame):
+        pcm = []
+        for packet in unpack_packets(decode_frame(frame)[3]):
+            for av_frame in decoder._context.decode(av.Packet(bytes(packet))):
+                frames = decoder._resampler.resample(av_frame) if decoder._resampler else [av_frame]
+                for pcm_frame in frames:
+                    pcm.append(bytes(pcm_frame.planes[0])[:pcm_frame.samples * SAMPLE_WIDTH])
+        return b"".join(pcm)
+    return decode
+
+
+def current_opus(decoder):
+    def decode(frame):
+        return decoder.decode(unpack_packets(decode_frame(frame)[3]))
+    return decode
+
+
+def measure(decode, message, count):
+    """Returns peak and kept bytes, kept objects and microseconds per message"""
+    queue = LiveRequestQueue()
+    peak_total = kept_total = 0
+    tracemalloc.start()
+    for _ in range(count):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        queue.send_realtime(Blob(data=decode(message), mime_type="audio/pcm"))
+        current, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - before
+        kept_total += current - before
+    tracemalloc.stop()
+
+    # Timed without tracemalloc, which slows allocations down
+    queue = LiveRequestQueue()
+    gc.collect()
+    gc.disable()
+    objects = len(gc.get_objects())
+    start = time.perf_counter()
+    for _ in range(count):
+        queue.send_realtime(Blob(data=decode(message), mime_type="audio/pcm"))
+    elapsed = time.perf_counter() - start
+    objects = len(gc.get_objects()) - objects
+    gc.enable()
+    return peak_total / count, kept_total / count, objects / count, elapsed * 1e6 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations of the inbound audio path")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per path")
+    args = parser.parse_args()
+
+    pcm = tone(INPUT_SAMPLE_RATE * BATCH_MS // 1000, 300, INPUT_SAMPLE_RATE)
+    base64_data = base64.b64encode(pcm).decode("ascii")
+    paths = [
+        ("json", "b64decode", base64_data, base64.b64decode),
+        ("json", "a2b", base64_data, binascii.a2b_base64),
+        ("binary", "", encode_frame(FRAME_AUDIO_PCM, pcm), binary_payload),
+    ]
+    if opus_available():
+        encoder = OpusEncoder(INPUT_SAMPLE_RATE)
+        opus_frame = encode_frame(FRAME_AUDIO_OPUS, pack_packets(encoder.encode(pcm)))
+        paths += [
+            ("opus", "copying", opus_frame, copying_opus(OpusDecoder(INPUT_SAMPLE_RATE))),
+            ("opus", "buffer", opus_frame, current_opus(OpusDecoder(INPUT_SAMPLE_RATE))),
+        ]
+    else:
+        print("PyAV is not installed, skipping opus")
+
+    print(f"{args.messages} messages of {BATCH_MS} ms audio ({len(pcm)} bytes of PCM) per path")
+    print(f"{'path':<8} {'':<10} {'peak B/msg':>11} {'kept B/msg':>11} "
+          f"{'objects/msg':>12} {'us/msg':>8}")
+    for name, variant, message, decode in paths:
+        peak, kept, objects, micros = measure(decode, message, args.messages)
+        print(f"{name:<8} {variant:<10} {peak:>11.0f} {kept:>11.0f} "
+              f"{objects:>12.1f} {micros:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# How long a typed message waits behind microphone audio when the model
+# connection can't keep up with it, with and without request lanes:
+#
+#   lanes  text goes ahead of audio, and audio beyond AUDIO_LANE_MAX_MS
+#          waiting is shed (the defaults)
+#   fifo   REQUEST_LANES=false, AUDIO_LANE_MAX_MS=0: requests go to the
+#          model in arrival order and no audio is shed, like with a plain
+#          LiveRequestQueue
+#
+# Every client streams real-time microphone audio in 20 ms binary frames and
+# sends a text message every --text-every seconds. The fake model takes the
+# audio at --model-speed times real time, so it falls behind. "text answer"
+# is the time from sending the text to the first message of its answer; the
+# lane waits are the means of the server's lane_wait histograms.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_lanes --clients 20 --seconds 20
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.request
+
+import websockets
+
+from benchmarks.common import format_latencies, start_fake_server, wait_for_port
+from binary_frames import FRAME_AUDIO_PCM, FrameSequencer, encode_frame
+
+HOST = "127.0.0.1"
+MODES = ("lanes", "fifo")
+
+# Microphone audio: 16 kHz 16-bit mono in 20 ms frames
+AUDIO_BYTES_PER_SECOND = 32000
+FRAME_SECONDS = 0.02
+
+
+class Totals:
+    def __init__(self):
+        self.text_latencies = []
+        self.unanswered = 0
+        self.errors = 0
+
+
+async def client(args, user_id, totals):
+    url = f"ws://{HOST}:{args.port}/ws/{user_id}?is_audio=false&binary=true"
+    frame_audio = bytes(int(AUDIO_BYTES_PER_SECOND * FRAME_SECONDS))
+    sent_at = []
+
+    async def read_answers(websocket):
+        async for message in websocket:
+            # The first message of an answer; only text starts a turn
+            if sent_at and '"data"' in message:
+                totals.text_latencies.append(time.perf_counter() - sent_at.pop(0))
+                async for message in websocket:
+                    if '"turn_complete":true' in message:
+                        break
+
+    try:
+        async with websockets.connect(url, compression=None) as websocket:
+            await websocket.recv()  # the audio_codec message
+            reader = asyncio.create_task(read_answers(websocket))
+            sequencer = FrameSequencer()
+            start = time.perf_counter()
+            next_text = start + args.text_every
+            frames = 0
+            while time.perf_counter() - start < args.seconds:
+                if time.perf_counter() >= next_text:
+                    sent_at.append(time.perf_counter())
+                    await websocket.send(json.dumps({"mime_type": "text/plain", "data": "hi"}))
+                    next_text += args.text_every
+                await websocket.send(encode_frame(
+                    FRAME_AUDIO_PCM, frame_audio, sequencer.next()
+                ))
+                frames += 1
+                # Real time: the next frame when the microphone has it
+                await asyncio.sleep(max(0.0, start + frames * FRAME_SECONDS - time.perf_counter()))
+            # Answers to the last messages may still be on their way
+            await asyncio.sleep(args.text_every)
+            totals.unanswered += len(sent_at)
+            reader.cancel()
+    except (OSError, websockets.WebSocketException):
+        totals.errors += 1
+
+
+def lane_waits(port):
+    """Returns the mean wait per lane from the server's histograms"""
+    with urllib.request.urlopen(f"http://{HOST}:{port}/metrics") as response:
+        metrics = response.read().decode()
+    values = {}
+    for line in metrics.splitlines():
+        for name in ("sum", "count"):
+            prefix = f'adk_streaming_lane_wait_seconds_{name}{{lane="'
+            if line.startswith(prefix):
+                lane = line[len(prefix):].split('"')[0]
+                values.setdefault(lane, {})[name] = float(line.split()[1])
+    return {
+        lane: value["sum"] / value["count"]
+        for lane, value in values.items() if value.get("count")
+    }
+
+
+def lane_stats(port):
+    with urllib.request.urlopen(f"http://{HOST}:{port}/stats/lanes") as response:
+        stats = json.loads(response.read())
+    return sum(queue["shed_audio_ms"] for queue in stats.values())
+
+
+def run_mode(args, mode):
+    server = start_fake_server(args.port, env={
+        "LOG_MODE": "metrics",
+        "REQUEST_LANES": "true" if mode == "lanes" else "false",
+        "AUDIO_LANE_MAX_MS": "2000" if mode == "lanes" else "0",
+        "FAKE_REALTIME_BYTES_PER_SECOND": str(AUDIO_BYTES_PER_SECOND * args.model_speed),
+        # Only the text messages start turns
+        "FAKE_AUDIO_BYTES_PER_TURN": str(10 ** 12),
+        "FAKE_TEXT_CHUNKS": "1",
+    })
+    totals = Totals()
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+
+        async def run_clients():
+            clients = [
+                asyncio.create_task(client(args, user_id, totals))
+                for user_id in range(args.clients)
+            ]
+            # Read the shed audio while the connections are open
+            await asyncio.sleep(args.seconds - 0.5)
+            shed_ms = await asyncio.to_thread(lane_stats, args.port)
+            await asyncio.gather(*clients)
+            return shed_ms
+
+        shed_ms = asyncio.run(run_clients())
+        waits = lane_waits(args.port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{mode:>5}: {len(totals.text_latencies)} text messages answered, "
+          f"{totals.unanswered} unanswered, {totals.errors} errors, "
+          f"{shed_ms / 1000:.1f}s of audio shed")
+    print(f"{'':>7}text answer: {format_latencies(totals.text_latencies)}")
+    print(f"{'':>7}mean lane wait: " + ", ".join(
+        f"{lane} {seconds * 1000:.1f}ms" for lane, seconds in sorted(waits.items())
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text latency under audio load, with lanes and FIFO")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent microphones")
+    parser.add_argument("--seconds", type=float, default=20, help="Streaming time per client")
+    parser.add_argument("--text-every", type=float, default=2, help="Seconds between text messages")
+    parser.add_argument("--model-speed", type=float, default=0.8,
+                        help="How fast the fake model takes audio, relative to real time")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8890)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, model at {args.model_speed:g}x real time, "
+          f"{os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Server cost of the same live sessions with a WebSocket each, and
+# multiplexed over a few sockets to /ws-mux (see multiplexer.py):
+#
+#   sockets  one /ws/{user_id} connection per session
+#   mux      the sessions spread over --sockets connections to /ws-mux
+#
+# Every session talks in text turns on the fake model, which answers with
+# text and audio, and measures the time from its message to turn_complete.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_mux --sessions 200 --sockets 4
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import websockets
+
+from benchmarks.common import ProcessMonitor, format_latencies, start_fake_server, wait_for_port
+
+HOST = "127.0.0.1"
+MODES = ("sockets", "mux")
+
+
+class Totals:
+    def __init__(self):
+        self.turns = 0
+        self.errors = 0
+        self.turn_latencies = []
+
+
+async def talk(send, replies, args, totals):
+    """Runs the turns of one session; replies yields its decoded messages"""
+    message = {"mime_type": "text/plain", "data": "hi"}
+    for _ in range(args.turns):
+        start = time.perf_counter()
+        await send(message)
+        while not (await replies.get()).get("turn_complete"):
+            pass
+        totals.turn_latencies.append(time.perf_counter() - start)
+        totals.turns += 1
+        await asyncio.sleep(args.think)
+
+
+async def socket_session(args, user_id, totals, ready):
+    url = f"ws://{HOST}:{args.port}/ws/{user_id}?is_audio=false"
+    try:
+        async with websockets.connect(url, compression=None, max_queue=None) as websocket:
+            await websocket.recv()  # the audio_codec message
+            replies = asyncio.Queue()
+
+            async def read():
+                async for reply in websocket:
+                    replies.put_nowait(json.loads(reply))
+
+            reader = asyncio.create_task(read())
+            ready.release()
+            await talk(lambda message: websocket.send(json.dumps(message)), replies, args, totals)
+            reader.cancel()
+    except (OSError, websockets.WebSocketException):
+        totals.errors += 1
+        ready.release()
+
+
+async def mux_socket(args, channel_ids, totals, ready):
+    url = f"ws://{HOST}:{args.port}/ws-mux"
+    try:
+        async with websockets.connect(url, compression=None, max_queue=None) as websocket:
+            replies = {channel_id: asyncio.Queue() for channel_id in channel_ids}
+
+            async def read():
+                async for reply in websocket:
+                    envelope = json.loads(reply)
+                    replies[envelope["channel"]].put_nowait(envelope.get("message", envelope))
+
+            reader = asyncio.create_task(read())
+            for channel_id in channel_ids:
+                await websocket.send(json.dumps({
+                    "channel": channel_id, "open": {"user_id": str(channel_id)},
+                }))
+            for channel_id in channel_ids:
+                await replies[channel_id].get()  # opened
+                ready.release()
+
+            def sender(channel_id):
+                return lambda message: websocket.send(json.dumps({
+                    "channel": channel_id, "message": message,
+                }))
+
+            await asyncio.gather(*(
+                talk(sender(channel_id), replies[channel_id], args, totals)
+                for channel_id in channel_ids
+            ))
+            reader.cancel()
+    except (OSError, websockets.WebSocketException):
+        totals.errors += 1
+        for _ in channel_ids:
+            ready.release()
+
+
+async def run_load(args, mode, server):
+    totals = Totals()
+    monitor = ProcessMonitor([server.pid])
+    ready = asyncio.Semaphore(0)
+    if mode == "sockets":
+        sessions = [socket_session(args, user_id, totals, ready) for user_id in range(args.sessions)]
+    else:
+        sessions = [
+            mux_socket(args, range(socket, args.sessions, args.sockets), totals, ready)
+            for socket in range(args.sockets)
+        ]
+    clients = asyncio.gather(*sessions)
+    for _ in range(args.sessions):
+        await ready.acquire()
+    idle_rss = monitor.rss_mb()
+    monitor.start()
+    start = time.perf_counter()
+    await clients
+    elapsed = time.perf_counter() - start
+    cpu = await monitor.stop()
+    return totals, elapsed, cpu, idle_rss, monitor.peak_rss_mb
+
+
+def run_mode(args, mode):
+    server = start_fake_server(args.port, env={
+        "LOG_MODE": "metrics",
+        "FAKE_TEXT_CHUNKS": "5",
+        "FAKE_AUDIO_CHUNKS": "5",
+    })
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+        base_rss = ProcessMonitor([server.pid]).rss_mb()
+        totals, elapsed, cpu, idle_rss, peak_rss = asyncio.run(run_load(args, mode, server))
+    finally:
+        server.terminate()
+        server.wait()
+
+    sockets = args.sessions if mode == "sockets" else args.sockets
+    print(f"{mode:>8}: {sockets} sockets, {totals.turns} turns in {elapsed:.1f}s, "
+          f"{totals.errors} errors, server CPU {cpu / elapsed:.0%} of a core")
+    print(f"{'':>10}RSS with the sessions open {idle_rss - base_rss:+.1f} MB "
+          f"({(idle_rss - base_rss) * 1024 / args.sessions:.0f} KB per session), "
+          f"peak {peak_rss:.0f} MB")
+    print(f"{'':>10}message to turn_complete: {format_latencies(totals.turn_latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessions per socket vs. multiplexed")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent live sessions")
+    parser.add_argument("--sockets", type=int, default=4, help="Sockets to /ws-mux")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--think", type=float, default=0.5, help="Pause between turns")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8860)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
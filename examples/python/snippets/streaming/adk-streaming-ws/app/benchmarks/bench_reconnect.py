@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# What a reconnect storm costs, e.g. after a network blip that drops every
+# client at once, with the live sessions resumed and rebuilt:
+#
+#   resume   RESUMPTION_TTL_SECONDS=600: a reconnecting client resumes its
+#            live session from the handle kept at disconnect
+#   rebuild  RESUMPTION_TTL_SECONDS=0: every reconnect starts a new live
+#            session, which first takes in the conversation so far
+#
+# Every client talks a few text turns, then all connections drop without a
+# close handshake, and the clients reconnect and ask again. The fake model
+# takes --history-delay seconds per content of history to start a new live
+# session, like a model reading in the conversation, and answers a resumed
+# one with "resumed" words. "reconnect" is the time from the new connection
+# to the first message of the answer.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_reconnect --clients 50 --blips 3
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.request
+
+import websockets
+
+from benchmarks.common import format_latencies, start_fake_server, wait_for_port
+
+HOST = "127.0.0.1"
+MODES = ("resume", "rebuild")
+
+
+class Totals:
+    def __init__(self):
+        self.reconnects = 0
+        self.resumed = 0
+        self.errors = 0
+        self.reconnect_latencies = []
+
+
+async def talk(websocket, message):
+    """Sends a message and reads the answer; returns its first text"""
+    await websocket.send(message)
+    first = None
+    async for reply in websocket:
+        if '"turn_complete":true' in reply:
+            return first
+        if first is None:
+            first = json.loads(reply).get("data", "")
+    raise websockets.ConnectionClosed(None, None)
+
+
+async def client(args, user_id, blips, totals):
+    url = f"ws://{HOST}:{args.port}/ws/{user_id}?is_audio=false"
+    message = json.dumps({"mime_type": "text/plain", "data": "hi"})
+    reconnect = False
+    try:
+        for blip in blips:
+            start = time.perf_counter()
+            async with websockets.connect(url, compression=None) as websocket:
+                await websocket.recv()  # the audio_codec message
+                first = await talk(websocket, message)
+                if reconnect:
+                    totals.reconnects += 1
+                    totals.resumed += first.startswith("resumed")
+                    totals.reconnect_latencies.append(time.perf_counter() - start)
+                for _ in range(args.turns - 1):
+                    await talk(websocket, message)
+                # Every client drops at once, without a close handshake
+                await blip.wait()
+                websocket.transport.abort()
+            await asyncio.sleep(args.reconnect_delay)
+            reconnect = True
+    except (OSError, websockets.WebSocketException):
+        totals.errors += 1
+
+
+def resumption_stats(port):
+    with urllib.request.urlopen(f"http://{HOST}:{port}/stats/resumption") as response:
+        return json.loads(response.read())
+
+
+def run_mode(args, mode):
+    server = start_fake_server(args.port, env={
+        "LOG_MODE": "metrics",
+        "RESUMPTION_TTL_SECONDS": "600" if mode == "resume" else "0",
+        "FAKE_HISTORY_DELAY": str(args.history_delay),
+        "FAKE_TEXT_CHUNKS": "5",
+    })
+    totals = Totals()
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+
+        async def run_clients():
+            blips = [asyncio.Event() for _ in range(args.blips + 1)]
+            clients = asyncio.gather(*(
+                client(args, user_id, blips, totals) for user_id in range(args.clients)
+            ))
+            for blip in blips[:-1]:
+                await asyncio.sleep(args.blip_every)
+                blip.set()
+            blips[-1].set()
+            await clients
+
+        asyncio.run(run_clients())
+        stats = resumption_stats(args.port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{mode:>7}: {totals.resumed}/{totals.reconnects} sessions resumed, "
+          f"{totals.errors} errors, store {stats}")
+    print(f"{'':>9}reconnect: {format_latencies(totals.reconnect_latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconnect storms with and without resumption")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--blips", type=int, default=3, help="Times every connection drops")
+    parser.add_argument("--blip-every", type=float, default=5,
+                        help="Seconds between blips; the turns have to fit in it")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per connection")
+    parser.add_argument("--reconnect-delay", type=float, default=0.5,
+                        help="Seconds a client waits before reconnecting")
+    parser.add_argument("--history-delay", type=float, default=0.05,
+                        help="Seconds per content for the fake model to take in the history")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8880)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.blips} blips, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Opens many concurrent simulated connections against the fake live model and
+# compares a new InMemoryRunner per connection with the shared RunnerRegistry.
+# Each mode runs in its own process so the RSS numbers don't mix.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_runner_registry --connections 1000
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import InMemoryRunner
+from google.genai.types import Content, Part
+
+from benchmarks.common import current_rss_mb, format_latencies
+from fake_live_model import create_fake_agent
+from runner_registry import RunnerRegistry
+
+APP_NAME = "ADK Streaming benchmark"
+MODES = ("per_connection", "registry")
+
+
+async def simulate_connection(setup, user_id, setup_latencies, turn_latencies, hold):
+    """Connects one simulated client, runs one turn and holds the session open"""
+    start = time.perf_counter()
+    runner, session = await setup(user_id)
+    live_request_queue = LiveRequestQueue()
+    live_events = runner.run_live(
+        session=session,
+        live_request_queue=live_request_queue,
+        run_config=RunConfig(response_modalities=["TEXT"]),
+    )
+    setup_latencies.append(time.perf_counter() - start)
+
+    first_turn = asyncio.Event()
+
+    async def receive():
+        async for event in live_events:
+            if event.turn_complete and not first_turn.is_set():
+                turn_latencies.append(time.perf_counter() - start)
+                first_turn.set()
+
+    receive_task = asyncio.create_task(receive())
+    live_request_queue.send_content(Content(role="user", parts=[Part.from_text(text="hi")]))
+    await first_turn.wait()
+
+    # Keep the session open until every client has connected
+    await hold.wait()
+    live_request_queue.close()
+    receive_task.cancel()
+    await asyncio.gather(receive_task, return_exceptions=True)
+
+
+async def run(mode, connections):
+    agent = create_fake_agent()
+    registry = RunnerRegistry()
+
+    async def per_connection(user_id):
+        runner = InMemoryRunner(app_name=APP_NAME, agent=agent)
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME, user_id=user_id
+        )
+        return runner, session
+
+    async def shared(user_id):
+        runner = registry.get_runner(APP_NAME, agent)
+        session = await registry.get_or_create_session(APP_NAME, user_id)
+        return runner, session
+
+    setup = per_connection if mode == "per_connection" else shared
+    setup_latencies, turn_latencies = [], []
+    hold = asyncio.Event()
+    rss_before = current_rss_mb()
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.create_task(simulate_connection(
+            setup, str(i), setup_latencies, turn_latencies, hold
+        ))
+        for i in range(connections)
+    ]
+    while len(turn_latencies) < connections:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    rss_connected = current_rss_mb()
+
+    hold.set()
+    await asyncio.gather(*tasks)
+
+    print(f"[{mode}] {connections} connections in {elapsed:.2f}s")
+    print(f"[{mode}] setup latency:      {format_latencies(setup_latencies)}")
+    print(f"[{mode}] first turn latency: {format_latencies(turn_latencies)}")
+    print(f"[{mode}] RSS: {rss_before:.1f}MB idle, {rss_connected:.1f}MB connected "
+          f"({(rss_connected - rss_before) * 1024 / connections:.1f}KB per connection)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-connection InMemoryRunner vs. shared RunnerRegistry")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--mode", choices=MODES,
+                        help="Run a single mode in this process")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run(args.mode, args.connections))
+        return
+
+    for mode in MODES:
+        subprocess.run([
+            sys.executable, "-m", "benchmarks.bench_runner_registry",
+            "--connections", str(args.connections), "--mode", mode,
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import math
+import os
+import resource
+import subprocess
+import sys
+
+
+def current_rss_mb():
+    """Returns the resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: fall back to the peak RSS (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def process_cpu_seconds(pid):
+    """Returns the user plus system CPU time of a process, or None if /proc
+    is not available"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            # Skip the command name, which may contain spaces
+            fields = stat.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def process_rss_mb(pid):
+    """Returns the resident set size of a process in MB, or None if /proc is
+    not available"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid):
+    """Returns the IDs of the child processes of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            return [int(child) for child in children.read().split()]
+    except OSError:
+        return []
+
+
+def start_fake_server(port, workers=1, env=None):
+    """Starts the app on the fake live model (benchmarks/fake_app.py), behind
+    serve.py if there is more than one worker; its logs are discarded"""
+    if workers > 1:
+        command = [
+            sys.executable, "serve.py", "--workers", str(workers),
+            "--port", str(port), "--worker-base-port", str(port + 1),
+            "--app", "benchmarks.fake_app:app",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app",
+            "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ]
+    return subprocess.Popen(
+        command,
+        env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_port(host, port, process=None):
+    """Waits until a server accepts connections"""
+    while True:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("The server exited during startup")
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        writer.close()
+        return
+
+
+def percentile(values, pct):
+    """Returns the pct-th percentile of values (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def format_latencies(values, unit="ms", scale=1000):
+    """Formats p50/p95/p99/max of latencies given in seconds"""
+    return " ".join(
+        f"p{pct}={percentile(values, pct) * scale:.2f}{unit}" for pct in (50, 95, 99)
+    ) + f" max={max(values, default=0) * scale:.2f}{unit}"
+
+
+class ProcessMonitor:
+    """Samples the CPU time and the RSS of server processes"""
+
+    def __init__(self, pids, interval=0.5):
+        self.pids = pids
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self._cpu_start = None
+        self._task = None
+
+    def cpu_seconds(self):
+        return sum(process_cpu_seconds(pid) or 0.0 for pid in self.pids)
+
+    def rss_mb(self):
+        return sum(process_rss_mb(pid) or 0.0 for pid in self.pids)
+
+    def start(self):
+        self._cpu_start = self.cpu_seconds()
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        """Stops sampling and returns the CPU seconds used since start()"""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return self.cpu_seconds() - self._cpu_start
+
+    async def _sample(self):
+        while True:
+            self.peak_rss_mb = max(self.peak_rss_mb, self.rss_mb())
+            await asyncio.sleep(self.interval)
+
+
+class LoadStats:
+    """Latencies and counters of the simulated clients of a load test"""
+
+    def __init__(self):
+        self.connected = 0
+        self.errors = 0
+        self.turns = 0
+        self.timeouts = 0
+        self.first_byte_latencies = []
+        self.message_latencies = []
+        self.text_messages = 0
+        self.audio_bytes = 0
+        self.dropped_text = 0
+        self.dropped_audio_bytes = 0
+
+    def record_text(self, text, now):
+        """Counts a text message and the latency of its stamped chunks"""
+        self.text_messages += 1
+        for word in text.split():
+            _, _, stamp = word.partition("@")
+            if stamp:
+                self.message_latencies.append(now - float(stamp))
+
+    def end_turn(self, text_messages, audio_bytes, expected_text, expected_audio_bytes):
+        """Counts a complete turn and what it is missing"""
+        self.turns += 1
+        self.dropped_text += max(0, expected_text - text_messages)
+        self.dropped_audio_bytes += max(0, expected_audio_bytes - audio_bytes)
+
+    def report(self, elapsed, cpu=None, peak_rss_mb=None):
+        print(f"clients connected   {self.connected}, errors {self.errors}")
+        print(f"turns               {self.turns} ({self.turns / elapsed:.1f}/s), "
+              f"{self.timeouts} timed out")
+        print(f"first byte latency  {format_latencies(self.first_byte_latencies)}")
+        print(f"message latency     {format_latencies(self.message_latencies)}")
+        print(f"received            {self.text_messages} text messages, "
+              f"{self.audio_bytes / 1e6:.1f} MB audio")
+        print(f"dropped             {self.dropped_text} text messages, "
+              f"{self.dropped_audio_bytes / 1e6:.1f} MB audio")
+        if cpu is not None:
+            print(f"server CPU          {cpu / elapsed:.0%} of a core")
+        if peak_rss_mb:
+            print(f"server peak RSS     {peak_rss_mb:.0f} MB")
@@ -0,0 +1,235 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Load test of the WebSocket app for capacity planning without a Gemini
+# endpoint. The app runs on the fake live model (benchmarks/fake_app.py),
+# configured from the command line, and N simulated clients each hold a
+# WebSocket with binary audio frames and take turns: a text message (or a
+# second of audio in 20 ms frames), then the agent's answer up to
+# turn_complete, then a pause.
+#
+# Reported: first byte latency (end of the user turn to the first agent
+# message), message latency (fake model send to client receive, from the
+# stamped text chunks), server CPU and peak RSS, and dropped messages
+# (missing from complete turns).
+#
+# Run from the app folder:
+#   python -m benchmarks.load_test --clients 200 --duration 30
+#   python -m benchmarks.load_test --clients 100 --mode audio --audio-chunks 50
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import websockets
+
+from benchmarks.common import (
+    LoadStats,
+    ProcessMonitor,
+    child_pids,
+    start_fake_server,
+    wait_for_port,
+)
+from binary_frames import FRAME_AUDIO_PCM, FRAME_HEADER_SIZE, FrameSequencer, encode_frame
+
+HOST = "127.0.0.1"
+
+# Microphone audio: 16 kHz 16-bit mono in 20 ms chunks
+INPUT_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_MS = 20
+
+
+class WsClient:
+    """One simulated browser on a WebSocket with binary audio frames"""
+
+    def __init__(self, user_id, args, stats):
+        self.user_id = user_id
+        self.args = args
+        self.stats = stats
+        self._turn_start = None
+        self._turn_done = asyncio.Event()
+        self._first_byte = False
+        self._text_messages = 0
+        self._audio_bytes = 0
+
+    async def run(self, deadline):
+        args = self.args
+        is_audio = "true" if args.mode == "audio" else "false"
+        url = f"ws://{HOST}:{args.port}/ws/{self.user_id}?is_audio={is_audio}&binary=true"
+        reader = None
+        try:
+            async with websockets.connect(url, max_size=None, compression=None) as websocket:
+                reader = asyncio.create_task(self._read_messages(websocket))
+                self.stats.connected += 1
+
+                while time.perf_counter() < deadline:
+                    self._start_turn()
+                    if args.mode == "audio":
+                        await self._send_audio_turn(websocket)
+                    else:
+                        self._turn_start = time.perf_counter()
+                        await websocket.send(
+                            json.dumps({"mime_type": "text/plain", "data": "hi"})
+                        )
+                    try:
+                        await asyncio.wait_for(self._turn_done.wait(), args.turn_timeout)
+                    except asyncio.TimeoutError:
+                        self.stats.timeouts += 1
+                    else:
+                        self.stats.end_turn(
+                            self._text_messages, self._audio_bytes,
+                            args.text_chunks, args.audio_chunks * args.audio_chunk_bytes,
+                        )
+                    await asyncio.sleep(args.think)
+                reader.cancel()
+        except (OSError, websockets.WebSocketException) as e:
+            self.stats.errors += 1
+            print(f"Client #{self.user_id} failed: {e!r}")
+        finally:
+            if reader:
+                reader.cancel()
+
+    def _start_turn(self):
+        self._turn_start = None
+        self._turn_done = asyncio.Event()
+        self._first_byte = False
+        self._text_messages = 0
+        self._audio_bytes = 0
+
+    async def _send_audio_turn(self, websocket):
+        """Streams one turn of audio in real time, one frame per chunk"""
+        chunk = bytes(INPUT_SAMPLE_RATE * SAMPLE_WIDTH * CHUNK_MS // 1000)
+        sequencer = FrameSequencer()
+        sent = 0
+        next_send = time.perf_counter()
+        while sent < self.args.audio_bytes_per_turn:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await websocket.send(encode_frame(FRAME_AUDIO_PCM, chunk, sequencer.next()))
+            sent += len(chunk)
+            next_send += CHUNK_MS / 1000
+        self._turn_start = time.perf_counter()
+
+    async def _read_messages(self, websocket):
+        async for frame in websocket:
+            now = time.perf_counter()
+            if isinstance(frame, bytes):
+                self._on_first_byte(now)
+                size = len(frame) - FRAME_HEADER_SIZE
+                self._audio_bytes += size
+                self.stats.audio_bytes += size
+                continue
+
+            message = json.loads(frame)
+            if message.get("turn_complete") or message.get("interrupted"):
+                if self._turn_start is not None:
+                    self._turn_done.set()
+            elif message.get("mime_type") == "text/plain":
+                self._on_first_byte(now)
+                # A replacement carries the full text of a turn whose partial
+                # texts were dropped; the drops are counted at the turn end
+                if not message.get("replace"):
+                    self._text_messages += 1
+                    self.stats.record_text(message["data"], time.time())
+
+    def _on_first_byte(self, now):
+        if self._turn_start is not None and not self._first_byte:
+            self._first_byte = True
+            self.stats.first_byte_latencies.append(now - self._turn_start)
+
+
+async def run_load(args, pids):
+    stats = LoadStats()
+    monitor = ProcessMonitor(pids) if pids else None
+    if monitor:
+        monitor.start()
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    async def start_client(user_id):
+        # Spread the connections over the ramp up
+        await asyncio.sleep(args.ramp * user_id / args.clients)
+        await WsClient(user_id, args, stats).run(deadline)
+
+    await asyncio.gather(*(start_client(user_id) for user_id in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    cpu = await monitor.stop() if monitor else None
+    stats.report(elapsed, cpu, monitor.peak_rss_mb if monitor else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test of the WebSocket app on the fake live model")
+    parser.add_argument("--clients", type=int, default=100,
+                        help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="Seconds of load, ramp up included")
+    parser.add_argument("--ramp", type=float, default=5,
+                        help="Seconds over which the clients connect")
+    parser.add_argument("--mode", choices=("text", "audio"), default="text",
+                        help="What the clients send each turn")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="Pause between turns")
+    parser.add_argument("--turn-timeout", type=float, default=10,
+                        help="Seconds to wait for turn_complete")
+    parser.add_argument("--port", type=int, default=8810)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Run the app in this many workers behind serve.py")
+    parser.add_argument("--external", action="store_true",
+                        help="Load an already running server on --port, with "
+                             "a matching fake model config; CPU and RSS are "
+                             "not measured")
+    model = parser.add_argument_group("fake live model")
+    model.add_argument("--first-response-delay", type=float, default=0.05)
+    model.add_argument("--text-chunks", type=int, default=5)
+    model.add_argument("--text-chunk-interval", type=float, default=0.01)
+    model.add_argument("--audio-chunks", type=int, default=0)
+    model.add_argument("--audio-chunk-bytes", type=int, default=960)
+    model.add_argument("--audio-chunk-interval", type=float, default=0.02)
+    model.add_argument("--audio-bytes-per-turn", type=int, default=32000,
+                       help="User audio that ends a turn in audio mode")
+    args = parser.parse_args()
+
+    print(f"{args.clients} {args.mode} clients, {args.duration:.0f} s, "
+          f"{args.workers} worker(s), {os.cpu_count()} CPUs")
+    if args.external:
+        asyncio.run(run_load(args, None))
+        return
+
+    server = start_fake_server(args.port, args.workers, {
+        "LOG_MODE": "metrics",
+        "FAKE_FIRST_RESPONSE_DELAY": str(args.first_response_delay),
+        "FAKE_TEXT_CHUNKS": str(args.text_chunks),
+        "FAKE_TEXT_CHUNK_INTERVAL": str(args.text_chunk_interval),
+        "FAKE_AUDIO_CHUNKS": str(args.audio_chunks),
+        "FAKE_AUDIO_CHUNK_BYTES": str(args.audio_chunk_bytes),
+        "FAKE_AUDIO_CHUNK_INTERVAL": str(args.audio_chunk_interval),
+        "FAKE_AUDIO_BYTES_PER_TURN": str(args.audio_bytes_per_turn),
+        "FAKE_STAMP_TEXT": "true",
+    })
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+        pids = [server.pid] + child_pids(server.pid)
+        asyncio.run(run_load(args, pids))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+
+#
+# Binary WebSocket frames
+#
+# When a client connects with `?binary=true`, PCM audio travels as binary
+# WebSocket frames instead of Base64 inside JSON. Every binary frame starts
+# with a 4 byte header (network byte order) followed by the raw payload:
+#
+#   +--------+--------+----------------+-------------------
+#   |  type  |  turn  |    sequence    |  payload ...
+#   | uint8  | uint8  |    uint16      |
+#   +--------+--------+----------------+-------------------
+#
+# `turn` is the low 8 bits of the number of the agent turn the audio belongs
+# to, so the client can drop the audio of an interrupted turn. Frames from the
+# client carry 0.
+#
+# Control messages (turn_complete, interrupted) and text stay JSON text frames.
+#
+
+FRAME_HEADER = struct.Struct("!BBH")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+# Frame types
+FRAME_AUDIO_PCM = 0x01
+# Length-prefixed Opus packets, see audio_codec.py
+FRAME_AUDIO_OPUS = 0x02
+
+FRAME_MIME_TYPES = {
+    FRAME_AUDIO_PCM: "audio/pcm",
+    FRAME_AUDIO_OPUS: "audio/opus",
+}
+
+
+def encode_frame(frame_type, payload, sequence=0, turn=0):
+    """Encodes a binary frame"""
+    return FRAME_HEADER.pack(frame_type, turn & 0xFF, sequence & 0xFFFF) + payload
+
+
+def decode_frame(frame):
+    """Decodes a binary frame into (frame_type, turn, sequence, payload)"""
+    if len(frame) < FRAME_HEADER_SIZE:
+        raise ValueError(f"Binary frame too short: {len(frame)} bytes")
+    frame_type, turn, sequence = FRAME_HEADER.unpack_from(frame)
+    return frame_type, turn, sequence, frame[FRAME_HEADER_SIZE:]
+
+
+class FrameSequencer:
+    """Hands out wrapping 16-bit sequence numbers for one direction of a socket"""
+
+    def __init__(self):
+        self._next = 0
+
+    def next(self):
+        sequence = self._next
+        self._next = (self._next + 1) & 0xFFFF
+        return sequence
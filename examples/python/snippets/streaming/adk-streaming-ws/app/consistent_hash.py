@@ -0,0 +1,47 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import hashlib
+
+
+def _hash(key):
+    # A stable hash: Python's hash() of a str differs between processes
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of keys to nodes.
+
+    Every node is placed on the ring `replicas` times, and a key belongs to
+    the first node clockwise from its hash. The mapping only depends on the
+    node names, so every process computes the same owner for a user, and
+    adding or removing a node only moves the keys of about one node's share.
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = list(nodes)
+        self._ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in self._ring]
+
+    def node_for(self, key):
+        """Returns the node that owns `key`"""
+        if not self._ring:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._ring)
+        return self._ring[index][1]
@@ -0,0 +1,288 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import itertools
+import logging
+import re
+
+from consistent_hash import HashRing
+from stream_logging import StreamLog
+
+#
+# Dispatcher
+#
+# The live session of a user (its LiveRequestQueue and the agent task) lives
+# in the memory of one worker process, so every request of that user has to
+# reach the same worker. The dispatcher reads the path of each HTTP/1.1
+# request, hashes the user ID in it onto the worker ring and relays the
+# request and the response bytes as they are: SSE streams stay open, and
+# WebSocket upgrades become a plain byte tunnel to the owning worker.
+# Requests without a user ID (the page, static files) go round robin.
+#
+# A node of the ring keeps its name when its worker is replaced by a process
+# on another port (see `replace_worker`), so users stay on their node while
+# new requests go to the new process.
+#
+# The dispatcher is one single-threaded process that every byte goes
+# through: a demo of user affinity, not a production load balancer. Run the
+# workers behind a load balancer that routes on the user ID instead, e.g.
+# with consistent hashing on the request path.
+#
+
+# Paths that carry the user ID as their second segment
+USER_PATH = re.compile(rb"^/(?:ws|events|send|send_batch)/([^/?]+)")
+
+COPY_SIZE = 65536
+
+BAD_GATEWAY = (
+    b"HTTP/1.1 502 Bad Gateway\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+LENGTH_REQUIRED = (
+    b"HTTP/1.1 411 Length Required\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+BAD_REQUEST = (
+    b"HTTP/1.1 400 Bad Request\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+PAYLOAD_TOO_LARGE = (
+    b"HTTP/1.1 413 Payload Too Large\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+
+def _parse_head(head):
+    lines = head.split(b"\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        if value:
+            headers[name.strip().lower()] = value.strip().lower()
+    return lines[0], headers
+
+
+class Dispatcher:
+    """Routes each user's requests to the worker that owns the user.
+
+    Request bodies are read into memory before they are relayed, so a body
+    over `max_body_size` bytes is refused with 413.
+    """
+
+    def __init__(self, workers, replicas=100, max_body_size=1 << 20, log=None):
+        # workers: list of (host, port)
+        self.workers = {f"{host}:{port}": (host, port) for host, port in workers}
+        self.ring = HashRing(self.workers, replicas)
+        self.max_body_size = max_body_size
+        self.log = log or StreamLog(logging.getLogger(__name__))
+        self._round_robin = itertools.cycle(self.workers)
+
+        # Counters
+        self.requests = {node: 0 for node in self.workers}
+        self.tunnels = 0
+        self.refused = 0
+
+    def replace_worker(self, node, address):
+        """Sends the new requests of a node's users to the worker at
+        `address`; the node's open streams stay on the old worker"""
+        self.workers[node] = address
+
+    def node_for_path(self, path):
+        """Returns the worker for a request path"""
+        match = USER_PATH.match(path)
+        if match:
+            return self.ring.node_for(match.group(1).decode("ascii", "replace"))
+        return next(self._round_robin)
+
+    async def serve(self, host, port):
+        """Accepts client connections until cancelled"""
+        server = await asyncio.start_server(self._handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def stats(self):
+        """Returns the requests routed per worker and the open tunnels"""
+        return {
+            "requests": dict(self.requests),
+            "tunnels": self.tunnels,
+            "refused": self.refused,
+        }
+
+    async def _handle_client(self, reader, writer):
+        # One upstream connection per worker, reused while the client keeps
+        # its connection alive
+        upstreams = {}
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                request_line, headers = _parse_head(head)
+                if headers.get(b"transfer-encoding"):
+                    writer.write(LENGTH_REQUIRED)
+                    return
+                try:
+                    method, path, _ = request_line.split(b" ", 2)
+                    length = int(headers.get(b"content-length", b"0"))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self.refused += 1
+                    writer.write(BAD_REQUEST)
+                    return
+                if length > self.max_body_size:
+                    self.refused += 1
+                    writer.write(PAYLOAD_TOO_LARGE)
+                    return
+                node = self.node_for_path(path)
+                self.requests[node] += 1
+
+                body = await reader.readexactly(length)
+                try:
+                    upstream_reader, upstream_writer, response_head = await self._forward(
+                        upstreams, node, head + body
+                    )
+                except OSError as e:
+                    self.log.error("Worker %s is unreachable: %s", node, e)
+                    writer.write(BAD_GATEWAY)
+                    return
+
+                # Relay the response
+                writer.write(response_head)
+                status_line, response_headers = _parse_head(response_head)
+                status = int(status_line.split(b" ", 2)[1])
+                if status == 101:
+                    # Protocol switch (WebSocket): tunnel both directions
+                    del upstreams[node]
+                    await self._tunnel(reader, writer, upstream_reader, upstream_writer)
+                    return
+                if method == b"HEAD" or status in (204, 304):
+                    pass
+                elif response_headers.get(b"transfer-encoding") == b"chunked":
+                    if not await self._relay_stream(reader, upstream_reader, writer):
+                        return
+                elif b"content-length" in response_headers:
+                    await self._copy_exactly(
+                        upstream_reader, writer, int(response_headers[b"content-length"])
+                    )
+                else:
+                    # The body ends when the worker closes the connection
+                    await self._copy_until_eof(upstream_reader, writer)
+                    return
+                await writer.drain()
+                if response_headers.get(b"connection") == b"close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            for _, upstream_writer in upstreams.values():
+                upstream_writer.close()
+            writer.close()
+
+    async def _forward(self, upstreams, node, request):
+        """Sends a request to the worker and returns its connection and the
+        response head"""
+        upstream = upstreams.pop(node, None)
+        if upstream is not None and (
+            tuple(upstream[1].get_extra_info("peername") or ())[:2] != self.workers[node]
+        ):
+            # The node's worker was replaced since the connection was opened
+            upstream[1].close()
+            upstream = None
+        if upstream is not None:
+            # The worker may have closed an idle keep-alive connection, so
+            # a reused one gets a retry on a new connection
+            try:
+                return await self._exchange(upstreams, node, upstream, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                upstream[1].close()
+        upstream = await asyncio.open_connection(*self.workers[node])
+        return await self._exchange(upstreams, node, upstream, request)
+
+    async def _exchange(self, upstreams, node, upstream, request):
+        upstream_reader, upstream_writer = upstream
+        upstreams[node] = upstream
+        upstream_writer.write(request)
+        await upstream_writer.drain()
+        response_head = await upstream_reader.readuntil(b"\r\n\r\n")
+        return upstream_reader, upstream_writer, response_head
+
+    async def _copy_exactly(self, reader, writer, length):
+        while length > 0:
+            data = await reader.readexactly(min(length, COPY_SIZE))
+            writer.write(data)
+            await writer.drain()
+            length -= len(data)
+
+    async def _relay_stream(self, reader, upstream_reader, writer):
+        """Relays a chunked response, which may be an endless SSE stream;
+        returns False if the client went away first"""
+        # Clients don't send a new request before the response has ended, so
+        # anything read from the client here means it disconnected
+        copy = asyncio.create_task(self._copy_chunked(upstream_reader, writer))
+        client_gone = asyncio.create_task(reader.read(1))
+        try:
+            await asyncio.wait([copy, client_gone], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            client_gone.cancel()
+            if not copy.done():
+                copy.cancel()
+                await asyncio.gather(copy, return_exceptions=True)
+        if copy.cancelled():
+            return False
+        copy.result()
+        return True
+
+    async def _copy_chunked(self, reader, writer):
+        # Chunks are relayed as they arrive, which keeps SSE streams live
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            writer.write(size_line)
+            size = int(size_line.split(b";", 1)[0], 16)
+            if size == 0:
+                # Trailer fields, then the empty line
+                while True:
+                    line = await reader.readuntil(b"\r\n")
+                    writer.write(line)
+                    if line == b"\r\n":
+                        return
+            writer.write(await reader.readexactly(size + 2))
+            await writer.drain()
+
+    async def _copy_until_eof(self, reader, writer):
+        while data := await reader.read(COPY_SIZE):
+            writer.write(data)
+            await writer.drain()
+
+    async def _tunnel(self, reader, writer, upstream_reader, upstream_writer):
+        self.tunnels += 1
+        copies = [
+            asyncio.create_task(self._copy_until_eof(reader, upstream_writer)),
+            asyncio.create_task(self._copy_until_eof(upstream_reader, writer)),
+        ]
+        try:
+            # Either side closing ends the tunnel
+            await asyncio.wait(copies, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for copy in copies:
+                copy.cancel()
+            await asyncio.gather(*copies, return_exceptions=True)
+            upstream_writer.close()
+            self.tunnels -= 1
@@ -0,0 +1,204 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from bisect import bisect_left
+
+#
+# Latency metrics
+#
+# Every stage of the live pipeline is timed and counted into a histogram:
+#
+#   receive            parse a client frame (frame header or JSON)
+#   decode             Base64 or Opus to PCM
+#   enqueue            push into the LiveRequestQueue
+#   first_model_event  last client message to the first model event of a turn
+#   queue              wait in the outbound queue
+#   encode             JSON, Base64, binary frame or Opus encoding
+#   send               write to the WebSocket, including backpressure
+#
+# Per turn, time to first audio and time to turn complete run from the last
+# client message before the agent answered to the first agent audio, and to
+# the turn_complete, queued for the client; the queue, encode and send stages
+# add what follows. Barge-in runs from the model's `interrupted` event, sent
+# when the user talks over the agent, to the `interrupted` message written to
+# the socket: the client stops playing then, so it is how long the user hears
+# the agent after the model stopped. Lane wait is how long client input
+# waited in its lane of the LaneRequestQueue (see request_lanes.py) before
+# ADK took it to send to the model. The histograms are served in the
+# Prometheus text format on /metrics; they are per worker process.
+#
+
+METRIC_PREFIX = "adk_streaming"
+
+STAGE_RECEIVE = "receive"
+STAGE_DECODE = "decode"
+STAGE_ENQUEUE = "enqueue"
+STAGE_FIRST_MODEL_EVENT = "first_model_event"
+STAGE_QUEUE = "queue"
+STAGE_ENCODE = "encode"
+STAGE_SEND = "send"
+STAGES = (
+    STAGE_RECEIVE,
+    STAGE_DECODE,
+    STAGE_ENQUEUE,
+    STAGE_FIRST_MODEL_EVENT,
+    STAGE_QUEUE,
+    STAGE_ENCODE,
+    STAGE_SEND,
+)
+
+TURN_TIME_TO_FIRST_AUDIO = "time_to_first_audio"
+TURN_TIME_TO_TURN_COMPLETE = "time_to_turn_complete"
+TURN_HELP = {
+    TURN_TIME_TO_FIRST_AUDIO: "Per turn, from the last client message to the first agent audio.",
+    TURN_TIME_TO_TURN_COMPLETE: "Per turn, from the last client message to the turn_complete.",
+}
+
+BARGE_IN = "barge_in"
+BARGE_IN_HELP = "Per interruption, from the model's interrupted event to the client told to stop."
+
+LANE_WAIT = "lane_wait"
+LANE_WAIT_HELP = "Time client input waited in its lane before ADK sent it to the model."
+
+# Bucket upper bounds in seconds: 10 us to 30 s
+STAGE_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+TURN_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+# Input can fall seconds behind a slow model connection
+LANE_BUCKETS = STAGE_BUCKETS + (5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, in seconds"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def render(self, name, labels=""):
+        """Returns the Prometheus text lines of the histogram"""
+        bucket_labels = labels + "," if labels else ""
+        labels = f"{{{labels}}}" if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{bucket_labels}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{bucket_labels}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{labels} {self.sum:.6f}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class LatencyMetrics:
+    """Stage and turn latency histograms of one process"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self.stages = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+        self.turns = {
+            TURN_TIME_TO_FIRST_AUDIO: Histogram(TURN_BUCKETS),
+            TURN_TIME_TO_TURN_COMPLETE: Histogram(TURN_BUCKETS),
+        }
+        self.barge_in = Histogram(STAGE_BUCKETS)
+        self.lanes = {}
+
+    def observe(self, stage, seconds):
+        """Records the duration of one pipeline stage"""
+        self.stages[stage].observe(seconds)
+
+    def observe_barge_in(self, seconds):
+        """Records how long an interruption took to reach the client"""
+        self.barge_in.observe(seconds)
+
+    def observe_lane(self, lane, seconds):
+        """Records how long client input waited in its lane"""
+        histogram = self.lanes.get(lane)
+        if histogram is None:
+            histogram = self.lanes[lane] = Histogram(LANE_BUCKETS)
+        histogram.observe(seconds)
+
+    def render(self):
+        """Returns every histogram in the Prometheus text format"""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage of the live pipeline.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in self.stages.items():
+            lines += histogram.render(name, f'stage="{stage}"')
+        for turn_metric, histogram in self.turns.items():
+            name = f"{self.prefix}_{turn_metric}_seconds"
+            lines += [f"# HELP {name} {TURN_HELP[turn_metric]}", f"# TYPE {name} histogram"]
+            lines += histogram.render(name)
+        name = f"{self.prefix}_{BARGE_IN}_seconds"
+        lines += [f"# HELP {name} {BARGE_IN_HELP}", f"# TYPE {name} histogram"]
+        lines += self.barge_in.render(name)
+        name = f"{self.prefix}_{LANE_WAIT}_seconds"
+        lines += [f"# HELP {name} {LANE_WAIT_HELP}", f"# TYPE {name} histogram"]
+        for lane, histogram in self.lanes.items():
+            lines += histogram.render(name, f'lane="{lane}"')
+        return "\n".join(lines) + "\n"
+
+
+class TurnTimer:
+    """Times the turns of one connection"""
+
+    __slots__ = ("metrics", "last_input", "turn_start", "_answered", "_audio_seen")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last_input = None
+        self._reset()
+
+    def client_input(self, now):
+        """A client message reached the LiveRequestQueue"""
+        self.last_input = now
+
+    def model_event(self, now):
+        """The model sent content; the first of a turn starts its timing"""
+        if self._answered or self.last_input is None:
+            return
+        self._answered = True
+        self.turn_start = self.last_input
+        self.metrics.observe(STAGE_FIRST_MODEL_EVENT, now - self.turn_start)
+
+    def audio(self, now):
+        """The model sent audio"""
+        if self._audio_seen or self.turn_start is None:
+            return
+        self._audio_seen = True
+        self.metrics.turns[TURN_TIME_TO_FIRST_AUDIO].observe(now - self.turn_start)
+
+    def turn_ended(self, now, turn_complete):
+        """The model completed the turn or was interrupted"""
+        if turn_complete and self.turn_start is not None:
+            self.metrics.turns[TURN_TIME_TO_TURN_COMPLETE].observe(now - self.turn_start)
+        self._reset()
+
+    def _reset(self):
+        self.turn_start = None
+        self._answered = False
+        self._audio_seen = False
@@ -13,11 +13,15 @@
 # limitations under the License.
 
 import os
-import json
 import asyncio
-import base64
+import binascii
+import functools
+import tempfile
+import time
 import warnings
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -27,16 +31,69 @@ from google.genai.types import (
     Blob,
 )
 
-from google.adk.runners import InMemoryRunner
-from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
 from google.genai import types
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
 from google_search_agent.agent import root_agent
+from runner_registry import RunnerRegistry
+from sqlite_session_service import SqliteSessionService
+from outbound_queue import (
+    KIND_AUDIO,
+    KIND_CONTROL,
+    KIND_TEXT,
+    OutboundMessage,
+    OutboundQueue,
+    OutboundQueueFull,
+)
+from audio_coalescer import AudioCoalescer
+from audio_pacer import AudioPacer
+from request_lanes import LaneRequestQueue
+from drain import Drainer, ResumptionStore, TurnTracker
+from latency_metrics import (
+    STAGE_DECODE,
+    STAGE_ENCODE,
+    STAGE_ENQUEUE,
+    STAGE_QUEUE,
+    STAGE_RECEIVE,
+    STAGE_SEND,
+    LatencyMetrics,
+    TurnTimer,
+)
+from binary_frames import (
+    FRAME_AUDIO_OPUS,
+    FRAME_AUDIO_PCM,
+    FRAME_MIME_TYPES,
+    FrameSequencer,
+    decode_frame,
+    encode_frame,
+)
+from message_codec import MessageEncoder, get_codec
+from multiplexer import (
+    Channel,
+    ChannelSessions,
+    MuxSocket,
+    channel_envelope,
+    encode_channel_frame,
+)
+from audio_codec import (
+    AUDIO_CODEC_OPUS,
+    AUDIO_CODEC_PCM,
+    OpusDecoder,
+    OpusEncoder,
+    opus_available,
+    pack_packets,
+    unpack_packets,
+)
+from stream_logging import (
+    LOG_MODE_METRICS,
+    StreamLog,
+    parse_sample_rates,
+    setup_async_logging,
+)
 
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
@@ -49,31 +106,151 @@ load_dotenv()
 
 APP_NAME = "ADK Streaming example"
 
+# Bounded outbound queue per connection, see outbound_queue.py
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "256"))
+OUTBOUND_OVERFLOW_POLICY = os.getenv("OUTBOUND_OVERFLOW_POLICY", "coalesce_audio")
+# When the user interrupts the agent, drop the turn's audio that wasn't sent
+# yet instead of sending it ahead of the interrupted message
+PURGE_AUDIO_ON_INTERRUPT = os.getenv("PURGE_AUDIO_ON_INTERRUPT", "true") == "true"
+# Audio a client gets ahead of its playback, see audio_pacer.py (0 sends the
+# audio as the model sends it)
+AUDIO_SEND_AHEAD_MS = int(os.getenv("AUDIO_SEND_AHEAD_MS", "500"))
+
+# Duration of the audio frames sent to the client (0 disables coalescing)
+AUDIO_FRAME_MS = int(os.getenv("AUDIO_FRAME_MS", "40"))
+AGENT_AUDIO_SAMPLE_RATE = 24000
+CLIENT_AUDIO_SAMPLE_RATE = 16000
+
+# Client input waits in lanes for the model connection, see request_lanes.py:
+# text goes ahead of audio (REQUEST_LANES=false keeps arrival order), the
+# oldest audio is shed beyond AUDIO_LANE_MAX_MS waiting (0: never), and
+# AUDIO_LANE_RATE caps the audio sent to the model, in seconds of audio per
+# second (0: no cap)
+REQUEST_LANES = os.getenv("REQUEST_LANES", "true") == "true"
+AUDIO_LANE_MAX_MS = int(os.getenv("AUDIO_LANE_MAX_MS", "2000"))
+AUDIO_LANE_RATE = float(os.getenv("AUDIO_LANE_RATE", "0"))
+
+# Opus audio for clients that connect with ?codec=opus, see audio_codec.py.
+# Encoding and decoding run in a thread pool, off the event loop.
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "24000"))
+AUDIO_CODEC_THREADS = int(os.getenv("AUDIO_CODEC_THREADS", "4"))
+audio_codec_executor = ThreadPoolExecutor(AUDIO_CODEC_THREADS, thread_name_prefix="audio-codec")
+
+# Streaming logs, see stream_logging.py: LOG_MODE=metrics only counts hot
+# path events, and LOG_SAMPLE_RATES logs a fraction of a category's events
+LOG_MODE = os.getenv("LOG_MODE", "lines")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = parse_sample_rates(
+    os.getenv("LOG_SAMPLE_RATES", "agent_to_client.partial_text=0.1")
+)
+stream_log = StreamLog(
+    setup_async_logging("adk_streaming", LOG_QUEUE_SIZE, LOG_FORMAT),
+    sample_rates=LOG_SAMPLE_RATES,
+    metrics_only=LOG_MODE == LOG_MODE_METRICS,
+)
+
+# Sessions are kept in memory, or also written to the SQLite file at
+# SESSION_DB_PATH so they outlive the process, see sqlite_session_service.py.
+# The model's audio chunks are only written with SESSION_DB_KEEP_AUDIO=true.
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "")
+SESSION_DB_KEEP_AUDIO = os.getenv("SESSION_DB_KEEP_AUDIO", "false") == "true"
+session_service = (
+    SqliteSessionService(
+        SESSION_DB_PATH, keep_audio=SESSION_DB_KEEP_AUDIO, log=stream_log
+    )
+    if SESSION_DB_PATH else None
+)
 
+# JSON codec of the transport messages, see message_codec.py: auto (orjson
+# if it is installed), orjson or json
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+codec = get_codec(JSON_CODEC)
+# WebSocket text frames are str, so messages are decoded once at the end
+ws_encoder = MessageEncoder(codec, text=True)
+
+# Graceful drain, see drain.py: on SIGTERM the worker refuses new sessions,
+# lets the turns in flight complete for up to DRAIN_TIMEOUT_SECONDS (0 turns
+# draining off), and saves the resumption handles of its live sessions to
+# RESUMPTION_HANDLES_DIR for the worker that takes over
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "8"))
+RESUMPTION_HANDLES_DIR = os.getenv(
+    "RESUMPTION_HANDLES_DIR", os.path.join(tempfile.gettempdir(), "adk-streaming-ws-handles")
+)
+# A client that reconnects within RESUMPTION_TTL_SECONDS (0 turns it off)
+# resumes its live session; the handles of up to RESUMPTION_MAX_HANDLES
+# disconnected sessions are kept in memory
+RESUMPTION_TTL_SECONDS = float(os.getenv("RESUMPTION_TTL_SECONDS", "600"))
+RESUMPTION_MAX_HANDLES = int(os.getenv("RESUMPTION_MAX_HANDLES", "10000"))
+drainer = Drainer(DRAIN_TIMEOUT_SECONDS, log=stream_log)
+resumption_store = ResumptionStore(
+    RESUMPTION_HANDLES_DIR, RESUMPTION_TTL_SECONDS, RESUMPTION_MAX_HANDLES
+)
+
+# One runner and session service shared by every connection. A session is
+# dropped when its last connection ends, unless its live session can be
+# resumed: then it is kept as long as the resumption handle.
+runner_registry = RunnerRegistry(
+    session_service=session_service,
+    idle_ttl=RESUMPTION_TTL_SECONDS,
+    max_idle_sessions=RESUMPTION_MAX_HANDLES,
+)
+
+# How long a drained connection gets to send its queued messages
+DRAIN_FLUSH_SECONDS = 1.0
+
+# Latency histograms of the pipeline stages and turns, served on /metrics,
+# see latency_metrics.py
+latency_metrics = LatencyMetrics()
+
+# Live sessions multiplexed over /ws-mux, see multiplexer.py: a channel sends
+# up to MUX_QUANTUM_BYTES per round before the next channel's turn, and a
+# socket carries up to MUX_MAX_CHANNELS sessions
+MUX_QUANTUM_BYTES = int(os.getenv("MUX_QUANTUM_BYTES", "4096"))
+MUX_MAX_CHANNELS = int(os.getenv("MUX_MAX_CHANNELS", "1000"))
+
+
+# --8<-- [start:start_agent_session]
 async def start_agent_session(user_id, is_audio=False):
     """Starts an agent session"""
 
-    # Create a Runner
-    runner = InMemoryRunner(
-        app_name=APP_NAME,
-        agent=root_agent,
-    )
+    # Get the shared Runner
+    runner = runner_registry.get_runner(APP_NAME, root_agent)
+
+    # The live session the user was in before disconnecting, or that a
+    # draining worker handed over, if any
+    resumption = resumption_store.pop(user_id)
 
-    # Create a Session
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,  # Replace with actual user ID
+    # Get the user's Session, or create one
+    session = await runner_registry.get_or_create_session(
+        APP_NAME,
+        user_id,  # Replace with actual user ID
+        session_id=resumption.session_id if resumption else None,
     )
 
-    # Set response modality
+    # Set response modality, and resume the live session. A worker that
+    # doesn't have the saved session, e.g. one that took over from a
+    # draining worker with in-memory sessions, resumes it in a new session:
+    # the model keeps the conversation, the old session's events stay behind
     modality = "AUDIO" if is_audio else "TEXT"
+    handle = resumption.handle if resumption else None
     run_config = RunConfig(
         response_modalities=[modality],
-        session_resumption=types.SessionResumptionConfig()
+        session_resumption=types.SessionResumptionConfig(handle=handle)
     )
+    if handle:
+        stream_log.info(
+            "Client #%s resumes its live session in session %s", user_id, session.id
+        )
 
-    # Create a LiveRequestQueue for this session
-    live_request_queue = LiveRequestQueue()
+    # Create a LiveRequestQueue for this session, with text ahead of audio
+    live_request_queue = LaneRequestQueue(
+        CLIENT_AUDIO_SAMPLE_RATE * 2,
+        AUDIO_LANE_MAX_MS,
+        AUDIO_LANE_RATE,
+        prioritize=REQUEST_LANES,
+        on_dequeue=latency_metrics.observe_lane,
+    )
 
     # Start agent session
     live_events = runner.run_live(
@@ -82,20 +259,55 @@ async def start_agent_session(user_id, is_audio=False):
         run_config=run_config,
     )
     return live_events, live_request_queue
-
-
-async def agent_to_client_messaging(websocket, live_events):
-    """Agent to client communication"""
+# --8<-- [end:start_agent_session]
+
+
+def save_resumption_handle(user_id, live_request_queue, drained=True):
+    """Saves the resumption handle of a live session for the user's next
+    connection; the handle of a drained session is saved for the next worker.
+    Returns whether there was a handle to save."""
+    runner = runner_registry.get_runner(APP_NAME, root_agent)
+    handle = runner.resumption_handle(live_request_queue)
+    if not handle:
+        return False
+    session_id = runner.live_session_id(live_request_queue)
+    if drained:
+        resumption_store.save(user_id, handle, session_id)
+    else:
+        resumption_store.remember(user_id, handle, session_id)
+    return resumption_store.ttl > 0
+
+
+# --8<-- [start:agent_to_client_messaging]
+async def agent_to_client_messaging(live_events, outbound, coalescer, turns=None,
+                                    turn_timer=None):
+    """Agent to client communication: queues messages for the client"""
+    if turns is None:
+        turns = TurnTracker()
+    if turn_timer is None:
+        turn_timer = TurnTimer(latency_metrics)
     async for event in live_events:
 
         # If the turn complete or interrupted, send it
         if event.turn_complete or event.interrupted:
+            turns.end()
+            if event.interrupted and PURGE_AUDIO_ON_INTERRUPT:
+                # The user talked over the agent: the audio of the turn that
+                # wasn't sent yet is stale
+                coalescer.discard()
+                outbound.interrupt()
+            else:
+                # Send the rest of the buffered audio first
+                audio_frame = coalescer.flush()
+                if audio_frame:
+                    outbound.put_nowait(OutboundMessage(KIND_AUDIO, audio_frame))
             message = {
                 "turn_complete": event.turn_complete,
                 "interrupted": event.interrupted,
             }
-            await websocket.send_text(json.dumps(message))
-            print(f"[AGENT TO CLIENT]: {message}")
+            outbound.put_nowait(OutboundMessage(KIND_CONTROL, message))
+            outbound.end_turn()
+            turn_timer.turn_ended(time.monotonic(), event.turn_complete)
             continue
 
         # Read the Content and its first Part
@@ -104,18 +316,17 @@ async def agent_to_client_messaging(websocket, live_events):
         )
         if not part:
             continue
+        turns.start()
+        turn_timer.model_event(time.monotonic())
 
-        # If it's audio, send Base64 encoded audio data
+        # If it's audio, coalesce it into frames and queue them
         is_audio = part.inline_data and part.inline_data.mime_type.startswith("audio/pcm")
         if is_audio:
             audio_data = part.inline_data and part.inline_data.data
             if audio_data:
-                message = {
-                    "mime_type": "audio/pcm",
-                    "data": base64.b64encode(audio_data).decode("ascii")
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
+                for audio_frame in coalescer.add(audio_data):
+                    outbound.put_nowait(OutboundMessage(KIND_AUDIO, audio_frame))
+                    turn_timer.audio(time.monotonic())
                 continue
 
         # If it's text and a partial text, send it
@@ -124,42 +335,344 @@ async def agent_to_client_messaging(websocket, live_events):
                 "mime_type": "text/plain",
                 "data": part.text
             }
-            await websocket.send_text(json.dumps(message))
-            print(f"[AGENT TO CLIENT]: text/plain: {message}")
+            outbound.put_nowait(OutboundMessage(KIND_TEXT, message, partial=True))
+
+        # If partial text of this turn was dropped, resend the full text
+        elif part.text and outbound.text_dropped_in_turn:
+            message = {
+                "mime_type": "text/plain",
+                "data": part.text,
+                "replace": True,
+            }
+            outbound.put_nowait(OutboundMessage(KIND_TEXT, message))
+# --8<-- [end:agent_to_client_messaging]
+
+
+def opus_frame(sequencer, packets, turn=0):
+    """Returns a binary frame of Opus packets, or None if there are none"""
+    if packets:
+        return encode_frame(FRAME_AUDIO_OPUS, pack_packets(packets), sequencer.next(), turn)
+    return None
+
+
+async def encode_for_client(message, encoder, sequencer, binary=False, opus_encoder=None):
+    """Encodes a queued message into frames: str for JSON, bytes for audio"""
+    # If it's audio, encode it as Opus, a binary frame or Base64 encoded
+    # audio data, tagged with its turn
+    frames = []
+    if message.kind == KIND_AUDIO:
+        audio_data = message.payload
+        if opus_encoder:
+            packets = await asyncio.get_running_loop().run_in_executor(
+                audio_codec_executor, opus_encoder.encode, audio_data
+            )
+            frames.append(opus_frame(sequencer, packets, message.turn))
+        elif binary:
+            frames.append(encode_frame(FRAME_AUDIO_PCM, audio_data, sequencer.next(), message.turn))
+        else:
+            frames.append(encoder.audio(audio_data, message.turn))
+    elif message.kind == KIND_TEXT:
+        frames.append(encoder.message(message.payload))
+    else:
+        payload = message.payload
+        # Send the rest of the turn's Opus audio, unless interrupted
+        if opus_encoder and payload["interrupted"]:
+            opus_encoder.discard()
+        elif opus_encoder:
+            packets = await asyncio.get_running_loop().run_in_executor(
+                audio_codec_executor, opus_encoder.flush
+            )
+            frames.append(opus_frame(sequencer, packets, message.turn))
+        frames.append(
+            encoder.control(payload["turn_complete"], payload["interrupted"], message.turn)
+        )
+    return frames
+
+
+async def send_frames(websocket, frames, opus=False, channel_id=None):
+    """Sends frames: JSON as text, audio as binary, behind its channel
+    number on a multiplexed socket"""
+    for frame in frames:
+        if isinstance(frame, str):
+            await websocket.send_text(frame)
+        elif frame is not None:
+            if channel_id is not None:
+                frame = encode_channel_frame(channel_id, frame)
+            await websocket.send_bytes(frame)
+            if opus:
+                stream_log.count("agent_to_client.opus", len(frame))
+
+
+def log_sent(message):
+    """Logs a message sent to the client"""
+    if message.kind == KIND_AUDIO:
+        stream_log.count("agent_to_client.audio", len(message.payload))
+    elif message.kind == KIND_TEXT:
+        category = "agent_to_client.partial_text" if message.partial else "agent_to_client.text"
+        stream_log.event(category, "[AGENT TO CLIENT]: text/plain: %s", message.payload)
+    else:
+        stream_log.event("agent_to_client.control", "[AGENT TO CLIENT]: %s", message.payload)
+
+
+async def send_message(websocket, outbound, message, encoder, sequencer, binary=False,
+                       opus_encoder=None, channel_id=None, pacer=None):
+    """Encodes and sends a queued message, unless it is audio of an
+    interrupted turn"""
+    dequeued = time.monotonic()
+    latency_metrics.observe(STAGE_QUEUE, dequeued - message.enqueued_at)
+    if message.kind == KIND_AUDIO and pacer is not None:
+        # Hold the audio back while the client has enough of it to play
+        delay = pacer.delay(dequeued)
+        if delay:
+            await outbound.hold(delay)
+            dequeued = time.monotonic()
+    if outbound.discard_stale(message):
+        return
+    frames = await encode_for_client(message, encoder, sequencer, binary, opus_encoder)
+    encoded = time.monotonic()
+    latency_metrics.observe(STAGE_ENCODE, encoded - dequeued)
+    # The turn may have been interrupted while its audio was encoded
+    if outbound.discard_stale(message):
+        return
+    await send_frames(websocket, frames, opus_encoder is not None, channel_id)
+    sent = time.monotonic()
+    latency_metrics.observe(STAGE_SEND, sent - encoded)
+    if message.kind == KIND_AUDIO and pacer is not None:
+        pacer.sent(len(message.payload), sent)
+    elif message.kind == KIND_CONTROL and message.payload["interrupted"]:
+        # The client stops playing and drops the audio it has
+        latency_metrics.observe_barge_in(sent - message.enqueued_at)
+        if pacer is not None:
+            pacer.reset()
+    log_sent(message)
+
+
+async def send_to_client(websocket, outbound, binary=False, opus_encoder=None, pacer=None):
+    """Sends queued messages to the client at the pace the client reads them,
+    and audio no faster than the client plays it"""
+    sequencer = FrameSequencer()
+    while True:
+        message = await outbound.get()
+        await send_message(
+            websocket, outbound, message, ws_encoder, sequencer, binary, opus_encoder,
+            pacer=pacer,
+        )
 
 
-async def client_to_agent_messaging(websocket, live_request_queue):
+# --8<-- [start:client_to_agent_messaging]
+async def audio_frame_to_agent(frame, received, live_request_queue, opus_decoder=None,
+                               turn_timer=None):
+    """Sends the audio of a binary frame to the agent"""
+    frame_type, _, _, payload = decode_frame(frame)
+    mime_type = FRAME_MIME_TYPES.get(frame_type)
+    if mime_type is None:
+        raise ValueError(f"Binary frame type not supported: {frame_type}")
+    decoded = time.monotonic()
+    latency_metrics.observe(STAGE_RECEIVE, decoded - received)
+    # Opus is decoded to PCM, the live model only takes PCM
+    if frame_type == FRAME_AUDIO_OPUS:
+        if opus_decoder is None:
+            raise ValueError("Opus frames need a connection with codec=opus")
+        stream_log.count("client_to_agent.opus", len(frame))
+        payload = await asyncio.get_running_loop().run_in_executor(
+            audio_codec_executor, opus_decoder.decode, unpack_packets(payload)
+        )
+        mime_type = "audio/pcm"
+        parsed, decoded = decoded, time.monotonic()
+        latency_metrics.observe(STAGE_DECODE, decoded - parsed)
+    else:
+        # The Blob takes bytes: a view into a multiplexed frame is copied
+        # here, once, and bytes() of bytes is the same object
+        payload = bytes(payload)
+    live_request_queue.send_realtime(Blob(data=payload, mime_type=mime_type))
+    enqueued = time.monotonic()
+    latency_metrics.observe(STAGE_ENQUEUE, enqueued - decoded)
+    if turn_timer:
+        turn_timer.client_input(enqueued)
+    stream_log.count("client_to_agent.audio", len(payload))
+
+
+def message_to_agent(message, decoded, live_request_queue, turns=None, turn_timer=None):
+    """Sends a JSON message of the client to the agent"""
+    mime_type = message["mime_type"]
+    data = message["data"]
+
+    # Send the message to the agent
+    if mime_type == "text/plain":
+        # Send a text message
+        content = Content(role="user", parts=[Part.from_text(text=data)])
+        if turns:
+            turns.start()
+        live_request_queue.send_content(content=content)
+        stream_log.event("client_to_agent.text", "[CLIENT TO AGENT]: %s", data)
+    elif mime_type == "audio/pcm":
+        # Send an audio data, decoded straight from the str without
+        # base64.b64decode's ASCII copy of it
+        data = binascii.a2b_base64(data)
+        parsed, decoded = decoded, time.monotonic()
+        latency_metrics.observe(STAGE_DECODE, decoded - parsed)
+        live_request_queue.send_realtime(Blob(data=data, mime_type=mime_type))
+        stream_log.count("client_to_agent.audio", len(data))
+    else:
+        raise ValueError(f"Mime type not supported: {mime_type}")
+    enqueued = time.monotonic()
+    latency_metrics.observe(STAGE_ENQUEUE, enqueued - decoded)
+    if turn_timer:
+        turn_timer.client_input(enqueued)
+
+
+async def client_to_agent_messaging(websocket, live_request_queue, opus_decoder=None,
+                                    turns=None, turn_timer=None):
     """Client to agent communication"""
+    if turn_timer is None:
+        turn_timer = TurnTimer(latency_metrics)
     while True:
+        frame = await websocket.receive()
+        received = time.monotonic()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+
+        # Binary frames carry raw audio and go straight to the agent
+        if frame.get("bytes") is not None:
+            await audio_frame_to_agent(
+                frame["bytes"], received, live_request_queue, opus_decoder, turn_timer
+            )
+            continue
+
         # Decode JSON message
-        message_json = await websocket.receive_text()
-        message = json.loads(message_json)
-        mime_type = message["mime_type"]
-        data = message["data"]
-
-        # Send the message to the agent
-        if mime_type == "text/plain":
-            # Send a text message
-            content = Content(role="user", parts=[Part.from_text(text=data)])
-            live_request_queue.send_content(content=content)
-            print(f"[CLIENT TO AGENT]: {data}")
-        elif mime_type == "audio/pcm":
-            # Send an audio data
-            decoded_data = base64.b64decode(data)
-            live_request_queue.send_realtime(Blob(data=decoded_data, mime_type=mime_type))
-        else:
-            raise ValueError(f"Mime type not supported: {mime_type}")
+        message = codec.loads(frame["text"])
+        decoded = time.monotonic()
+        latency_metrics.observe(STAGE_RECEIVE, decoded - received)
+        message_to_agent(message, decoded, live_request_queue, turns, turn_timer)
+# --8<-- [end:client_to_agent_messaging]
+
+
+#
+# Multiplexed sessions
+#
+
+class AgentChannels(ChannelSessions):
+    """The live agent sessions behind the channels of /ws-mux, see
+    multiplexer.py"""
+
+    async def open(self, channel_id, options, on_message):
+        # Negotiate the audio codec like /ws/{user_id}
+        user_id = str(options["user_id"])
+        is_audio = options.get("is_audio", False)
+        binary = options.get("binary", False)
+        audio_codec = AUDIO_CODEC_PCM
+        if options.get("codec") == AUDIO_CODEC_OPUS and opus_available():
+            audio_codec = AUDIO_CODEC_OPUS
+        opus_encoder = opus_decoder = None
+        if audio_codec == AUDIO_CODEC_OPUS:
+            opus_encoder = OpusEncoder(AGENT_AUDIO_SAMPLE_RATE, OPUS_BITRATE)
+            opus_decoder = OpusDecoder(CLIENT_AUDIO_SAMPLE_RATE)
+
+        # Start agent session
+        live_events, live_request_queue = await start_agent_session(user_id, is_audio)
+
+        # The channel's messages are JSON envelopes, queued for the socket's
+        # scheduler
+        outbound = OutboundQueue(
+            OUTBOUND_QUEUE_SIZE, OUTBOUND_OVERFLOW_POLICY, on_message=on_message
+        )
+        prefix, suffix = channel_envelope(channel_id)
+        channel = Channel(
+            channel_id, user_id, live_request_queue, outbound,
+            AudioCoalescer(AUDIO_FRAME_MS, AGENT_AUDIO_SAMPLE_RATE),
+            MessageEncoder(codec, prefix, suffix, text=True),
+            TurnTracker(), TurnTimer(latency_metrics),
+            binary, opus_encoder, opus_decoder,
+        )
+        outbound_queues[user_id] = outbound
+        audio_coalescers[user_id] = channel.coalescer
+        request_queues[user_id] = live_request_queue
+        stream_log.info(
+            "Client #%s connected on channel %s, audio mode: %s, binary frames: %s, audio codec: %s",
+            user_id, channel_id, is_audio, binary, audio_codec,
+        )
+        return channel, live_events, {"audio_codec": audio_codec}
+
+    async def stream(self, channel, live_events):
+        await agent_to_client_messaging(
+            live_events, channel.outbound, channel.coalescer, channel.turns, channel.turn_timer
+        )
+
+    async def send(self, websocket, channel, message):
+        await send_message(
+            websocket, channel.outbound, message, channel.encoder, channel.sequencer,
+            channel.binary, channel.opus_encoder, channel.channel_id,
+        )
+
+    async def receive_audio(self, channel, frame, received):
+        await audio_frame_to_agent(
+            frame, received, channel.live_request_queue, channel.opus_decoder, channel.turn_timer
+        )
+
+    def receive_message(self, channel, message, received):
+        decoded = time.monotonic()
+        latency_metrics.observe(STAGE_RECEIVE, decoded - received)
+        message_to_agent(
+            message, decoded, channel.live_request_queue, channel.turns, channel.turn_timer
+        )
+
+    def hand_over(self, channel):
+        save_resumption_handle(channel.user_id, channel.live_request_queue)
+
+    def end(self, channel, handed_over):
+        # Keep the live session for the channel's next open, like a reconnect
+        keep = handed_over or save_resumption_handle(
+            channel.user_id, channel.live_request_queue, drained=False
+        )
+        channel.live_request_queue.close()
+        release_task = asyncio.create_task(
+            runner_registry.release_session(APP_NAME, channel.user_id, keep)
+        )
+        release_tasks.add(release_task)
+        release_task.add_done_callback(release_tasks.discard)
+        if outbound_queues.get(channel.user_id) is channel.outbound:
+            del outbound_queues[channel.user_id]
+        if audio_coalescers.get(channel.user_id) is channel.coalescer:
+            del audio_coalescers[channel.user_id]
+        if request_queues.get(channel.user_id) is channel.live_request_queue:
+            del request_queues[channel.user_id]
+
+
+agent_channels = AgentChannels()
 
 
 #
 # FastAPI web app
 #
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    """Drains the live sessions on SIGTERM, and writes the queued session
+    events on shutdown"""
+    drainer.install()
+    yield
+    if session_service is not None:
+        await session_service.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 STATIC_DIR = Path("static")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+# Outbound queues, audio coalescers and pacers, and request queues of the
+# connected clients
+outbound_queues = {}
+audio_coalescers = {}
+audio_pacers = {}
+request_queues = {}
+
+# The multiplexed sockets
+mux_sockets = set()
+
+# Sessions released by closed channels
+release_tasks = set()
+
 
 @app.get("/")
 async def root():
@@ -167,32 +680,222 @@ async def root():
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
 
+@app.get("/stats/outbound")
+async def outbound_stats():
+    """Returns the outbound queue depth, drop and pacing counters per connection"""
+    stats = {user_id: outbound.stats() for user_id, outbound in outbound_queues.items()}
+    for user_id, pacer in audio_pacers.items():
+        if user_id in stats:
+            stats[user_id]["pacing"] = pacer.stats()
+    return stats
+
+
+@app.get("/stats/lanes")
+async def lane_stats():
+    """Returns the depth, shed audio and throttling of the request lanes per
+    connection"""
+    return {user_id: queue.stats() for user_id, queue in request_queues.items()}
+
+
+@app.get("/stats/audio")
+async def audio_stats():
+    """Returns the achieved audio frame sizes and added latency per connection"""
+    return {user_id: coalescer.stats() for user_id, coalescer in audio_coalescers.items()}
+
+
+@app.get("/stats/log")
+async def log_stats():
+    """Returns the streaming event counters and the dropped log records"""
+    return stream_log.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Returns the latency histograms in the Prometheus text format"""
+    return PlainTextResponse(latency_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats/mux")
+async def mux_stats():
+    """Returns the channels and scheduling counters per multiplexed socket"""
+    return [mux_socket.scheduler.stats() for mux_socket in mux_sockets]
+
+
+@app.get("/stats/sessions")
+async def session_stats():
+    """Returns the sessions kept for connected and disconnected clients"""
+    return runner_registry.stats()
+
+
+@app.get("/stats/session_db")
+async def session_db_stats():
+    """Returns the session events queued and written to SESSION_DB_PATH"""
+    return session_service.stats() if session_service is not None else {}
+
+
+@app.get("/stats/resumption")
+async def resumption_stats():
+    """Returns the kept resumption handles and how reconnects used them"""
+    return resumption_store.stats()
+
+
+@app.get("/stats/drain")
+async def drain_stats():
+    """Returns the drain state and the sessions drained or cut"""
+    return drainer.stats()
+
+
+# --8<-- [start:websocket_endpoint]
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, is_audio: str):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    user_id: int,
+    is_audio: str,
+    binary: str = "false",
+    codec: str = AUDIO_CODEC_PCM,
+):
     """Client websocket endpoint"""
 
     # Wait for client connection
     await websocket.accept()
-    print(f"Client #{user_id} connected, audio mode: {is_audio}")
+
+    # A draining worker takes no new sessions; 1012 (service restart) tells
+    # the client to reconnect, and it lands on the worker that replaces this one
+    if drainer.draining:
+        await websocket.close(code=1012)
+        return
+
+    # Negotiate the audio codec: Opus if the client asked for it and PyAV is
+    # installed, PCM otherwise
+    audio_codec = AUDIO_CODEC_PCM
+    if codec == AUDIO_CODEC_OPUS and opus_available():
+        audio_codec = AUDIO_CODEC_OPUS
+    await websocket.send_text(ws_encoder.message({"audio_codec": audio_codec}))
+    opus_encoder = opus_decoder = None
+    if audio_codec == AUDIO_CODEC_OPUS:
+        opus_encoder = OpusEncoder(AGENT_AUDIO_SAMPLE_RATE, OPUS_BITRATE)
+        opus_decoder = OpusDecoder(CLIENT_AUDIO_SAMPLE_RATE)
+    stream_log.info(
+        "Client #%s connected, audio mode: %s, binary frames: %s, audio codec: %s",
+        user_id, is_audio, binary, audio_codec,
+    )
 
     # Start agent session
     user_id_str = str(user_id)
     live_events, live_request_queue = await start_agent_session(user_id_str, is_audio == "true")
 
+    # Create the outbound queue for this connection
+    outbound = OutboundQueue(OUTBOUND_QUEUE_SIZE, OUTBOUND_OVERFLOW_POLICY)
+    outbound_queues[user_id_str] = outbound
+    request_queues[user_id_str] = live_request_queue
+    coalescer = AudioCoalescer(AUDIO_FRAME_MS, AGENT_AUDIO_SAMPLE_RATE)
+    audio_coalescers[user_id_str] = coalescer
+    pacer = None
+    if AUDIO_SEND_AHEAD_MS > 0:
+        pacer = AudioPacer(AUDIO_SEND_AHEAD_MS, AGENT_AUDIO_SAMPLE_RATE)
+        audio_pacers[user_id_str] = pacer
+    turns = TurnTracker()
+    turn_timer = TurnTimer(latency_metrics)
+
     # Start tasks
     agent_to_client_task = asyncio.create_task(
-        agent_to_client_messaging(websocket, live_events)
+        agent_to_client_messaging(live_events, outbound, coalescer, turns, turn_timer)
+    )
+    send_to_client_task = asyncio.create_task(
+        send_to_client(websocket, outbound, binary == "true", opus_encoder, pacer)
     )
     client_to_agent_task = asyncio.create_task(
-        client_to_agent_messaging(websocket, live_request_queue)
+        client_to_agent_messaging(websocket, live_request_queue, opus_decoder, turns, turn_timer)
     )
+    tasks = [agent_to_client_task, send_to_client_task, client_to_agent_task]
+
+    drained = False
+
+    async def finish_for_drain():
+        # Hand the live session over, let the client receive what is queued
+        # and end the connection
+        nonlocal drained
+        drained = True
+        save_resumption_handle(user_id_str, live_request_queue)
+        deadline = asyncio.get_running_loop().time() + DRAIN_FLUSH_SECONDS
+        while (
+            len(outbound) and not send_to_client_task.done()
+            and asyncio.get_running_loop().time() < deadline
+        ):
+            await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+
+    # Registered per connection: the user may have other connections
+    drainer.register(websocket, turns, finish_for_drain)
+
+    # Wait until the websocket is disconnected, an error occurs or the
+    # session is drained
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    drainer.unregister(websocket, turns)
+
+    # Keep the live session for the client's reconnect, and close the
+    # LiveRequestQueue. The session goes with the last connection of the
+    # user, unless the live session can be resumed.
+    keep = drained or save_resumption_handle(user_id_str, live_request_queue, drained=False)
+    live_request_queue.close()
+    await runner_registry.release_session(APP_NAME, user_id_str, keep)
+
+    # A client that can't keep up with the agent is disconnected
+    if (
+        agent_to_client_task in done
+        and not agent_to_client_task.cancelled()
+        and isinstance(agent_to_client_task.exception(), OutboundQueueFull)
+    ):
+        stream_log.info("Client #%s too slow: %s", user_id, outbound.stats())
+        await websocket.close(code=1013)
+
+    # A drained client reconnects to the worker that takes over
+    if drained:
+        try:
+            await websocket.close(code=1012)
+        except RuntimeError:
+            pass
+
+    if outbound_queues.get(user_id_str) is outbound:
+        del outbound_queues[user_id_str]
+    if audio_coalescers.get(user_id_str) is coalescer:
+        del audio_coalescers[user_id_str]
+    if pacer is not None and audio_pacers.get(user_id_str) is pacer:
+        del audio_pacers[user_id_str]
+    if request_queues.get(user_id_str) is live_request_queue:
+        del request_queues[user_id_str]
+    if coalescer.chunks_in:
+        stream_log.info("Client #%s audio frames: %s", user_id, coalescer.stats())
+
+    # Disconnected
+    stream_log.info("Client #%s disconnected", user_id)
+# --8<-- [end:websocket_endpoint]
 
-    # Wait until the websocket is disconnected or an error occurs
-    tasks = [agent_to_client_task, client_to_agent_task]
-    await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
 
-    # Close LiveRequestQueue
-    live_request_queue.close()
+@app.websocket("/ws-mux")
+async def mux_websocket_endpoint(websocket: WebSocket):
+    """Multiplexed websocket endpoint: many live sessions over one socket"""
+
+    # Wait for client connection
+    await websocket.accept()
+    if drainer.draining:
+        await websocket.close(code=1012)
+        return
+    stream_log.info("Multiplexed socket connected")
+
+    # Serve the socket's channels until it is disconnected or an error occurs
+    mux_socket = MuxSocket(
+        websocket, agent_channels, ws_encoder, drainer,
+        MUX_QUANTUM_BYTES, MUX_MAX_CHANNELS, DRAIN_FLUSH_SECONDS, stream_log,
+    )
+    mux_sockets.add(mux_socket)
+    try:
+        await mux_socket.run()
+    finally:
+        mux_sockets.discard(mux_socket)
 
     # Disconnected
-    print(f"Client #{user_id} disconnected")
+    stream_log.info("Multiplexed socket disconnected")
@@ -0,0 +1,459 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import functools
+import logging
+import struct
+import time
+from collections import deque
+
+from fastapi import WebSocketDisconnect
+
+from binary_frames import FrameSequencer
+from outbound_queue import KIND_AUDIO, OutboundQueueFull
+from stream_logging import StreamLog
+
+#
+# Connection multiplexing
+#
+# A gateway that fans in many users can carry their live sessions over a few
+# WebSockets to /ws-mux instead of one socket per user. Every session is a
+# channel, numbered by the client. Text frames are JSON envelopes:
+#
+#   {"channel": 7, "open": {"user_id": "42", "is_audio": true}}  start a session
+#   {"channel": 7, "message": {"mime_type": ..., "data": ...}}   to the agent
+#   {"channel": 7, "close": true}                                end it
+#
+# `open` takes the query parameters of /ws/{user_id}: user_id, is_audio,
+# binary and codec. The server answers with the same envelopes: "opened"
+# with the agreed audio codec, "message" with the messages /ws/{user_id}
+# sends, and "closed" with the reason the session ended. A frame the server
+# can't handle closes only its channel, with reason "error" and an "error"
+# detail; the channel is null if the frame's channel couldn't be read. A
+# channel's live session starts in the background, so a slow start holds
+# back no other channel; the messages of a channel until it is "opened" are
+# dropped.
+# Binary frames are the frames of binary_frames.py behind the channel number:
+#
+#   +--------------------+-------------------------
+#   |  channel  uint32   |  binary frame ...
+#   +--------------------+-------------------------
+#
+# Each channel has its own outbound queue. One sender per socket takes turns
+# between the channels that have messages queued (deficit round robin): a
+# channel sends up to a quantum of bytes per round, so a channel streaming
+# audio holds the others back by at most a quantum. A message that fails to
+# send closes its channel, like a bad frame.
+#
+# MuxSocket runs a socket's channels; the live sessions behind them come
+# from a ChannelSessions, see AgentChannels in main.py.
+#
+
+MUX_CHANNEL_HEADER = struct.Struct("!I")
+MAX_CHANNEL_ID = 0xFFFFFFFF
+
+# Why a channel was closed
+CLOSE_CLIENT = "client"
+CLOSE_ENDED = "ended"
+CLOSE_RESTART = "restart"
+CLOSE_TOO_SLOW = "too_slow"
+CLOSE_TOO_MANY_CHANNELS = "too_many_channels"
+CLOSE_ERROR = "error"
+
+# Rough socket cost of a text or control message besides its text
+MESSAGE_OVERHEAD_BYTES = 64
+
+
+def channel_envelope(channel_id):
+    """Returns the prefix and suffix that wrap a channel's JSON messages"""
+    return b'{"channel":%d,"message":' % channel_id, b"}"
+
+
+def encode_channel_frame(channel_id, frame):
+    """Puts a binary frame behind its channel number"""
+    return MUX_CHANNEL_HEADER.pack(channel_id) + frame
+
+
+def decode_channel_frame(data):
+    """Splits a multiplexed binary frame into (channel_id, frame).
+
+    The frame is a memoryview of `data`, not a copy.
+    """
+    if len(data) < MUX_CHANNEL_HEADER.size:
+        raise ValueError(f"Multiplexed frame too short: {len(data)} bytes")
+    (channel_id,) = MUX_CHANNEL_HEADER.unpack_from(data)
+    return channel_id, memoryview(data)[MUX_CHANNEL_HEADER.size:]
+
+
+def check_channel_id(channel_id):
+    """Raises ValueError unless channel_id fits the binary frame header"""
+    if not isinstance(channel_id, int) or not 0 <= channel_id <= MAX_CHANNEL_ID:
+        raise ValueError(f"Channel number not supported: {channel_id!r}")
+
+
+def message_cost(message):
+    """Returns about how many bytes a queued message takes on the socket"""
+    if message.kind == KIND_AUDIO:
+        return len(message.payload)
+    return MESSAGE_OVERHEAD_BYTES + len(message.payload.get("data") or "")
+
+
+class Channel:
+    """One live session on a multiplexed socket"""
+
+    def __init__(self, channel_id, user_id, live_request_queue, outbound, coalescer,
+                 encoder, turns, turn_timer, binary=False, opus_encoder=None,
+                 opus_decoder=None):
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.live_request_queue = live_request_queue
+        self.outbound = outbound
+        self.coalescer = coalescer
+        self.encoder = encoder
+        self.turns = turns
+        self.turn_timer = turn_timer
+        self.binary = binary
+        self.opus_encoder = opus_encoder
+        self.opus_decoder = opus_decoder
+        self.sequencer = FrameSequencer()
+        # The task that queues the agent's events
+        self.task = None
+
+
+class FairScheduler:
+    """Picks the next message to send among the channels of one socket.
+
+    Deficit round robin: a channel gets `quantum` bytes of credit per round
+    and sends while its next message fits its credit. Channel messages come
+    from their outbound queues, whose `on_message` calls `notify()`; socket
+    messages (opened, closed) go through `put_control()` and are sent first.
+    """
+
+    def __init__(self, quantum=4096):
+        self.quantum = quantum
+        self._queues = {}
+        self._deficits = {}
+        self._active = deque()
+        self._control = deque()
+        self._ready = asyncio.Event()
+
+        # Counters
+        self.rotations = 0
+
+    def add(self, channel_id, outbound):
+        self._queues[channel_id] = outbound
+
+    def remove(self, channel_id):
+        """Forgets a channel, and the messages it has queued"""
+        self._queues.pop(channel_id, None)
+        if self._deficits.pop(channel_id, None) is not None:
+            self._active.remove(channel_id)
+
+    def notify(self, channel_id):
+        """A message was queued on the channel"""
+        if channel_id in self._queues and channel_id not in self._deficits:
+            self._deficits[channel_id] = self.quantum
+            self._active.append(channel_id)
+            self._ready.set()
+
+    def put_control(self, frame):
+        """Queues an encoded socket message"""
+        self._control.append(frame)
+        self._ready.set()
+
+    async def next(self):
+        """Waits for the next message: (channel_id, OutboundMessage), or
+        (None, frame) for a socket message"""
+        while True:
+            if self._control:
+                return None, self._control.popleft()
+            if not self._active:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            channel_id = self._active[0]
+            outbound = self._queues[channel_id]
+            message = outbound.peek()
+            if message is None:
+                # An idle channel leaves the round and keeps no credit
+                self._active.popleft()
+                del self._deficits[channel_id]
+                continue
+            cost = message_cost(message)
+            if cost <= self._deficits[channel_id]:
+                self._deficits[channel_id] -= cost
+                return channel_id, outbound.get_nowait()
+            # Out of credit: the next channel's turn, with more credit for
+            # this one in the next round
+            self._deficits[channel_id] += self.quantum
+            self._active.rotate(-1)
+            self.rotations += 1
+
+    def stats(self):
+        return {
+            "channels": len(self._queues),
+            "active": len(self._active),
+            "quantum": self.quantum,
+            "rotations": self.rotations,
+        }
+
+
+class ChannelSessions:
+    """The live sessions behind the channels of multiplexed sockets"""
+
+    async def open(self, channel_id, options, on_message):
+        """Starts the live session of a channel from its `open` options.
+
+        The channel's outbound queue calls `on_message` when a message is
+        queued. Returns (Channel, live_events, opened), `opened` being the
+        body of the "opened" message.
+        """
+        raise NotImplementedError
+
+    async def stream(self, channel, live_events):
+        """Queues the agent's events for the channel until the session ends"""
+        raise NotImplementedError
+
+    async def send(self, websocket, channel, message):
+        """Encodes and sends a queued message of the channel"""
+        raise NotImplementedError
+
+    async def receive_audio(self, channel, frame, received):
+        """Sends the audio of a binary frame to the channel's agent"""
+        raise NotImplementedError
+
+    def receive_message(self, channel, message, received):
+        """Sends a client message to the channel's agent"""
+        raise NotImplementedError
+
+    def hand_over(self, channel):
+        """Saves the live session of a drained channel for the next worker"""
+        raise NotImplementedError
+
+    def end(self, channel, handed_over):
+        """Ends the live session of a closed channel"""
+        raise NotImplementedError
+
+
+class MuxSocket:
+    """The channels of one multiplexed socket"""
+
+    def __init__(self, websocket, sessions, encoder, drainer, quantum=4096,
+                 max_channels=1000, flush_seconds=1.0, log=None):
+        self.websocket = websocket
+        self.sessions = sessions
+        self.encoder = encoder
+        self.drainer = drainer
+        self.max_channels = max_channels
+        self.flush_seconds = flush_seconds
+        self.log = log or StreamLog(logging.getLogger(__name__))
+        self.scheduler = FairScheduler(quantum)
+        self.channels = {}
+        # Channels whose live session is starting, and why to close them
+        # once it started, if they were closed meanwhile
+        self._opening = {}
+        self._open_tasks = set()
+
+    async def run(self):
+        """Serves the channels until the socket is disconnected or fails,
+        then ends every session of the socket"""
+        tasks = [
+            asyncio.create_task(self._send()),
+            asyncio.create_task(self._receive()),
+        ]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        for channel in list(self.channels.values()):
+            self.close(channel, CLOSE_CLIENT)
+        for channel_id in self._opening:
+            self._opening[channel_id] = CLOSE_CLIENT
+
+    def message(self, channel_id, **fields):
+        """Encodes a socket message about a channel"""
+        return self.encoder.message({"channel": channel_id, **fields})
+
+    def closed_message(self, channel_id, reason, error=None):
+        """Encodes the message that tells the client a channel was closed"""
+        if error is None:
+            return self.message(channel_id, closed=reason)
+        return self.message(channel_id, closed=reason, error=error)
+
+    def open(self, channel_id, options):
+        """Opens a channel, and starts its live session in the background"""
+        check_channel_id(channel_id)
+        if channel_id in self.channels or channel_id in self._opening:
+            raise ValueError(f"Channel {channel_id} is already open")
+
+        # A draining worker takes no new sessions, and a socket only so many
+        if self.drainer.draining:
+            self.scheduler.put_control(self.message(channel_id, closed=CLOSE_RESTART))
+            return
+        if len(self.channels) + len(self._opening) >= self.max_channels:
+            self.scheduler.put_control(self.message(channel_id, closed=CLOSE_TOO_MANY_CHANNELS))
+            return
+
+        self._opening[channel_id] = None
+        task = asyncio.create_task(self._start(channel_id, options))
+        self._open_tasks.add(task)
+        task.add_done_callback(self._open_tasks.discard)
+
+    def close(self, channel, reason, error=None):
+        """Ends the live session of a channel and tells the client why"""
+        if self.channels.get(channel.channel_id) is not channel:
+            return
+        del self.channels[channel.channel_id]
+        self.scheduler.remove(channel.channel_id)
+        if channel.task is not asyncio.current_task():
+            channel.task.cancel()
+        self.drainer.unregister(channel, channel.turns)
+        # A drained channel's live session was handed over already
+        self.sessions.end(channel, reason == CLOSE_RESTART)
+        self.scheduler.put_control(self.closed_message(channel.channel_id, reason, error))
+        self.log.info("Client #%s channel %s closed: %s", channel.user_id, channel.channel_id, reason)
+
+    def reject(self, channel_id, error):
+        """Closes the channel of a client frame or message that failed, and
+        only that channel; channel_id is None when the frame's channel
+        couldn't be read"""
+        if isinstance(error, (KeyError, TypeError, ValueError)):
+            detail = repr(error)
+            self.log.info("Channel %s: bad message: %s", channel_id, detail)
+        else:
+            # Don't tell the client about server errors
+            detail = "internal error"
+            self.log.error("Channel %s failed: %r", channel_id, error)
+        channel = self.channels.get(channel_id) if isinstance(channel_id, int) else None
+        if channel is not None:
+            self.close(channel, CLOSE_ERROR, detail)
+        else:
+            self.scheduler.put_control(self.closed_message(channel_id, CLOSE_ERROR, detail))
+
+    async def _start(self, channel_id, options):
+        """Starts the live session of an opening channel"""
+        try:
+            channel, live_events, opened = await self.sessions.open(
+                channel_id, options, functools.partial(self.scheduler.notify, channel_id)
+            )
+        except Exception as e:
+            del self._opening[channel_id]
+            self.reject(channel_id, e)
+            return
+        reason = self._opening.pop(channel_id)
+
+        self.channels[channel_id] = channel
+        self.scheduler.add(channel_id, channel.outbound)
+        self.scheduler.put_control(self.message(channel_id, opened=opened))
+        channel.task = asyncio.create_task(self._run_channel(channel, live_events))
+        # Registered per channel: the user may have other connections
+        self.drainer.register(
+            channel, channel.turns, functools.partial(self._finish_for_drain, channel)
+        )
+
+        # The channel was closed, or the worker started draining, while the
+        # session started
+        if reason is not None:
+            self.close(channel, reason)
+        elif self.drainer.draining:
+            await self._finish_for_drain(channel)
+
+    async def _finish_for_drain(self, channel):
+        # Hand the live session over, let the client receive what is queued
+        # and close the channel; the client opens it again on another socket
+        self.sessions.hand_over(channel)
+        await self._flush(channel)
+        self.close(channel, CLOSE_RESTART)
+
+    async def _flush(self, channel):
+        """Waits up to flush_seconds for a channel's queued messages to go"""
+        deadline = asyncio.get_running_loop().time() + self.flush_seconds
+        while (
+            len(channel.outbound) and self.channels.get(channel.channel_id) is channel
+            and asyncio.get_running_loop().time() < deadline
+        ):
+            await asyncio.sleep(0.01)
+
+    async def _run_channel(self, channel, live_events):
+        """Queues the agent's events for a channel until the session ends"""
+        reason = CLOSE_ENDED
+        try:
+            await self.sessions.stream(channel, live_events)
+            await self._flush(channel)
+        except OutboundQueueFull:
+            # A channel that can't keep up with its agent is closed, the
+            # others on the socket go on
+            self.log.info("Client #%s too slow: %s", channel.user_id, channel.outbound.stats())
+            reason = CLOSE_TOO_SLOW
+        except Exception as e:
+            self.log.info("Client #%s channel %s failed: %r", channel.user_id, channel.channel_id, e)
+            reason = CLOSE_ERROR
+        self.close(channel, reason)
+
+    async def _send(self):
+        """Sends the messages of the channels, taking turns between them"""
+        while True:
+            channel_id, message = await self.scheduler.next()
+            if channel_id is None:
+                await self.websocket.send_text(message)
+                continue
+            channel = self.channels[channel_id]
+            # A message that fails closes its channel; if the socket is gone,
+            # the "closed" message or the receiving side ends the socket
+            try:
+                await self.sessions.send(self.websocket, channel, message)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                self.reject(channel_id, e)
+
+    async def _receive(self):
+        """Client to agent communication"""
+        while True:
+            frame = await self.websocket.receive()
+            received = time.monotonic()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+
+            # A frame that fails closes its channel, not the socket
+            channel_id = None
+            try:
+                # Binary frames carry a channel's audio; frames for a channel
+                # that isn't open (yet, or any more) are dropped
+                if frame.get("bytes") is not None:
+                    channel_id, data = decode_channel_frame(frame["bytes"])
+                    channel = self.channels.get(channel_id)
+                    if channel is not None:
+                        await self.sessions.receive_audio(channel, data, received)
+                    continue
+
+                # Decode JSON envelope
+                envelope = self.encoder.codec.loads(frame["text"])
+                channel_id = envelope["channel"]
+                if "message" in envelope:
+                    channel = self.channels.get(channel_id)
+                    if channel is not None:
+                        self.sessions.receive_message(channel, envelope["message"], received)
+                elif "open" in envelope:
+                    self.open(channel_id, envelope["open"])
+                elif "close" in envelope:
+                    channel = self.channels.get(channel_id)
+                    if channel is not None:
+                        self.close(channel, CLOSE_CLIENT)
+                    elif channel_id in self._opening:
+                        self._opening[channel_id] = CLOSE_CLIENT
+                else:
+                    raise ValueError(f"Multiplexed message not supported: {sorted(envelope)}")
+            except Exception as e:
+                self.reject(channel_id, e)
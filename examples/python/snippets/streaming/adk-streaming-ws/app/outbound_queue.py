@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from collections import deque
+
+#
+# Outbound queue
+#
+# Sits between `runner.run_live` and the WebSocket so that a slow client never
+# stalls the live event generator. The queue is bounded; what happens when it
+# is full is decided by the overflow policy:
+#
+#   drop_partial_text  Drop the oldest queued partial text. The full text of
+#                      the turn is sent again when the model finishes it.
+#   coalesce_audio     Merge adjacent queued audio chunks of the same turn
+#                      into one message.
+#   disconnect         Give up on the client.
+#
+# Control messages (turn_complete, interrupted) are never dropped. If the
+# policy can't free a slot, the queue raises `OutboundQueueFull` and the
+# connection is closed.
+#
+# Messages are tagged with the number of the agent turn they belong to. When
+# the user interrupts the agent, `interrupt()` drops the turn's audio that is
+# still queued, and the sender skips the turn's audio it already took but
+# hasn't sent, so the `interrupted` message reaches the client without waiting
+# behind audio nobody will hear.
+#
+
+OVERFLOW_DROP_PARTIAL_TEXT = "drop_partial_text"
+OVERFLOW_COALESCE_AUDIO = "coalesce_audio"
+OVERFLOW_DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (
+    OVERFLOW_DROP_PARTIAL_TEXT,
+    OVERFLOW_COALESCE_AUDIO,
+    OVERFLOW_DISCONNECT,
+)
+
+# Message kinds
+KIND_CONTROL = "control"
+KIND_TEXT = "text"
+KIND_AUDIO = "audio"
+
+
+class OutboundQueueFull(Exception):
+    """Raised when a full outbound queue can't make room for a message"""
+
+
+class OutboundMessage:
+    """One message waiting to be sent to the client"""
+
+    __slots__ = ("kind", "payload", "partial", "enqueued_at", "turn")
+
+    def __init__(self, kind, payload, partial=False):
+        self.kind = kind
+        # dict for control and text messages, bytes for audio
+        self.payload = payload
+        self.partial = partial
+        self.enqueued_at = time.monotonic()
+        # Set when queued
+        self.turn = 0
+
+
+class OutboundQueue:
+    """Bounded per-connection queue of messages for the client.
+
+    `on_message` is called after every queued message, for a sender that
+    serves several queues (see multiplexer.py) instead of waiting on `get()`.
+    """
+
+    def __init__(self, max_size=256, policy=OVERFLOW_COALESCE_AUDIO, on_message=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy not supported: {policy}")
+        self.max_size = max_size
+        self.policy = policy
+        self.on_message = on_message
+        self._messages = deque()
+        self._not_empty = asyncio.Event()
+        self._interrupted = asyncio.Event()
+
+        # Set when partial text of the current turn was dropped
+        self.text_dropped_in_turn = False
+
+        # Number of the current agent turn, and of the last interrupted one
+        self.turn = 0
+        self.interrupted_turn = -1
+
+        # Counters
+        self.max_depth = 0
+        self.sent = 0
+        self.dropped_partial_text = 0
+        self.coalesced_audio = 0
+        self.overflows = 0
+        self.purged_audio = 0
+        self.purged_audio_bytes = 0
+
+    def __len__(self):
+        return len(self._messages)
+
+    def put_nowait(self, message):
+        """Queues a message without ever waiting for the client"""
+        if len(self._messages) >= self.max_size:
+            self.overflows += 1
+            if not self._make_room():
+                raise OutboundQueueFull(
+                    f"Outbound queue full ({self.max_size} messages, policy: {self.policy})"
+                )
+        message.turn = self.turn
+        self._messages.append(message)
+        self.max_depth = max(self.max_depth, len(self._messages))
+        self._not_empty.set()
+        if self.on_message:
+            self.on_message()
+
+    async def get(self):
+        """Waits for the next message to send"""
+        while not self._messages:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        self.sent += 1
+        return self._messages.popleft()
+
+    def peek(self):
+        """Returns the next message to send without taking it, or None"""
+        return self._messages[0] if self._messages else None
+
+    def get_nowait(self):
+        """Takes the next message to send; the queue must not be empty"""
+        self.sent += 1
+        return self._messages.popleft()
+
+    def end_turn(self):
+        """Resets the per-turn state after turn_complete or interrupted"""
+        self.text_dropped_in_turn = False
+        self.turn += 1
+
+    def interrupt(self):
+        """Drops the queued audio of the current turn, which was interrupted"""
+        self.interrupted_turn = self.turn
+        self._interrupted.set()
+        kept = deque()
+        for message in self._messages:
+            if message.kind == KIND_AUDIO and message.turn == self.turn:
+                self.purged_audio += 1
+                self.purged_audio_bytes += len(message.payload)
+            else:
+                kept.append(message)
+        self._messages = kept
+
+    async def hold(self, seconds):
+        """Waits up to `seconds` before sending; an interruption ends the wait"""
+        self._interrupted.clear()
+        try:
+            await asyncio.wait_for(self._interrupted.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def discard_stale(self, message):
+        """True if the message is audio of an interrupted turn, which the
+        sender drops; counted as purged"""
+        if message.kind != KIND_AUDIO or message.turn != self.interrupted_turn:
+            return False
+        self.purged_audio += 1
+        self.purged_audio_bytes += len(message.payload)
+        return True
+
+    def stats(self):
+        """Returns the queue depth and drop counters"""
+        return {
+            "policy": self.policy,
+            "depth": len(self._messages),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped_partial_text": self.dropped_partial_text,
+            "coalesced_audio": self.coalesced_audio,
+            "overflows": self.overflows,
+            "turn": self.turn,
+            "purged_audio": self.purged_audio,
+            "purged_audio_bytes": self.purged_audio_bytes,
+        }
+
+    def _make_room(self):
+        if self.policy == OVERFLOW_DROP_PARTIAL_TEXT:
+            return self._drop_oldest_partial_text()
+        if self.policy == OVERFLOW_COALESCE_AUDIO:
+            return self._coalesce_oldest_audio()
+        return False
+
+    def _drop_oldest_partial_text(self):
+        for i, message in enumerate(self._messages):
+            if message.kind == KIND_TEXT and message.partial:
+                del self._messages[i]
+                self.dropped_partial_text += 1
+                # The full text of an earlier turn was queued already
+                if message.turn == self.turn:
+                    self.text_dropped_in_turn = True
+                return True
+        return False
+
+    def _coalesce_oldest_audio(self):
+        previous = None
+        for i, message in enumerate(self._messages):
+            if (
+                previous is not None
+                and previous.kind == KIND_AUDIO
+                and message.kind == KIND_AUDIO
+                and message.turn == previous.turn
+            ):
+                previous.payload += message.payload
+                del self._messages[i]
+                self.coalesced_audio += 1
+                return True
+            previous = message
+        return False
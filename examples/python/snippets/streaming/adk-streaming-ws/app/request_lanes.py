@@ -0,0 +1,182 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from collections import deque
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.live_request_queue import LiveRequest
+from google.genai import types
+
+#
+# Request lanes
+#
+# ADK takes client input out of the LiveRequestQueue one request at a time
+# and waits until the model connection has sent it. A LiveRequestQueue is
+# first in, first out, so while the connection is behind on microphone audio
+# a typed message waits for all the audio queued before it. The
+# LaneRequestQueue keeps each kind of request in a lane of its own and hands
+# ADK the next request by lane priority:
+#
+#   control  close
+#   text     content, e.g. a typed message or a tool response
+#   audio    realtime blobs, and the activity start/end signals that bound
+#            them, in order
+#
+# When more than `max_audio_ms` of audio waits, the oldest is shed, so the
+# model hears recent speech instead of falling further behind. With
+# `audio_rate`, the lane releases at most that many seconds of audio per
+# second, after a burst of a second. `prioritize=False` keeps arrival order
+# across the lanes, for comparison.
+#
+
+LANE_CONTROL = "control"
+LANE_TEXT = "text"
+LANE_AUDIO = "audio"
+LANES = (LANE_CONTROL, LANE_TEXT, LANE_AUDIO)
+
+# Audio the rate limit lets through at once, in seconds
+AUDIO_BURST_SECONDS = 1.0
+
+
+def request_lane(request):
+    """Returns the lane of a LiveRequest"""
+    if request.close:
+        return LANE_CONTROL
+    if request.content is not None:
+        return LANE_TEXT
+    return LANE_AUDIO
+
+
+class LaneRequestQueue(LiveRequestQueue):
+    """LiveRequestQueue that hands out control and text ahead of audio"""
+
+    def __init__(self, audio_bytes_per_second=32000, max_audio_ms=2000, audio_rate=0.0,
+                 prioritize=True, on_dequeue=None):
+        super().__init__()
+        self.audio_bytes_per_second = audio_bytes_per_second
+        self.max_audio_bytes = max_audio_ms * audio_bytes_per_second // 1000
+        self.audio_rate = audio_rate
+        self.prioritize = prioritize
+        # Called with the lane and the seconds a request waited
+        self.on_dequeue = on_dequeue
+        if prioritize:
+            self._lanes = {lane: deque() for lane in LANES}
+        else:
+            # One queue behind every lane keeps arrival order
+            fifo = deque()
+            self._lanes = {lane: fifo for lane in LANES}
+        self._queues = list({id(queue): queue for queue in self._lanes.values()}.values())
+        self._ready = asyncio.Event()
+        self._audio_bytes = 0
+        # When the rate limit lets the next audio go
+        self._audio_free_at = 0.0
+
+        # Counters
+        self.dequeued = dict.fromkeys(LANES, 0)
+        self.shed_audio = 0
+        self.shed_audio_bytes = 0
+        self.throttled = 0
+
+    def send(self, req):
+        lane = request_lane(req)
+        nbytes = len(req.blob.data or b"") if req.blob is not None else 0
+        self._lanes[lane].append((lane, req, time.monotonic(), nbytes))
+        if nbytes:
+            self._audio_bytes += nbytes
+            if self.max_audio_bytes and self._audio_bytes > self.max_audio_bytes:
+                self._shed_audio()
+        self._ready.set()
+
+    def close(self):
+        self.send(LiveRequest(close=True))
+
+    def send_content(self, content):
+        self.send(LiveRequest(content=content))
+
+    def send_realtime(self, blob):
+        self.send(LiveRequest(blob=blob))
+
+    def send_activity_start(self):
+        self.send(LiveRequest(activity_start=types.ActivityStart()))
+
+    def send_activity_end(self):
+        self.send(LiveRequest(activity_end=types.ActivityEnd()))
+
+    async def get(self):
+        while True:
+            now = time.monotonic()
+            timeout = None
+            for queue in self._queues:
+                if not queue:
+                    continue
+                _, request, _, nbytes = queue[0]
+                if nbytes and self.audio_rate and self._audio_free_at > now:
+                    timeout = self._audio_free_at - now
+                    self.throttled += 1
+                    break
+                return self._pop(queue, now)
+            # Woken by the next request, or when the rate limit lets the
+            # audio go
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        depth = dict.fromkeys(LANES, 0)
+        for queue in self._queues:
+            for lane, *_ in queue:
+                depth[lane] += 1
+        return {
+            "prioritize": self.prioritize,
+            "depth": depth,
+            "audio_queued_ms": round(self._audio_bytes * 1000 / self.audio_bytes_per_second),
+            "dequeued": dict(self.dequeued),
+            "shed_audio": self.shed_audio,
+            "shed_audio_ms": round(self.shed_audio_bytes * 1000 / self.audio_bytes_per_second),
+            "throttled": self.throttled,
+        }
+
+    def _pop(self, queue, now):
+        lane, request, enqueued_at, nbytes = queue.popleft()
+        if nbytes:
+            self._audio_bytes -= nbytes
+            if self.audio_rate:
+                free_at = max(self._audio_free_at, now - AUDIO_BURST_SECONDS)
+                self._audio_free_at = (
+                    free_at + nbytes / self.audio_bytes_per_second / self.audio_rate
+                )
+        self.dequeued[lane] += 1
+        if self.on_dequeue:
+            self.on_dequeue(lane, now - enqueued_at)
+        return request
+
+    def _shed_audio(self):
+        """Drops the oldest audio until the lane is back under its limit"""
+        queue = self._lanes[LANE_AUDIO]
+        kept = deque()
+        while queue and self._audio_bytes > self.max_audio_bytes:
+            entry = queue.popleft()
+            nbytes = entry[3]
+            if nbytes:
+                self._audio_bytes -= nbytes
+                self.shed_audio += 1
+                self.shed_audio_bytes += nbytes
+            else:
+                # Activity signals and the other lanes' requests stay
+                kept.append(entry)
+        queue.extendleft(reversed(kept))
@@ -0,0 +1,296 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# ResumableRunner hooks into a private method of the Runner of google-adk
+# 1.10 (see requirements.txt), the only place the live invocation context can
+# be reached. The parameters and the context field it relies on are checked
+# once, and tests/test_resumable_runner.py fails when an upgrade changes them.
+LIVE_CONTEXT_PARAMETERS = ("self", "session", "live_request_queue", "run_config")
+LIVE_CONTEXT_HANDLE_FIELD = "live_session_resumption_handle"
+
+
+def supports_resumption_handles():
+    """Returns whether the installed Runner creates live invocation contexts
+    the way ResumableRunner expects"""
+    method = getattr(Runner, "_new_invocation_context_for_live", None)
+    if method is None or LIVE_CONTEXT_HANDLE_FIELD not in InvocationContext.model_fields:
+        return False
+    parameters = inspect.signature(method).parameters
+    return (
+        tuple(parameters) == LIVE_CONTEXT_PARAMETERS
+        and parameters["live_request_queue"].kind is inspect.Parameter.KEYWORD_ONLY
+    )
+
+
+RESUMPTION_HANDLES_SUPPORTED = supports_resumption_handles()
+if not RESUMPTION_HANDLES_SUPPORTED:
+    logger.warning(
+        "This google-adk version doesn't match runner_registry.py; live sessions "
+        "will not be resumed"
+    )
+
+
+class _LiveInvocationContext(InvocationContext):
+    """Invocation context that shares its resumption handle with its copies.
+
+    Each agent of a live run works on its own copy of the context, and ADK
+    keeps the latest handle the model sent in that copy. Copies share the
+    private attributes of the original, so every copy records the handle in
+    the same `_resumption`.
+    """
+
+    _resumption: dict = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "live_session_resumption_handle":
+            self._resumption["handle"] = value
+
+
+class ResumableRunner(Runner):
+    """Runner that exposes the live session resumption handle of its streams.
+
+    ADK keeps the handle in the invocation context of `run_live`, which the
+    app can't reach. The runner remembers the handle of each
+    LiveRequestQueue and the session it runs in, so the app can save them
+    when a client disconnects or a worker shuts down and resume the live
+    session later or elsewhere. A handle is passed back to the model with the
+    public `RunConfig(session_resumption=...)` of the next `run_live`.
+
+    Only the private method that creates the context is overridden. With a
+    google-adk version it doesn't match, the runner behaves like `Runner` and
+    `resumption_handle` returns None.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resumptions = weakref.WeakKeyDictionary()
+
+    def _new_invocation_context_for_live(self, session, *, live_request_queue=None, **kwargs):
+        context = super()._new_invocation_context_for_live(
+            session, live_request_queue=live_request_queue, **kwargs
+        )
+        if not RESUMPTION_HANDLES_SUPPORTED:
+            return context
+        context = _LiveInvocationContext.model_construct(**dict(context))
+        context._resumption["session_id"] = session.id
+        if live_request_queue is not None:
+            self._resumptions[live_request_queue] = context._resumption
+        return context
+
+    def resumption_handle(self, live_request_queue):
+        """Returns the latest resumption handle of a live stream, or None"""
+        return self._resumptions.get(live_request_queue, {}).get("handle")
+
+    def live_session_id(self, live_request_queue):
+        """Returns the ID of the session a live stream runs in, or None"""
+        return self._resumptions.get(live_request_queue, {}).get("session_id")
+
+
+class RunnerRegistry:
+    """Process-wide registry of runners that share one set of services.
+
+    Creating an `InMemoryRunner` per connection gives every connection its own
+    session service, so setup cost and memory grow with each connection and
+    sessions can't be shared. The registry builds one `Runner` per app/agent
+    and keeps one session per user that reconnects can pick up again.
+
+    Connections get the user's session with `get_or_create_session` and hand
+    it back with `release_session`. A session no connection uses is dropped,
+    or with `keep`, e.g. while its live session can be resumed, kept for up
+    to `idle_ttl` seconds, among the `max_idle_sessions` most recently
+    released ones. Dropping a session deletes it from an in-memory service
+    (`delete_sessions`, the default without a `session_service`); a
+    persistent service keeps it and only unloads it from memory.
+    """
+
+    def __init__(self, session_service=None, artifact_service=None, memory_service=None,
+                 delete_sessions=None, idle_ttl=600.0, max_idle_sessions=10000):
+        self.session_service = session_service or InMemorySessionService()
+        self.artifact_service = artifact_service or InMemoryArtifactService()
+        self.memory_service = memory_service or InMemoryMemoryService()
+        self.delete_sessions = session_service is None if delete_sessions is None else delete_sessions
+        self.idle_ttl = idle_ttl
+        self.max_idle_sessions = max_idle_sessions
+        self._runners = {}
+        self._session_ids = {}
+        # (app_name, user_id) -> [lock, connections holding or waiting for it]
+        self._session_locks = {}
+        # (app_name, user_id) -> connections using the session
+        self._connections = {}
+        # (app_name, user_id) -> when the session was released, oldest first
+        self._idle = OrderedDict()
+
+        # Counters
+        self.sessions_dropped = 0
+        self.idle_expired = 0
+        self.idle_evicted = 0
+
+    def get_runner(self, app_name, agent):
+        """Returns the runner for an app/agent, creating it on first use"""
+        key = (app_name, agent.name)
+        runner = self._runners.get(key)
+        if runner is None:
+            runner = ResumableRunner(
+                app_name=app_name,
+                agent=agent,
+                session_service=self.session_service,
+                artifact_service=self.artifact_service,
+                memory_service=self.memory_service,
+            )
+            self._runners[key] = runner
+        return runner
+
+    async def get_or_create_session(self, app_name, user_id, session_id=None):
+        """Returns the user's existing session or creates a new one, for a
+        connection that releases it with `release_session`.
+
+        A `session_id`, e.g. of a live session to resume, is picked over the
+        session the registry knows for the user.
+        """
+        await self._drop_idle()
+        key = (app_name, user_id)
+        async with self._session_lock(key):
+            self._connections[key] = self._connections.get(key, 0) + 1
+            self._idle.pop(key, None)
+            session_id = session_id or self._session_ids.get(key)
+            if session_id is None:
+                # A persistent session service keeps the sessions of users
+                # this process hasn't seen, e.g. before a restart
+                response = await self.session_service.list_sessions(
+                    app_name=app_name, user_id=user_id
+                )
+                if response.sessions:
+                    session_id = max(
+                        response.sessions, key=lambda session: session.last_update_time
+                    ).id
+            if session_id is not None:
+                session = await self.session_service.get_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+                if session is not None:
+                    self._session_ids[key] = session.id
+                    return session
+
+            session = await self.session_service.create_session(
+                app_name=app_name, user_id=user_id
+            )
+            self._session_ids[key] = session.id
+            return session
+
+    async def release_session(self, app_name, user_id, keep=False):
+        """Ends a connection's use of the user's session; the last one drops
+        it, unless `keep`"""
+        key = (app_name, user_id)
+        async with self._session_lock(key):
+            connections = self._connections.get(key, 0) - 1
+            if connections > 0:
+                self._connections[key] = connections
+                return
+            self._connections.pop(key, None)
+            if keep and self.idle_ttl > 0 and self.max_idle_sessions > 0:
+                self._idle[key] = time.monotonic()
+                self._idle.move_to_end(key)
+            else:
+                await self._drop_session(key)
+        await self._drop_idle()
+
+    async def forget_session(self, app_name, user_id):
+        """Drops the user's session so the next connection starts fresh"""
+        key = (app_name, user_id)
+        async with self._session_lock(key):
+            self._connections.pop(key, None)
+            self._idle.pop(key, None)
+            await self._drop_session(key)
+
+    def stats(self):
+        """Returns the number of runners, tracked user sessions and the
+        sessions no connection uses"""
+        return {
+            "runners": len(self._runners),
+            "sessions": len(self._session_ids),
+            "idle_sessions": len(self._idle),
+            "sessions_dropped": self.sessions_dropped,
+            "idle_expired": self.idle_expired,
+            "idle_evicted": self.idle_evicted,
+        }
+
+    @asynccontextmanager
+    async def _session_lock(self, key):
+        """Holds the lock of a user's session; a lock nobody holds or waits
+        for is forgotten, so a later one can't run alongside it"""
+        entry = self._session_locks.get(key)
+        if entry is None:
+            entry = self._session_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._session_locks[key]
+
+    async def _drop_session(self, key):
+        """Drops a user's session; call it holding the session's lock"""
+        app_name, user_id = key
+        session_id = self._session_ids.pop(key, None)
+        if session_id is None:
+            return
+        self.sessions_dropped += 1
+        if self.delete_sessions:
+            await self.session_service.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+        elif hasattr(self.session_service, "unload_session"):
+            await self.session_service.unload_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+
+    async def _drop_idle(self):
+        """Drops the kept sessions past `idle_ttl` or beyond
+        `max_idle_sessions`"""
+        now = time.monotonic()
+        # Sessions are in the order they were released, so the expired and
+        # the least recently released ones are at the front
+        while self._idle:
+            key, released_at = next(iter(self._idle.items()))
+            if now - released_at > self.idle_ttl:
+                self.idle_expired += 1
+            elif len(self._idle) > self.max_idle_sessions:
+                self.idle_evicted += 1
+            else:
+                break
+            del self._idle[key]
+            async with self._session_lock(key):
+                # A connection may have picked the session up meanwhile
+                if key not in self._connections:
+                    await self._drop_session(key)
@@ -29,6 +29,44 @@ const ws_url =
 let websocket = null;
 let is_audio = false;
 
+// Binary frames: PCM audio is sent as raw bytes with a 4 byte header
+// (type: uint8, turn: uint8, sequence: uint16) instead of Base64 in JSON
+const use_binary_frames = true;
+const FRAME_HEADER_SIZE = 4;
+const FRAME_AUDIO_PCM = 0x01;
+let outboundSequence = 0;
+
+// Opus audio: asked for with ?codec=opus when the browser has WebCodecs. The
+// server answers with an audio_codec message. Opus frames carry 20 ms packets,
+// each prefixed with its length (uint16)
+const FRAME_AUDIO_OPUS = 0x02;
+const OPUS_FRAME_US = 20000;
+const use_opus = "AudioEncoder" in window && "AudioDecoder" in window;
+let audio_codec = "pcm";
+let opusEncoder = null;
+let opusDecoder = null;
+let opusPackets = [];
+let opusTimestamp = 0;
+let micTimestamp = 0;
+
+// Agent audio carries the number of its turn. Audio of an interrupted turn
+// that still arrives, or is still being decoded, is dropped instead of played
+let interruptedTurn = -1;
+let opusDiscardBefore = 0;
+
+function isStaleAudio(turn, turnBits) {
+  if (interruptedTurn < 0) {
+    return false;
+  }
+  const mask = turnBits ? (1 << turnBits) - 1 : -1;
+  if ((turn & mask) == (interruptedTurn & mask)) {
+    return true;
+  }
+  // Audio of a later turn: nothing of the interrupted one is left
+  interruptedTurn = -1;
+  return false;
+}
+
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
 const messageInput = document.getElementById("message");
@@ -38,7 +76,11 @@ let currentMessageId = null;
 // WebSocket handlers
 function connectWebsocket() {
   // Connect websocket
-  websocket = new WebSocket(ws_url + "?is_audio=" + is_audio);
+  websocket = new WebSocket(
+    ws_url + "?is_audio=" + is_audio + "&binary=" + use_binary_frames +
+      (use_opus ? "&codec=opus" : "")
+  );
+  websocket.binaryType = "arraybuffer";
 
   // Handle connection open
   websocket.onopen = function () {
@@ -53,10 +95,34 @@ function connectWebsocket() {
 
   // Handle incoming messages
   websocket.onmessage = function (event) {
+    // Binary frames carry PCM or Opus audio
+    if (event.data instanceof ArrayBuffer) {
+      const header = new DataView(event.data, 0, FRAME_HEADER_SIZE);
+      const frameType = header.getUint8(0);
+      if (isStaleAudio(header.getUint8(1), 8)) {
+        return;
+      }
+      if (frameType == FRAME_AUDIO_PCM && audioPlayerNode) {
+        audioPlayerNode.port.postMessage(event.data.slice(FRAME_HEADER_SIZE));
+      } else if (frameType == FRAME_AUDIO_OPUS && opusDecoder) {
+        decodeOpusFrame(event.data.slice(FRAME_HEADER_SIZE));
+      }
+      return;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
 
+    // The audio codec the server agreed to
+    if (message_from_server.audio_codec) {
+      audio_codec = message_from_server.audio_codec;
+      if (audio_codec == "opus") {
+        startOpusCodecs();
+      }
+      return;
+    }
+
     // Check if the turn is complete
     // if turn complete, add new message
     if (
@@ -72,7 +138,9 @@ function connectWebsocket() {
       message_from_server.interrupted &&
       message_from_server.interrupted === true
     ) {
-      // Stop audio playback if it's playing
+      // Stop audio playback if it's playing, and drop the rest of the turn
+      interruptedTurn = message_from_server.turn ?? -1;
+      opusDiscardBefore = opusTimestamp;
       if (audioPlayerNode) {
         audioPlayerNode.port.postMessage({ command: "endOfAudio" });
       }
@@ -80,6 +148,12 @@ function connectWebsocket() {
     }
 
     // If it's audio, play it
+    if (
+      message_from_server.mime_type == "audio/pcm" &&
+      isStaleAudio(message_from_server.turn, 0)
+    ) {
+      return;
+    }
     if (message_from_server.mime_type == "audio/pcm" && audioPlayerNode) {
       audioPlayerNode.port.postMessage(base64ToArray(message_from_server.data));
     }
@@ -95,9 +169,14 @@ function connectWebsocket() {
         messagesDiv.appendChild(message);
       }
 
-      // Add message text to the existing message element
+      // Add message text to the existing message element, or replace it
+      // with the full text if the server dropped partial text
       const message = document.getElementById(currentMessageId);
-      message.textContent += message_from_server.data;
+      if (message_from_server.replace) {
+        message.textContent = message_from_server.data;
+      } else {
+        message.textContent += message_from_server.data;
+      }
 
       // Scroll down to the bottom of the messagesDiv
       messagesDiv.scrollTop = messagesDiv.scrollHeight;
@@ -105,14 +184,16 @@ function connectWebsocket() {
   };
 
   // Handle connection close
-  websocket.onclose = function () {
+  websocket.onclose = function (event) {
     console.log("WebSocket connection closed.");
     document.getElementById("sendButton").disabled = true;
     document.getElementById("messages").textContent = "Connection closed";
+    // 1012: the server is restarting and handed the session over, so
+    // reconnect right away
     setTimeout(function () {
       console.log("Reconnecting...");
       connectWebsocket();
-    }, 5000);
+    }, event.code == 1012 ? 500 : 5000);
   };
 
   websocket.onerror = function (e) {
@@ -149,6 +230,117 @@ function sendMessage(message) {
   }
 }
 
+// Send audio to the server as a binary frame
+function sendAudioFrame(pcmBytes, frameType = FRAME_AUDIO_PCM) {
+  if (websocket && websocket.readyState == WebSocket.OPEN) {
+    const frame = new Uint8Array(FRAME_HEADER_SIZE + pcmBytes.byteLength);
+    const header = new DataView(frame.buffer, 0, FRAME_HEADER_SIZE);
+    header.setUint8(0, frameType);
+    header.setUint8(1, 0);
+    header.setUint16(2, outboundSequence);
+    outboundSequence = (outboundSequence + 1) & 0xffff;
+    frame.set(pcmBytes, FRAME_HEADER_SIZE);
+    websocket.send(frame.buffer);
+  }
+}
+
+// Create the Opus encoder of the microphone audio (16 kHz) and the decoder
+// of the agent's audio (24 kHz)
+function startOpusCodecs() {
+  if (opusEncoder) {
+    return;
+  }
+  opusEncoder = new AudioEncoder({
+    output: (chunk) => {
+      const packet = new Uint8Array(chunk.byteLength);
+      chunk.copyTo(packet);
+      opusPackets.push(packet);
+    },
+    error: (e) => console.log("Opus encoder error: ", e),
+  });
+  opusEncoder.configure({
+    codec: "opus",
+    sampleRate: 16000,
+    numberOfChannels: 1,
+    bitrate: 24000,
+    opus: { frameDuration: OPUS_FRAME_US },
+  });
+  opusDecoder = new AudioDecoder({
+    output: playDecodedAudio,
+    error: (e) => console.log("Opus decoder error: ", e),
+  });
+  opusDecoder.configure({ codec: "opus", sampleRate: 24000, numberOfChannels: 1 });
+}
+
+// Encode 16-bit PCM of the microphone; packets are sent with the next batch
+function encodeOpus(pcmData) {
+  const samples = pcmData.byteLength / 2;
+  const audioData = new AudioData({
+    format: "s16",
+    sampleRate: 16000,
+    numberOfFrames: samples,
+    numberOfChannels: 1,
+    timestamp: micTimestamp,
+    data: pcmData,
+  });
+  micTimestamp += (samples * 1000000) / 16000;
+  opusEncoder.encode(audioData);
+  audioData.close();
+}
+
+// Send Opus packets, each prefixed with its length, in one binary frame
+function sendOpusFrame(packets) {
+  let length = 0;
+  for (const packet of packets) {
+    length += 2 + packet.byteLength;
+  }
+  const payload = new Uint8Array(length);
+  const view = new DataView(payload.buffer);
+  let offset = 0;
+  for (const packet of packets) {
+    view.setUint16(offset, packet.byteLength);
+    payload.set(packet, offset + 2);
+    offset += 2 + packet.byteLength;
+  }
+  sendAudioFrame(payload, FRAME_AUDIO_OPUS);
+}
+
+// Decode the Opus packets of a binary frame
+function decodeOpusFrame(buffer) {
+  const view = new DataView(buffer);
+  let offset = 0;
+  while (offset + 2 <= buffer.byteLength) {
+    const length = view.getUint16(offset);
+    const packet = new Uint8Array(buffer, offset + 2, length);
+    opusDecoder.decode(
+      new EncodedAudioChunk({ type: "key", timestamp: opusTimestamp, data: packet })
+    );
+    opusTimestamp += OPUS_FRAME_US;
+    offset += 2 + length;
+  }
+}
+
+// Play decoded Opus audio as 16-bit PCM at 24 kHz; browsers may decode Opus
+// at 48 kHz, whose band is below 12 kHz here, so every other sample is kept.
+// Audio decoded after an interruption from packets before it is dropped
+function playDecodedAudio(audioData) {
+  if (audioData.timestamp < opusDiscardBefore) {
+    audioData.close();
+    return;
+  }
+  const samples = new Float32Array(audioData.numberOfFrames);
+  audioData.copyTo(samples, { planeIndex: 0, format: "f32-planar" });
+  const step = audioData.sampleRate / 24000;
+  audioData.close();
+  const pcm16 = new Int16Array(Math.floor(samples.length / step));
+  for (let i = 0; i < pcm16.length; i++) {
+    pcm16[i] = Math.max(-1, Math.min(1, samples[Math.floor(i * step)])) * 0x7fff;
+  }
+  if (audioPlayerNode) {
+    audioPlayerNode.port.postMessage(pcm16.buffer);
+  }
+}
+
 // Decode Base64 data to Array
 function base64ToArray(base64) {
   const binaryString = window.atob(base64);
@@ -207,8 +399,12 @@ startAudioButton.addEventListener("click", () => {
 
 // Audio recorder handler
 function audioRecorderHandler(pcmData) {
-  // Add audio data to buffer
-  audioBuffer.push(new Uint8Array(pcmData));
+  // Encode it to Opus, or add audio data to buffer
+  if (audio_codec == "opus" && opusEncoder) {
+    encodeOpus(pcmData);
+  } else {
+    audioBuffer.push(new Uint8Array(pcmData));
+  }
   
   // Start timer if not already running
   if (!bufferTimer) {
@@ -218,6 +414,13 @@ function audioRecorderHandler(pcmData) {
 
 // Send buffered audio data every 0.2 seconds
 function sendBufferedAudio() {
+  // Send the Opus packets encoded since the last batch
+  if (opusPackets.length > 0) {
+    sendOpusFrame(opusPackets);
+    console.log("[CLIENT TO AGENT] sent %s Opus packets", opusPackets.length);
+    opusPackets = [];
+  }
+
   if (audioBuffer.length === 0) {
     return;
   }
@@ -237,10 +440,14 @@ function sendBufferedAudio() {
   }
   
   // Send the combined audio data
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(combinedBuffer.buffer),
-  });
+  if (use_binary_frames) {
+    sendAudioFrame(combinedBuffer);
+  } else {
+    sendMessage({
+      mime_type: "audio/pcm",
+      data: arrayBufferToBase64(combinedBuffer.buffer),
+    });
+  }
   console.log("[CLIENT TO AGENT] sent %s bytes", combinedBuffer.byteLength);
   
   // Clear the buffer
@@ -255,7 +462,7 @@ function stopAudioRecording() {
   }
   
   // Send any remaining buffered audio
-  if (audioBuffer.length > 0) {
+  if (audioBuffer.length > 0 || opusPackets.length > 0) {
     sendBufferedAudio();
   }
 }
@@ -0,0 +1,162 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import json
+import logging
+import queue
+import sys
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+#
+# Streaming logs
+#
+# A synchronous print() per event makes stdout a serialization point of the
+# streaming loops. Here every event bumps a counter, and only a sample of the
+# events of each category becomes a log line. Log records go through a
+# bounded queue to a background thread that formats and writes them, so the
+# event loop never blocks on I/O; when the queue is full, records are dropped
+# and counted. In metrics-only mode the hot path only counts.
+#
+
+LOG_MODE_LINES = "lines"
+LOG_MODE_METRICS = "metrics"
+
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
+
+
+def parse_sample_rates(value):
+    """Parses "category=rate,category=rate" into a dict"""
+    rates = {}
+    for item in value.split(","):
+        if item.strip():
+            category, _, rate = item.partition("=")
+            rates[category.strip()] = float(rate)
+    return rates
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats a record and its fields as text or as a JSON line"""
+
+    def __init__(self, log_format=LOG_FORMAT_TEXT):
+        super().__init__()
+        self.log_format = log_format
+
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        if self.log_format == LOG_FORMAT_JSON:
+            return json.dumps({
+                "time": record.created,
+                "level": record.levelname,
+                "category": getattr(record, "category", None),
+                "message": record.getMessage(),
+                **fields,
+            }, default=str)
+        message = record.getMessage()
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queues records without blocking; drops them when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_async_logging(name, queue_size=10000, log_format=LOG_FORMAT_TEXT,
+                        stream=None):
+    """Returns a logger whose records are written by a background thread"""
+    log_queue = queue.Queue(queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(log_format))
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    return logger
+
+
+class StreamLog:
+    """Counts streaming events and logs a sample of them per category.
+
+    A category with a sample rate of 0.1 logs every 10th event, 0 logs none.
+    Categories without a rate log every event.
+    """
+
+    def __init__(self, logger, sample_rates=None, metrics_only=False):
+        self.logger = logger
+        self.metrics_only = metrics_only
+        self.counters = Counter()
+        self.bytes = Counter()
+        # Log every n-th event of a category (0: never)
+        self._every = {
+            category: round(1 / rate) if rate > 0 else 0
+            for category, rate in (sample_rates or {}).items()
+        }
+
+    def event(self, category, message, *args, **fields):
+        """Counts an event and logs it if it is sampled; `message` is
+        formatted with `args` only when the line is written"""
+        self.counters[category] += 1
+        if self.metrics_only:
+            return
+        every = self._every.get(category, 1)
+        if every and self.counters[category] % every == 0:
+            self.logger.info(
+                message, *args, extra={"category": category, "fields": fields}
+            )
+
+    def count(self, category, size=0):
+        """Counts an event and its size in bytes without logging it"""
+        self.counters[category] += 1
+        self.bytes[category] += size
+
+    def info(self, message, *args, **fields):
+        """Logs a lifecycle message, which is never sampled"""
+        self.logger.info(message, *args, extra={"category": "lifecycle", "fields": fields})
+
+    def error(self, message, *args, **fields):
+        """Logs an error, which is never sampled"""
+        self.logger.error(message, *args, extra={"category": "error", "fields": fields})
+
+    def stats(self):
+        """Returns the event and byte counters and the dropped log records"""
+        dropped = sum(
+            getattr(handler, "dropped", 0) for handler in self.logger.handlers
+        )
+        return {
+            "metrics_only": self.metrics_only,
+            "events": dict(self.counters),
+            "bytes": dict(self.bytes),
+            "dropped_log_records": dropped,
+        }
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from dispatcher import Dispatcher
+
+
+async def send(dispatcher, request):
+    server = await asyncio.start_server(dispatcher._handle_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response.split(b"\r\n", 1)[0]
+    finally:
+        server.close()
+
+
+def test_body_over_limit_is_refused():
+    # The worker is never reached, so it doesn't have to exist
+    dispatcher = Dispatcher([("127.0.0.1", 1)], max_body_size=10)
+
+    status = asyncio.run(send(dispatcher, b"POST /send/u HTTP/1.1\r\nContent-Length: 11\r\n\r\n"))
+
+    assert status == b"HTTP/1.1 413 Payload Too Large"
+    assert dispatcher.stats()["refused"] == 1
+    assert dispatcher.stats()["requests"] == {"127.0.0.1:1": 0}
+
+
+def test_invalid_content_length_is_refused():
+    dispatcher = Dispatcher([("127.0.0.1", 1)])
+
+    status = asyncio.run(send(dispatcher, b"POST /send/u HTTP/1.1\r\nContent-Length: x\r\n\r\n"))
+
+    assert status == b"HTTP/1.1 400 Bad Request"
+    assert dispatcher.stats()["refused"] == 1
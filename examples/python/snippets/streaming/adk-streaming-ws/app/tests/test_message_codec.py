@@ -0,0 +1,37 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from message_codec import CODEC_JSON, CODEC_ORJSON, MessageEncoder, get_codec, orjson
+
+CODECS = [CODEC_JSON] + ([CODEC_ORJSON] if orjson else [])
+
+
+@pytest.mark.parametrize("codec_name", CODECS)
+@pytest.mark.parametrize("framing", [
+    {"text": True},
+    {"prefix": b'{"channel":3,"message":', "suffix": b"}", "text": True},
+    {"prefix": b"data: ", "suffix": b"\n\n"},
+])
+def test_control_with_turn_matches_encoding_it(codec_name, framing):
+    encoder = MessageEncoder(get_codec(codec_name), **framing)
+    for turn_complete in (None, False, True):
+        for interrupted in (None, False, True):
+            for turn in (0, 7, 1234):
+                assert encoder.control(turn_complete, interrupted, turn) == encoder.message({
+                    "turn_complete": turn_complete,
+                    "interrupted": interrupted,
+                    "turn": turn,
+                })
@@ -0,0 +1,154 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from drain import ResumptionStore
+from fake_live_model import create_fake_agent
+from multiplexer import encode_channel_frame
+from runner_registry import RunnerRegistry
+
+# Fails to start the live session of this user
+BROKEN_USER = "broken"
+# Takes SLOW_SECONDS to start the live session of this user
+SLOW_USER = "slow"
+SLOW_SECONDS = 0.5
+# Fails to send the messages of this channel
+BROKEN_CHANNEL = 2
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Yields a client of the app, with a fake agent"""
+    monkeypatch.setattr(main, "root_agent", create_fake_agent())
+    monkeypatch.setattr(main, "runner_registry", RunnerRegistry(idle_ttl=0))
+    monkeypatch.setattr(main, "resumption_store", ResumptionStore(str(tmp_path), 0))
+    start_agent_session = main.start_agent_session
+
+    async def start_or_fail(user_id, is_audio=False):
+        if user_id == BROKEN_USER:
+            raise RuntimeError("model unavailable")
+        if user_id == SLOW_USER:
+            await asyncio.sleep(SLOW_SECONDS)
+        return await start_agent_session(user_id, is_audio)
+
+    monkeypatch.setattr(main, "start_agent_session", start_or_fail)
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def websocket(client):
+    """Yields a multiplexed socket with channels 1 and 2 open"""
+    with client.websocket_connect("/ws-mux") as websocket:
+        for channel_id in (1, 2):
+            websocket.send_json({"channel": channel_id, "open": {"user_id": str(channel_id)}})
+            assert websocket.receive_json() == {
+                "channel": channel_id, "opened": {"audio_codec": "pcm"},
+            }
+        yield websocket
+
+
+def talk(websocket, channel_id):
+    """Runs a text turn on a channel"""
+    websocket.send_json({
+        "channel": channel_id, "message": {"mime_type": "text/plain", "data": "hi"},
+    })
+    while True:
+        envelope = websocket.receive_json()
+        assert envelope["channel"] == channel_id
+        if envelope["message"].get("turn_complete"):
+            return
+
+
+@pytest.mark.parametrize("frame, channel_id, error", [
+    (b"\x00\x01", None, "ValueError"),
+    ("not json", None, "Error"),
+    ('["channel", 3]', None, "TypeError"),
+    ('{"open": {"user_id": "3"}}', None, "KeyError"),
+    ('{"channel": -1, "open": {"user_id": "3"}}', -1, "ValueError"),
+    ('{"channel": 4294967296, "open": {"user_id": "3"}}', 4294967296, "ValueError"),
+    ('{"channel": "3", "open": {"user_id": "3"}}', "3", "ValueError"),
+    ('{"channel": 3, "open": {"is_audio": true}}', 3, "KeyError"),
+    ('{"channel": 3, "open": "3"}', 3, "TypeError"),
+    ('{"channel": 3, "open": {"user_id": "%s"}}' % BROKEN_USER, 3, "internal error"),
+    ('{"channel": 2, "open": {"user_id": "2"}}', 2, "already open"),
+    ('{"channel": 2, "message": {"data": "hi"}}', 2, "KeyError"),
+    ('{"channel": 2, "reopen": true}', 2, "not supported"),
+])
+def test_bad_frame_closes_only_its_channel(websocket, frame, channel_id, error):
+    if isinstance(frame, bytes):
+        websocket.send_bytes(frame)
+    else:
+        websocket.send_text(frame)
+
+    closed = websocket.receive_json()
+    assert closed["channel"] == channel_id
+    assert closed["closed"] == "error"
+    assert error in closed["error"]
+
+    # The socket and its other channel carry on
+    talk(websocket, 1)
+    if channel_id != 2:
+        talk(websocket, 2)
+
+
+def test_audio_for_a_closed_channel_is_dropped(websocket):
+    websocket.send_bytes(encode_channel_frame(9, bytes(64)))
+
+    # No "closed" message comes ahead of the turn
+    talk(websocket, 1)
+
+
+def test_slow_open_holds_back_no_other_channel(websocket):
+    websocket.send_json({"channel": 3, "open": {"user_id": SLOW_USER}})
+
+    # Channel 1 goes on while channel 3's session starts
+    talk(websocket, 1)
+    assert websocket.receive_json() == {"channel": 3, "opened": {"audio_codec": "pcm"}}
+    talk(websocket, 3)
+
+
+def test_failed_send_closes_only_its_channel(websocket, monkeypatch):
+    send_message = main.send_message
+
+    async def send_or_fail(websocket, outbound, message, *args):
+        if args[-1] == BROKEN_CHANNEL:
+            raise RuntimeError("encoder failed")
+        await send_message(websocket, outbound, message, *args)
+
+    monkeypatch.setattr(main, "send_message", send_or_fail)
+    websocket.send_json({
+        "channel": BROKEN_CHANNEL, "message": {"mime_type": "text/plain", "data": "hi"},
+    })
+
+    assert websocket.receive_json() == {
+        "channel": BROKEN_CHANNEL, "closed": "error", "error": "internal error",
+    }
+    talk(websocket, 1)
+
+
+def test_channels_drain_apart_from_the_users_sockets(client, websocket):
+    with client.websocket_connect("/ws/1?is_audio=false") as user_socket:
+        user_socket.send_json({"mime_type": "text/plain", "data": "hi"})
+        while not user_socket.receive_json().get("turn_complete"):
+            pass
+
+        # Channel 1 and the socket of user 1 both drain
+        assert client.get("/stats/drain").json()["sessions"] == 3
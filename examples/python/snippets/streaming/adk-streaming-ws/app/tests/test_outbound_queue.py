@@ -0,0 +1,63 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from outbound_queue import (
+    KIND_AUDIO,
+    KIND_TEXT,
+    OVERFLOW_COALESCE_AUDIO,
+    OVERFLOW_DROP_PARTIAL_TEXT,
+    OutboundMessage,
+    OutboundQueue,
+)
+
+
+def partial_text(text):
+    return OutboundMessage(KIND_TEXT, {"mime_type": "text/plain", "data": text}, partial=True)
+
+
+def drain(queue):
+    return [queue.get_nowait() for _ in range(len(queue))]
+
+
+def test_dropping_partial_text_of_an_earlier_turn_keeps_the_turn_lossless():
+    queue = OutboundQueue(2, OVERFLOW_DROP_PARTIAL_TEXT)
+    queue.put_nowait(partial_text("a"))
+    queue.end_turn()
+    queue.put_nowait(partial_text("b"))
+    queue.put_nowait(partial_text("c"))
+    assert queue.dropped_partial_text == 1
+    assert not queue.text_dropped_in_turn
+    assert [message.payload["data"] for message in drain(queue)] == ["b", "c"]
+
+
+def test_dropping_partial_text_of_the_current_turn_marks_the_turn():
+    queue = OutboundQueue(2, OVERFLOW_DROP_PARTIAL_TEXT)
+    for text in "abc":
+        queue.put_nowait(partial_text(text))
+    assert queue.text_dropped_in_turn
+    queue.end_turn()
+    assert not queue.text_dropped_in_turn
+
+
+def test_audio_is_not_coalesced_across_turns():
+    queue = OutboundQueue(3, OVERFLOW_COALESCE_AUDIO)
+    queue.put_nowait(OutboundMessage(KIND_AUDIO, b"\x01"))
+    queue.end_turn()
+    for chunk in (b"\x02", b"\x03", b"\x04"):
+        queue.put_nowait(OutboundMessage(KIND_AUDIO, chunk))
+    messages = drain(queue)
+    assert [(message.turn, message.payload) for message in messages] == [
+        (0, b"\x01"), (1, b"\x02\x03"), (1, b"\x04"),
+    ]
+    assert queue.coalesced_audio == 1
@@ -0,0 +1,91 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# ResumableRunner overrides a private method of google-adk's Runner. These
+# tests fail when an upgrade of google-adk changes it, before the app
+# silently stops resuming live sessions.
+
+import asyncio
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+from google.genai import types
+
+from fake_live_model import create_fake_agent
+from runner_registry import RESUMPTION_HANDLES_SUPPORTED, RunnerRegistry
+
+APP_NAME = "test"
+
+
+def test_installed_runner_matches_the_override():
+    assert RESUMPTION_HANDLES_SUPPORTED
+
+
+async def talk(registry, agent, handle=None):
+    """Runs one text turn, and returns the text of the answer and the
+    resumption handle the runner saw"""
+    runner = registry.get_runner(APP_NAME, agent)
+    session = await registry.get_or_create_session(APP_NAME, "user")
+    live_request_queue = LiveRequestQueue()
+    live_events = runner.run_live(
+        session=session,
+        live_request_queue=live_request_queue,
+        run_config=RunConfig(
+            response_modalities=["TEXT"],
+            session_resumption=types.SessionResumptionConfig(handle=handle),
+        ),
+    )
+    text = []
+    turn_complete = asyncio.Event()
+
+    # Like the app, keep reading the events: ADK records the handle while
+    # the stream is consumed
+    async def consume():
+        async for event in live_events:
+            if event.turn_complete:
+                turn_complete.set()
+            elif event.partial and event.content and event.content.parts:
+                text.append(event.content.parts[0].text or "")
+
+    consumer = asyncio.create_task(consume())
+    try:
+        live_request_queue.send_content(
+            types.Content(role="user", parts=[types.Part(text="hi")])
+        )
+        await asyncio.wait_for(turn_complete.wait(), 5)
+        # The fake model sends the handle right after the turn
+        for _ in range(100):
+            if runner.resumption_handle(live_request_queue):
+                break
+            await asyncio.sleep(0.01)
+        assert runner.live_session_id(live_request_queue) == session.id
+        return "".join(text), runner.resumption_handle(live_request_queue)
+    finally:
+        live_request_queue.close()
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+
+
+def test_runner_sees_the_handle_and_resumes_with_it():
+    async def run():
+        registry = RunnerRegistry()
+        agent = create_fake_agent()
+        _, handle = await talk(registry, agent)
+        resumed_text, _ = await talk(registry, agent, handle)
+        return handle, resumed_text
+
+    handle, resumed_text = asyncio.run(run())
+
+    assert handle and handle.startswith("fake-")
+    assert "resumed" in resumed_text
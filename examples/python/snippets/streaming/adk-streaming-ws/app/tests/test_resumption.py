@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi.testclient import TestClient
+
+import main
+from drain import ResumptionStore
+from fake_live_model import create_fake_agent
+from runner_registry import RunnerRegistry
+
+USER_ID = "42"
+
+
+def start_worker(monkeypatch, directory):
+    """Gives the app the registry and resumption store of a new worker
+    process, with in-memory sessions"""
+    registry = RunnerRegistry()
+    store = ResumptionStore(str(directory))
+    monkeypatch.setattr(main, "runner_registry", registry)
+    monkeypatch.setattr(main, "resumption_store", store)
+    return registry, store
+
+
+def talk(client):
+    """Connects, runs one text turn and disconnects; returns the text"""
+    text = []
+    with client.websocket_connect(f"/ws/{USER_ID}?is_audio=false") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"mime_type": "text/plain", "data": "hi"})
+        while not (message := websocket.receive_json()).get("turn_complete"):
+            if message.get("mime_type") == "text/plain":
+                text.append(message["data"])
+    return "".join(text)
+
+
+def test_handle_saved_by_one_worker_resumes_on_another(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "root_agent", create_fake_agent())
+    with TestClient(main.app) as client:
+        # The first worker keeps the handle when the client disconnects,
+        # and hands it over in a file when it drains
+        _, store = start_worker(monkeypatch, tmp_path)
+        assert "resumed" not in talk(client)
+        resumption = store.pop(USER_ID)
+        assert resumption.handle
+        store.save(USER_ID, resumption.handle, resumption.session_id)
+
+        # The next worker doesn't have the session, and resumes the live
+        # session in a new one
+        start_worker(monkeypatch, tmp_path)
+        assert "resumed" in talk(client)
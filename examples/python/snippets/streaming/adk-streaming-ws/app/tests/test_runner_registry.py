@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Run from the app folder:
+#   python -m pytest tests
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from drain import ResumptionStore
+from fake_live_model import create_fake_agent
+from google.adk.sessions import InMemorySessionService
+from runner_registry import RunnerRegistry
+
+APP_NAME = "test"
+USERS = 5
+CONNECTIONS = 50
+
+
+def session_sizes(registry):
+    """Returns the sessions of an in-memory service and the bytes of audio
+    in their events"""
+    sessions = [
+        session
+        for users in registry.session_service.sessions.values()
+        for user_sessions in users.values()
+        for session in user_sessions.values()
+    ]
+    audio_bytes = sum(
+        len(part.inline_data.data)
+        for session in sessions
+        for event in session.events
+        if event.content
+        for part in event.content.parts or []
+        if part.inline_data
+    )
+    return len(sessions), audio_bytes
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """Yields a function that sets up the app on the fake live model with a
+    new registry, and a client"""
+
+    def setup(resumption_ttl, max_idle_sessions=10000):
+        registry = RunnerRegistry(idle_ttl=resumption_ttl, max_idle_sessions=max_idle_sessions)
+        monkeypatch.setattr(main, "root_agent", create_fake_agent(audio_chunks=5))
+        monkeypatch.setattr(main, "runner_registry", registry)
+        monkeypatch.setattr(
+            main, "resumption_store", ResumptionStore(str(tmp_path), resumption_ttl)
+        )
+        return registry
+
+    with TestClient(main.app) as client:
+        yield setup, client
+
+
+def talk(client, user_id):
+    """Connects, runs one audio turn and disconnects"""
+    with client.websocket_connect(f"/ws/{user_id}?is_audio=true") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"mime_type": "text/plain", "data": "hi"})
+        while not websocket.receive_json().get("turn_complete"):
+            pass
+
+
+def test_sessions_are_dropped_after_disconnects(app):
+    setup, client = app
+    registry = setup(resumption_ttl=0)
+    for i in range(CONNECTIONS):
+        talk(client, i % USERS)
+    assert session_sizes(registry) == (0, 0)
+    assert registry.stats()["sessions"] == 0
+
+
+def test_kept_sessions_are_bounded(app):
+    setup, client = app
+    registry = setup(resumption_ttl=600, max_idle_sessions=2)
+    for i in range(CONNECTIONS):
+        talk(client, i % USERS)
+    sessions, _ = session_sizes(registry)
+    assert sessions <= 2
+    assert registry.stats()["sessions"] == sessions
+
+
+def test_session_is_kept_while_a_connection_uses_it():
+    async def run():
+        registry = RunnerRegistry()
+        first = await registry.get_or_create_session(APP_NAME, "1")
+        second = await registry.get_or_create_session(APP_NAME, "1")
+        assert second.id == first.id
+        await registry.release_session(APP_NAME, "1")
+        assert session_sizes(registry)[0] == 1
+        await registry.release_session(APP_NAME, "1")
+        assert session_sizes(registry)[0] == 0
+
+    asyncio.run(run())
+
+
+def test_kept_sessions_expire():
+    async def run():
+        registry = RunnerRegistry(idle_ttl=0.05)
+        session = await registry.get_or_create_session(APP_NAME, "1")
+        await registry.release_session(APP_NAME, "1", keep=True)
+        assert (await registry.get_or_create_session(APP_NAME, "1")).id == session.id
+        await registry.release_session(APP_NAME, "1", keep=True)
+        await asyncio.sleep(0.1)
+        await registry.get_or_create_session(APP_NAME, "2")
+        assert registry.stats()["idle_expired"] == 1
+        assert session_sizes(registry)[0] == 1
+
+    asyncio.run(run())
+
+
+class SlowDeleteSessionService(InMemorySessionService):
+    """Takes a while to delete a session"""
+
+    async def delete_session(self, **kwargs):
+        await asyncio.sleep(0.05)
+        await super().delete_session(**kwargs)
+
+
+def test_session_is_not_handed_out_while_it_is_dropped():
+    async def run():
+        service = SlowDeleteSessionService()
+        registry = RunnerRegistry(session_service=service, delete_sessions=True)
+        await registry.get_or_create_session(APP_NAME, "1")
+        release = asyncio.create_task(registry.release_session(APP_NAME, "1"))
+        await asyncio.sleep(0.01)
+
+        # The next connection waits for the session to be dropped
+        session = await registry.get_or_create_session(APP_NAME, "1")
+        await release
+        assert await service.get_session(
+            app_name=APP_NAME, user_id="1", session_id=session.id
+        ) is not None
+
+    asyncio.run(run())
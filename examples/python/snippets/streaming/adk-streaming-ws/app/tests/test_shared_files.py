@@ -0,0 +1,49 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# The WebSocket and SSE apps are separate downloads, so the modules they share
+# are copied into both. The tests run against this app's copies; this test
+# makes sure the SSE app's copies are the same files.
+
+from pathlib import Path
+
+import pytest
+
+APP = Path(__file__).resolve().parent.parent
+SSE_APP = APP.parent.parent / "adk-streaming" / "app"
+
+SHARED_FILES = (
+    "audio_coalescer.py",
+    "consistent_hash.py",
+    "dispatcher.py",
+    "drain.py",
+    "fake_live_model.py",
+    "message_codec.py",
+    "runner_registry.py",
+    "serve.py",
+    "sqlite_session_service.py",
+    "stream_logging.py",
+    "benchmarks/bench_audio_coalescer.py",
+    "benchmarks/bench_runner_registry.py",
+    "benchmarks/bench_session_writes.py",
+    "benchmarks/common.py",
+    "benchmarks/fake_app.py",
+)
+
+
+@pytest.mark.parametrize("path", SHARED_FILES)
+def test_sse_app_has_the_same_copy(path):
+    assert (SSE_APP / path).read_bytes() == (APP / path).read_bytes(), (
+        f"{path} differs between the apps; make the same change to both copies"
+    )
@@ -0,0 +1,127 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import time
+from collections import deque
+
+#
+# Audio coalescing
+#
+# The live model sends PCM audio in chunks of whatever size it likes, often a
+# few milliseconds each. Forwarding every chunk as its own message means
+# thousands of tiny frames per minute per user. The coalescer batches PCM into
+# fixed-duration frames between `live_events` and the transport, and is
+# flushed early on turn_complete or interrupted so no audio is held back at
+# the end of a turn.
+#
+
+# Number of recent frames kept for the frame size and latency statistics
+STATS_WINDOW = 1000
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class AudioCoalescer:
+    """Batches PCM chunks into frames of `frame_ms` milliseconds"""
+
+    def __init__(self, frame_ms=100, sample_rate=24000, sample_width=2):
+        self.frame_ms = frame_ms
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_bytes = sample_rate * sample_width * frame_ms // 1000
+        self._buffer = bytearray()
+        # Arrival time of the oldest byte in the buffer
+        self._oldest_at = None
+
+        # Statistics
+        self.chunks_in = 0
+        self.frames_out = 0
+        self.discarded_bytes = 0
+        self.frame_sizes_ms = deque(maxlen=STATS_WINDOW)
+        self.added_latencies = deque(maxlen=STATS_WINDOW)
+
+    def add(self, data, now=None):
+        """Adds a PCM chunk and returns the frames that are ready to send"""
+        now = time.monotonic() if now is None else now
+        self.chunks_in += 1
+
+        # Coalescing disabled: pass the chunk through
+        if self.frame_bytes <= 0:
+            self._record(len(data), 0.0)
+            return [data]
+
+        if not self._buffer:
+            self._oldest_at = now
+        self._buffer += data
+
+        frames = []
+        while len(self._buffer) >= self.frame_bytes:
+            frame = bytes(self._buffer[:self.frame_bytes])
+            del self._buffer[:self.frame_bytes]
+            self._record(len(frame), now - self._oldest_at)
+            frames.append(frame)
+            # What is left over arrived with the latest chunk
+            self._oldest_at = now
+        return frames
+
+    def flush(self, now=None):
+        """Returns whatever audio is buffered, or None"""
+        if not self._buffer:
+            return None
+        now = time.monotonic() if now is None else now
+        frame = bytes(self._buffer)
+        self._buffer.clear()
+        self._record(len(frame), now - self._oldest_at)
+        self._oldest_at = None
+        return frame
+
+    def discard(self):
+        """Drops the buffered audio, e.g. when the turn was interrupted, and
+        returns how many bytes were dropped"""
+        dropped = len(self._buffer)
+        self._buffer.clear()
+        self._oldest_at = None
+        self.discarded_bytes += dropped
+        return dropped
+
+    def stats(self):
+        """Returns the achieved frame sizes and the added latency percentiles"""
+        sizes = list(self.frame_sizes_ms)
+        latencies = list(self.added_latencies)
+        return {
+            "frame_ms": self.frame_ms,
+            "chunks_in": self.chunks_in,
+            "frames_out": self.frames_out,
+            "discarded_bytes": self.discarded_bytes,
+            "frame_size_ms": {
+                f"p{pct}": round(_percentile(sizes, pct), 1) for pct in (50, 95, 99)
+            },
+            "added_latency_ms": {
+                f"p{pct}": round(_percentile(latencies, pct) * 1000, 2)
+                for pct in (50, 95, 99)
+            },
+        }
+
+    def _record(self, size, latency):
+        self.frames_out += 1
+        self.frame_sizes_ms.append(
+            size * 1000 / (self.sample_rate * self.sample_width)
+        )
+        self.added_latencies.append(latency)
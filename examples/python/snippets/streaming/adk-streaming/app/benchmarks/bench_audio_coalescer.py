@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Replays a simulated live model audio stream through the AudioCoalescer at
+# several frame durations and reports the outbound message count (one send
+# per message), the encode CPU time, the achieved frame sizes and the added
+# latency.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_audio_coalescer --minutes 5
+
+import argparse
+import base64
+import json
+import random
+import time
+
+from audio_coalescer import AudioCoalescer
+
+SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+FRAME_DURATIONS_MS = (0, 40, 100, 250)
+
+
+def model_audio_stream(minutes, seed=0):
+    """Yields (arrival time, chunk) like a live model: small, irregular chunks
+    generated a bit faster than real time, with a turn end every few seconds"""
+    rng = random.Random(seed)
+    now = 0.0
+    audio_seconds = 0.0
+    while audio_seconds < minutes * 60:
+        turn_seconds = rng.uniform(2, 8)
+        turn_audio = 0.0
+        while turn_audio < turn_seconds:
+            chunk_ms = rng.choice((5, 10, 10, 20, 20, 40))
+            now += chunk_ms / 1000 * rng.uniform(0.3, 1.0)
+            turn_audio += chunk_ms / 1000
+            yield now, bytes(SAMPLE_RATE * SAMPLE_WIDTH * chunk_ms // 1000)
+        audio_seconds += turn_audio
+        now += 0.01
+        yield now, None  # turn_complete
+        now += rng.uniform(1, 3)
+
+
+def run(frame_ms, stream):
+    coalescer = AudioCoalescer(frame_ms, SAMPLE_RATE, SAMPLE_WIDTH)
+    messages = 0
+    encode_seconds = 0.0
+    for now, chunk in stream:
+        frames = [coalescer.flush(now)] if chunk is None else coalescer.add(chunk, now)
+        for frame in frames:
+            if not frame:
+                continue
+            start = time.perf_counter()
+            json.dumps({
+                "mime_type": "audio/pcm",
+                "data": base64.b64encode(frame).decode("ascii"),
+            })
+            encode_seconds += time.perf_counter() - start
+            messages += 1
+    return coalescer, messages, encode_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Outbound audio messages with and without coalescing")
+    parser.add_argument("--minutes", type=float, default=5,
+                        help="Minutes of agent audio to simulate")
+    args = parser.parse_args()
+
+    stream = list(model_audio_stream(args.minutes))
+    chunks = sum(1 for _, chunk in stream if chunk is not None)
+    print(f"{args.minutes:g} minutes of agent audio in {chunks} model chunks")
+    print(f"{'frame':>6} {'msgs/min':>9} {'vs raw':>7} {'encode ms':>10} "
+          f"{'size p50/p95 ms':>16} {'added p50/p95/p99 ms':>22}")
+    baseline = None
+    for frame_ms in FRAME_DURATIONS_MS:
+        coalescer, messages, encode_seconds = run(frame_ms, stream)
+        baseline = baseline or messages
+        stats = coalescer.stats()
+        sizes = stats["frame_size_ms"]
+        latency = stats["added_latency_ms"]
+        label = f"{frame_ms}ms" if frame_ms else "raw"
+        print(f"{label:>6} {messages / args.minutes:>9.0f} "
+              f"{messages / baseline:>7.1%} {encode_seconds * 1000:>10.1f} "
+              f"{sizes['p50']:>7.1f}/{sizes['p95']:<8.1f} "
+              f"{latency['p50']:>7.1f}/{latency['p95']:.1f}/{latency['p99']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Encoding and decoding cost per SSE message type, for:
+#
+#   baseline  json.dumps into an f-string, encoded to bytes by the response,
+#             and json.loads of request bodies, as before message_codec.py
+#   json      MessageEncoder with the standard library codec
+#   orjson    MessageEncoder with orjson, when it is installed
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_message_codec
+
+import argparse
+import base64
+import json
+import timeit
+
+from message_codec import CODEC_JSON, CODEC_ORJSON, MessageEncoder, get_codec, orjson
+
+# A 40 ms agent audio frame at 24 kHz and a 20 ms microphone chunk at 16 kHz
+AGENT_AUDIO_FRAME = bytes(range(256)) * 7 + bytes(128)
+CLIENT_AUDIO_CHUNK = bytes(640)
+PARTIAL_TEXT = "The weather in Tokyo is sunny, 24 degrees. "
+
+
+def baseline_cases():
+    def control():
+        message = {"turn_complete": True, "interrupted": None}
+        return f"data: {json.dumps(message)}\n\n".encode()
+
+    def text():
+        message = {"mime_type": "text/plain", "data": PARTIAL_TEXT}
+        return f"data: {json.dumps(message)}\n\n".encode()
+
+    def audio():
+        message = {
+            "mime_type": "audio/pcm",
+            "data": base64.b64encode(AGENT_AUDIO_FRAME).decode("ascii")
+        }
+        return f"data: {json.dumps(message)}\n\n".encode()
+
+    return control, text, audio, json.loads
+
+
+def encoder_cases(codec):
+    encoder = MessageEncoder(codec, prefix=b"data: ", suffix=b"\n\n")
+
+    def control():
+        return encoder.control(True, None)
+
+    def text():
+        return encoder.message({"mime_type": "text/plain", "data": PARTIAL_TEXT})
+
+    def audio():
+        return encoder.audio(AGENT_AUDIO_FRAME)
+
+    return control, text, audio, codec.loads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message codec cost per message type")
+    parser.add_argument("--number", type=int, default=200000,
+                        help="Messages per measurement")
+    args = parser.parse_args()
+
+    text_body = json.dumps({"mime_type": "text/plain", "data": "What is the weather?"}).encode()
+    audio_body = json.dumps({
+        "mime_type": "audio/pcm",
+        "data": base64.b64encode(CLIENT_AUDIO_CHUNK).decode("ascii"),
+    }).encode()
+
+    variants = {"baseline": baseline_cases(), "json": encoder_cases(get_codec(CODEC_JSON))}
+    if orjson:
+        variants["orjson"] = encoder_cases(get_codec(CODEC_ORJSON))
+    else:
+        print("orjson is not installed, pip install orjson to compare it")
+
+    print(f"{'ns per message':>16}" + "".join(f"{name:>10}" for name in variants))
+    rows = {
+        "control": lambda cases: cases[0],
+        "partial text": lambda cases: cases[1],
+        "audio frame": lambda cases: cases[2],
+        "inbound text": lambda cases: lambda: cases[3](text_body),
+        "inbound audio": lambda cases: lambda: cases[3](audio_body),
+    }
+    for row, select in rows.items():
+        timings = []
+        for cases in variants.values():
+            seconds = min(timeit.repeat(select(cases), number=args.number, repeat=3))
+            timings.append(seconds * 1e9 / args.number)
+        print(f"{row:>16}" + "".join(f"{ns:10.0f}" for ns in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# What a rolling restart of serve.py (SIGHUP) costs clients in the middle of
+# a conversation, with the workers draining their sessions and without:
+#
+#   drain     DRAIN_TIMEOUT_SECONDS=8: the turns in flight complete, and the
+#             live sessions resume on the new workers
+#   no-drain  DRAIN_TIMEOUT_SECONDS=0: uvicorn cuts every SSE stream at once
+#
+# Every client talks in text turns of about two seconds on the fake model
+# and, like app.js, reconnects 0.5 s after a server_restart message and 5 s
+# after any other end of its stream. The fake model answers a resumed
+# session with "resumed" words.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_restart --clients 50
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import tempfile
+import time
+
+from benchmarks.common import format_latencies, start_fake_server, wait_for_port
+from benchmarks.http_client import HttpConnection
+
+HOST = "127.0.0.1"
+MODES = ("drain", "no-drain")
+
+
+class Totals:
+    def __init__(self):
+        self.turns = 0
+        self.cut = 0
+        self.unanswered = 0
+        self.closes = 0
+        self.failed_connects = 0
+        self.reconnects = 0
+        self.resumed = 0
+        self.reconnect_gaps = []
+
+
+async def read_messages(events, messages):
+    """Queues the SSE messages of a stream, then None at its end"""
+    buffer = b""
+    try:
+        while chunk := await events.read_chunk():
+            buffer += chunk
+            while b"\n\n" in buffer:
+                raw, buffer = buffer.split(b"\n\n", 1)
+                for line in raw.split(b"\n"):
+                    if line.startswith(b"data: "):
+                        messages.put_nowait(json.loads(line[6:]))
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        pass
+    messages.put_nowait(None)
+
+
+async def converse(args, user_id, deadline, totals):
+    body = json.dumps({"mime_type": "text/plain", "data": "hi"}).encode()
+    closed_at = None
+    while time.perf_counter() < deadline:
+        events = HttpConnection(HOST, args.port)
+        sender = HttpConnection(HOST, args.port)
+        reader = None
+        sent = replies = 0
+        delay = 5
+        try:
+            await events.connect()
+            await sender.connect()
+            status = await events.open_stream(f"/events/{user_id}?is_audio=false")
+            if status != 200:
+                raise ConnectionError(f"SSE status {status}")
+            messages = asyncio.Queue()
+            reader = asyncio.create_task(read_messages(events, messages))
+            first_turn = True
+            while time.perf_counter() < deadline:
+                # Between turns only the end of the stream comes in, and
+                # like app.js the client doesn't send after it
+                if not messages.empty():
+                    if (messages.get_nowait() or {}).get("server_restart"):
+                        delay = 0.5
+                    break
+                replies = 0
+                await sender.request("POST", f"/send/{user_id}", body)
+                sent = 1
+                text = ""
+                while (message := await messages.get()) is not None:
+                    if message.get("turn_complete"):
+                        break
+                    if message.get("server_restart"):
+                        delay = 0.5
+                        continue
+                    replies += 1
+                    text += message.get("data", "")
+                else:
+                    break
+                sent = replies = 0
+                totals.turns += 1
+                if first_turn and closed_at is not None:
+                    # Lost connection to completed turn on the new one
+                    totals.reconnects += 1
+                    totals.reconnect_gaps.append(time.perf_counter() - closed_at)
+                    totals.resumed += text.startswith("resumed")
+                first_turn = False
+                closed_at = None
+                await asyncio.sleep(args.think)
+            else:
+                continue
+            totals.closes += 1
+            # A turn is cut if the answer had started, a message is
+            # unanswered if the stream ended before the answer
+            if replies:
+                totals.cut += 1
+            elif sent:
+                totals.unanswered += 1
+        except (OSError, asyncio.IncompleteReadError):
+            totals.failed_connects += 1
+            delay = 1
+        finally:
+            if reader:
+                reader.cancel()
+            events.close()
+            sender.close()
+        if closed_at is None:
+            closed_at = time.perf_counter()
+        await asyncio.sleep(delay)
+
+
+async def run_load(args, server):
+    totals = Totals()
+    deadline = time.perf_counter() + args.seconds
+    clients = asyncio.gather(*(
+        converse(args, user_id, deadline, totals) for user_id in range(args.clients)
+    ))
+    await asyncio.sleep(args.restart_after)
+    server.send_signal(signal.SIGHUP)
+    await clients
+    return totals
+
+
+def run_mode(args, mode):
+    handles_dir = tempfile.mkdtemp(prefix="bench-restart-")
+    server = start_fake_server(args.port, workers=args.workers, env={
+        "LOG_MODE": "metrics",
+        "DRAIN_TIMEOUT_SECONDS": "8" if mode == "drain" else "0",
+        "RESUMPTION_HANDLES_DIR": handles_dir,
+        "FAKE_TEXT_CHUNKS": "20",
+        "FAKE_TEXT_CHUNK_INTERVAL": "0.1",
+    })
+    try:
+        asyncio.run(wait_for_port(HOST, args.port, server))
+        totals = asyncio.run(run_load(args, server))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"{mode:>8}: {totals.turns} turns, {totals.cut} cut, {totals.unanswered} unanswered, "
+        f"{totals.closes} ended streams, {totals.failed_connects} failed connects, "
+        f"{totals.resumed}/{totals.reconnects} sessions resumed"
+    )
+    print(f"{'':>10}lost connection to next complete turn: "
+          f"{format_latencies(totals.reconnect_gaps, 's', 1)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client disruption of a rolling restart")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=60,
+                        help="Duration per mode; the restart has to fit in it")
+    parser.add_argument("--restart-after", type=float, default=5,
+                        help="Seconds of conversation before SIGHUP")
+    parser.add_argument("--think", type=float, default=0.5, help="Pause between turns")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8840)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.workers} workers, {os.cpu_count()} CPUs")
+    for mode in args.modes:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
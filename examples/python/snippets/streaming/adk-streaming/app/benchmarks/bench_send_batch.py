@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Load test of the client to agent path: many concurrent talkers stream
+# microphone audio to the server, either one POST /send per chunk or one
+# POST /send_batch per few chunks. The server runs in its own process on the
+# fake live model, and the test reports the request rate, the audio delivered
+# against real time, the server CPU and the request latency.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_send_batch --talkers 500
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+from benchmarks.common import (
+    format_latencies,
+    process_cpu_seconds,
+    start_fake_server,
+    wait_for_port,
+)
+from benchmarks.http_client import HttpConnection
+from pcm_batch import PCM_BATCH_MIME_TYPE, encode_pcm_batch
+
+MODES = ("single", "batch")
+
+# 16 kHz 16-bit mono, like the browser recorder
+INPUT_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class Totals:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.chunks = 0
+        self.latencies = []
+
+
+async def follow_events(host, port, user_id, connected):
+    """Keeps an SSE connection open and discards the events"""
+    connection = HttpConnection(host, port)
+    await connection.connect()
+    try:
+        await connection.open_stream(f"/events/{user_id}")
+        connected.set()
+        while await connection.read():
+            pass
+    finally:
+        connection.close()
+
+
+async def talk(host, port, user_id, mode, chunk, chunks_per_request,
+               interval, deadline, totals):
+    """Streams audio chunks on a real-time schedule until the deadline"""
+    if mode == "single":
+        path = f"/send/{user_id}"
+        body = json.dumps({
+            "mime_type": "audio/pcm",
+            "data": base64.b64encode(chunk).decode("ascii"),
+        }).encode("ascii")
+        content_type = "application/json"
+    else:
+        path = f"/send_batch/{user_id}"
+        body = encode_pcm_batch([chunk] * chunks_per_request)
+        content_type = PCM_BATCH_MIME_TYPE
+
+    connection = HttpConnection(host, port)
+    await connection.connect()
+    next_send = time.perf_counter()
+    try:
+        while next_send < deadline and time.perf_counter() < deadline:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = time.perf_counter()
+            status, response = await connection.request("POST", path, body, content_type)
+            totals.latencies.append(time.perf_counter() - start)
+            totals.requests += 1
+            if status == 200 and b'"error"' not in response:
+                totals.chunks += chunks_per_request
+            else:
+                totals.errors += 1
+            # A talker that falls behind sends again at once, like a browser
+            # whose fetches queue up, and what is left at the deadline is lost
+            next_send += interval
+    finally:
+        connection.close()
+
+
+async def run_load(host, port, mode, talkers, seconds, chunk_ms, batch_ms, server_pid):
+    chunk = bytes(INPUT_SAMPLE_RATE * SAMPLE_WIDTH * chunk_ms // 1000)
+    chunks_per_request = 1 if mode == "single" else max(1, batch_ms // chunk_ms)
+    interval = chunk_ms * chunks_per_request / 1000
+
+    # Open one live session per talker
+    connected = [asyncio.Event() for _ in range(talkers)]
+    followers = [
+        asyncio.create_task(follow_events(host, port, user_id, connected[user_id]))
+        for user_id in range(talkers)
+    ]
+    await asyncio.gather(*(event.wait() for event in connected))
+
+    totals = Totals()
+    cpu_start = process_cpu_seconds(server_pid)
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(
+        talk(host, port, user_id, mode, chunk, chunks_per_request,
+             interval, deadline, totals)
+        for user_id in range(talkers)
+    ))
+    elapsed = time.perf_counter() - start
+    cpu_end = process_cpu_seconds(server_pid)
+
+    for follower in followers:
+        follower.cancel()
+    await asyncio.gather(*followers, return_exceptions=True)
+
+    audio_seconds = totals.chunks * chunk_ms / 1000
+    offered_seconds = talkers * seconds
+    print(
+        f"{mode:>6}: {totals.requests / elapsed:8.0f} req/s, "
+        f"{audio_seconds / elapsed:6.1f} audio s/s "
+        f"({audio_seconds / offered_seconds:.0%} of real time), "
+        f"{totals.errors} errors"
+    )
+    if cpu_start is not None:
+        cpu = cpu_end - cpu_start
+        print(
+            f"        server CPU {cpu / elapsed:.0%} of a core, "
+            f"{cpu * 1000 / max(audio_seconds, 1e-9):.2f} ms per audio second"
+        )
+    print(f"        request latency {format_latencies(totals.latencies)}")
+
+
+def run_mode(args, mode):
+    host = "127.0.0.1"
+    server = start_fake_server(args.port, env={
+        # Keep the fake model listening, so only the inbound path is measured
+        "FAKE_AUDIO_BYTES_PER_TURN": str(2**62),
+        "MAX_SESSIONS": str(args.talkers),
+    })
+    try:
+        asyncio.run(wait_for_port(host, args.port, server))
+        asyncio.run(run_load(host, args.port, mode, args.talkers, args.seconds,
+                             args.chunk_ms, args.batch_ms, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Client to agent request rate with and without batching")
+    parser.add_argument("--talkers", type=int, default=500,
+                        help="Concurrent clients streaming audio")
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="Duration of the load")
+    parser.add_argument("--chunk-ms", type=int, default=20,
+                        help="Duration of each microphone chunk")
+    parser.add_argument("--batch-ms", type=int, default=200,
+                        help="Audio per /send_batch request")
+    parser.add_argument("--mode", choices=MODES, help="Run a single mode")
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    print(f"{args.talkers} talkers, {args.chunk_ms} ms chunks, "
+          f"{args.batch_ms} ms batches, {args.seconds:.0f} s")
+    for mode in [args.mode] if args.mode else MODES:
+        run_mode(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Cost of persisting live session events, with the events a live turn
+# appends (the user's text, the model's audio chunks, its text and
+# turn_complete) for many sessions at once:
+#
+#   adk_database  ADK's DatabaseSessionService on SQLite, which commits every
+#                 event on the event loop
+#   per_event     SqliteSessionService with a transaction per event
+#   turn          SqliteSessionService with a transaction per turn; the turns
+#                 that complete while a write is in flight share the next
+#
+# "payload" is the JSON of the events a mode writes, "written" the bytes the
+# process passed to write() (from /proc/self/io, so Linux only), their ratio
+# the write amplification. "append" is how long the runner would wait on
+# append_event, and "loop lag" the longest the event loop was held up.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_session_writes --sessions 50 --turns 10
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+
+from google.adk.events import Event
+from google.genai import types
+
+from benchmarks.common import format_latencies
+from sqlite_session_service import SqliteSessionService, is_audio_only
+
+APP_NAME = "bench"
+MODES = ("adk_database", "per_event", "turn")
+
+
+def written_bytes():
+    """Bytes the process passed to write() so far, or None"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def turn_events(args, audio_chunk):
+    """The events a live turn appends, in order"""
+    yield Event(invocation_id="bench", author="user", content=types.Content(
+        role="user", parts=[types.Part(text="What is the weather like today?")],
+    ))
+    for _ in range(args.audio_chunks):
+        yield Event(invocation_id="bench", author="agent", content=types.Content(
+            role="model", parts=[types.Part(inline_data=types.Blob(
+                mime_type="audio/pcm;rate=24000", data=audio_chunk,
+            ))],
+        ))
+    yield Event(invocation_id="bench", author="agent", content=types.Content(
+        role="model", parts=[types.Part(text="It is sunny and warm, with a light breeze. " * 4)],
+    ))
+    yield Event(invocation_id="bench", author="agent", turn_complete=True)
+
+
+class PerEventSessionService(SqliteSessionService):
+    """Writes every event in a transaction of its own"""
+
+    async def append_event(self, session, event):
+        event = await super().append_event(session, event)
+        self._flush(force=True)
+        return event
+
+
+class Totals:
+    def __init__(self):
+        self.turns = 0
+        self.payload_bytes = 0
+        self.append_latencies = []
+
+
+async def run_session(service, args, user_id, audio_chunk, totals):
+    session = await service.create_session(app_name=APP_NAME, user_id=str(user_id))
+    writes_audio = getattr(service, "keep_audio", True)
+    for _ in range(args.turns):
+        for event in turn_events(args, audio_chunk):
+            if writes_audio or not is_audio_only(event):
+                totals.payload_bytes += len(event.model_dump_json(exclude_none=True))
+            start = time.perf_counter()
+            await service.append_event(session, event)
+            totals.append_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(args.chunk_interval)
+        totals.turns += 1
+
+
+async def watch_loop(lags, interval=0.001):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def create_service(mode, path, args):
+    if mode == "adk_database":
+        from google.adk.sessions import DatabaseSessionService
+        from sqlalchemy import event as sqlalchemy_event
+
+        service = DatabaseSessionService(f"sqlite:///{path}")
+        service.transactions = 0
+
+        def count_commit(connection):
+            service.transactions += 1
+
+        sqlalchemy_event.listen(service.db_engine, "commit", count_commit)
+        return service
+    if mode == "per_event":
+        return PerEventSessionService(path, keep_audio=args.keep_audio)
+    return SqliteSessionService(path, keep_audio=args.keep_audio)
+
+
+async def run_mode(args, mode, directory):
+    path = os.path.join(directory, f"{mode}.db")
+    service = create_service(mode, path, args)
+    audio_chunk = bytes(args.audio_chunk_bytes)
+    totals = Totals()
+    lags = []
+    watcher = asyncio.create_task(watch_loop(lags))
+
+    written = written_bytes()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(service, args, user_id, audio_chunk, totals)
+        for user_id in range(args.sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    # Everything is on disk once the queued writes are
+    if isinstance(service, SqliteSessionService):
+        close_start = time.perf_counter()
+        await service.close()
+        close_seconds = time.perf_counter() - close_start
+    else:
+        close_seconds = 0.0
+    watcher.cancel()
+    if written is not None:
+        written = written_bytes() - written
+    file_bytes = sum(
+        os.path.getsize(path + suffix)
+        for suffix in ("", "-wal") if os.path.exists(path + suffix)
+    )
+
+    turns = totals.turns
+    print(f"{mode:>13}: {turns} turns in {elapsed:.1f}s, "
+          f"{service.transactions / turns:.1f} transactions per turn, "
+          f"last write {close_seconds * 1000:.0f}ms after the last event")
+    line = f"{'':>15}payload {totals.payload_bytes / turns / 1024:.1f} KB/turn"
+    if written is not None:
+        line += (f", written {written / turns / 1024:.1f} KB/turn "
+                 f"({written / max(totals.payload_bytes, 1):.1f}x)")
+    print(line + f", file {file_bytes / 1024:.0f} KB")
+    print(f"{'':>15}append: {format_latencies(totals.append_latencies)}")
+    print(f"{'':>15}loop lag: {format_latencies(lags)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session event writes per turn")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session")
+    parser.add_argument("--audio-chunks", type=int, default=25, help="Audio events per turn")
+    parser.add_argument("--audio-chunk-bytes", type=int, default=4800,
+                        help="PCM bytes per audio event (4800 is 100 ms at 24 kHz)")
+    parser.add_argument("--chunk-interval", type=float, default=0.002,
+                        help="Pause between the events of a session")
+    parser.add_argument("--keep-audio", action="store_true",
+                        help="Also write the audio events with SqliteSessionService")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.turns} turns, "
+          f"{args.audio_chunks + 3} events per turn, audio "
+          f"{'written' if args.keep_audio else 'not written'} (except adk_database)")
+    # Keeps the collector off the objects of the ADK import, whose full
+    # collections would show up as loop lag
+    gc.collect()
+    gc.freeze()
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes:
+            asyncio.run(run_mode(args, mode, directory))
+
+
+if __name__ == "__main__":
+    main()
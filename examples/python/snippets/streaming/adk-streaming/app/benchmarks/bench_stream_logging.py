@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Drives many concurrent agent_to_client_sse loops with live events (partial
+# text, audio chunks, turn ends) and compares the event throughput of:
+#
+#   sync           a synchronous log line per event, audio included, like
+#                  the print() per event it replaced
+#   async_sampled  the default: queued log lines, 1 in 10 partial texts
+#   metrics        LOG_MODE=metrics: counters only
+#
+# Log lines are written to a file, like a container log.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_stream_logging --streams 200
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from google.adk.events import Event
+from google.genai.types import Blob, Content, Part
+
+import main as app
+from audio_coalescer import AudioCoalescer
+from stream_logging import StreamLog, StructuredFormatter, setup_async_logging
+
+MODES = ("sync", "async_sampled", "metrics")
+
+
+def make_turn(text_chunks, audio_chunks):
+    """Returns the live events of one agent turn"""
+    events = [
+        Event(author="agent", partial=True,
+              content=Content(role="model", parts=[Part(text=f"chunk{i} ")]))
+        for i in range(text_chunks)
+    ]
+    events += [
+        Event(author="agent", partial=True,
+              content=Content(role="model", parts=[
+                  Part(inline_data=Blob(data=bytes(960), mime_type="audio/pcm;rate=24000"))
+              ]))
+        for _ in range(audio_chunks)
+    ]
+    events.append(Event(author="agent", turn_complete=True))
+    return events
+
+
+async def live_events(turn, turns):
+    for _ in range(turns):
+        for event in turn:
+            yield event
+        # Let the other streams run, like a network read would
+        await asyncio.sleep(0)
+
+
+async def consume(turn, turns):
+    coalescer = AudioCoalescer(app.AUDIO_FRAME_MS, app.AGENT_AUDIO_SAMPLE_RATE)
+    async for _ in app.agent_to_client_sse(live_events(turn, turns), coalescer):
+        pass
+
+
+class LogEveryEvent(StreamLog):
+    """Logs audio chunks too, like the print() per event it replaced"""
+
+    def count(self, category, size=0):
+        super().count(category, size)
+        self.logger.info("[AGENT TO CLIENT]: audio/pcm: %s bytes.", size)
+
+
+def make_stream_log(mode, log_path):
+    if mode == "sync":
+        logger = logging.getLogger("bench_sync")
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(StructuredFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        return LogEveryEvent(logger)
+    logger = setup_async_logging(f"bench_{mode}", stream=open(log_path, "a"))
+    return StreamLog(
+        logger,
+        sample_rates=app.LOG_SAMPLE_RATES,
+        metrics_only=mode == "metrics",
+    )
+
+
+async def run(mode, args, log_dir):
+    log_path = os.path.join(log_dir, f"{mode}.log")
+    app.stream_log = make_stream_log(mode, log_path)
+    turn = make_turn(args.text_chunks, args.audio_chunks)
+    events = args.streams * args.turns * len(turn)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.gather(*(consume(turn, args.turns) for _ in range(args.streams)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # Give the background thread time to write what is queued
+    await asyncio.sleep(0.5)
+    stats = app.stream_log.stats()
+    print(
+        f"{mode:>14}: {events / wall:9.0f} events/s, "
+        f"{cpu * 1e6 / events:6.2f} us CPU per event, "
+        f"{os.path.getsize(log_path) / 1e6:6.2f} MB logged, "
+        f"{stats['dropped_log_records']} records dropped"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Streaming loop throughput with logging on and off")
+    parser.add_argument("--streams", type=int, default=200,
+                        help="Concurrent streams")
+    parser.add_argument("--turns", type=int, default=20,
+                        help="Agent turns per stream")
+    parser.add_argument("--text-chunks", type=int, default=20,
+                        help="Partial texts per turn")
+    parser.add_argument("--audio-chunks", type=int, default=50,
+                        help="Audio chunks per turn")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        for mode in MODES:
+            asyncio.run(run(mode, args, log_dir))
+
+
+if __name__ == "__main__":
+    main()
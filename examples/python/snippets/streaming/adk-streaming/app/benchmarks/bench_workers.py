@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Starts serve.py with 1, 2, 4... workers on the fake live model and loads
+# each setup with more talkers than it can serve in real time. Every talker
+# streams audio in /send_batch requests and gets a fake model turn for every
+# second of audio, so the audio seconds delivered per second is the number of
+# real-time voice sessions the box sustains.
+#
+# Run from the app folder:
+#   python -m benchmarks.bench_workers --workers 1 2 4 --talkers 1000
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_send_batch import INPUT_SAMPLE_RATE, SAMPLE_WIDTH, Totals, follow_events, talk
+from benchmarks.common import (
+    child_pids,
+    format_latencies,
+    process_cpu_seconds,
+    start_fake_server,
+    wait_for_port,
+)
+
+HOST = "127.0.0.1"
+
+
+def total_cpu_seconds(pids):
+    return sum(process_cpu_seconds(pid) or 0.0 for pid in pids)
+
+
+async def run_load(args, pids):
+    chunks_per_request = max(1, args.batch_ms // args.chunk_ms)
+    chunk = bytes(INPUT_SAMPLE_RATE * SAMPLE_WIDTH * args.chunk_ms // 1000)
+    interval = args.chunk_ms * chunks_per_request / 1000
+
+    connected = [asyncio.Event() for _ in range(args.talkers)]
+    followers = [
+        asyncio.create_task(follow_events(HOST, args.port, user_id, connected[user_id]))
+        for user_id in range(args.talkers)
+    ]
+    await asyncio.gather(*(event.wait() for event in connected))
+
+    totals = Totals()
+    cpu_start = total_cpu_seconds(pids)
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(
+        talk(HOST, args.port, user_id, "batch", chunk, chunks_per_request,
+             interval, deadline, totals)
+        for user_id in range(args.talkers)
+    ))
+    elapsed = time.perf_counter() - start
+    cpu = total_cpu_seconds(pids) - cpu_start
+
+    for follower in followers:
+        follower.cancel()
+    await asyncio.gather(*followers, return_exceptions=True)
+    return totals, elapsed, cpu
+
+
+def run_workers(args, workers):
+    server = start_fake_server(args.port, workers, {"MAX_SESSIONS": str(args.talkers)})
+    try:
+        # serve.py only listens once every worker is up
+        asyncio.run(wait_for_port(HOST, args.port, server))
+        pids = [server.pid] + child_pids(server.pid)
+        totals, elapsed, cpu = asyncio.run(run_load(args, pids))
+    finally:
+        server.terminate()
+        server.wait()
+
+    sessions = totals.chunks * args.chunk_ms / 1000 / elapsed
+    print(
+        f"{workers:>2} workers: {sessions:7.1f} real-time sessions, "
+        f"{totals.requests / elapsed:6.0f} req/s, "
+        f"CPU {cpu / elapsed:.0%} of a core, {totals.errors} errors"
+    )
+    print(f"            request latency {format_latencies(totals.latencies)}")
+    return sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sessions per box with 1..N workers behind the dispatcher")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="Worker counts to measure")
+    parser.add_argument("--talkers", type=int, default=1000,
+                        help="Concurrent talkers, more than the box can serve")
+    parser.add_argument("--seconds", type=float, default=20,
+                        help="Duration of the load")
+    parser.add_argument("--chunk-ms", type=int, default=20,
+                        help="Duration of each microphone chunk")
+    parser.add_argument("--batch-ms", type=int, default=200,
+                        help="Audio per /send_batch request")
+    parser.add_argument("--port", type=int, default=8800)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.talkers} talkers, {args.seconds:.0f} s; "
+          f"the load generator runs on the same box")
+    baseline = None
+    for workers in args.workers:
+        sessions = run_workers(args, workers)
+        baseline = baseline or sessions
+        print(f"            scaling {sessions / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# The streaming app with its agent on the fake live model, for load tests
+# that run the real server without calling Gemini.
+#
+# Run from the app folder:
+#   uvicorn benchmarks.fake_app:app
+
+import os
+
+import main
+from fake_live_model import create_fake_agent
+
+# Environment variables that configure the fake live model
+FAKE_MODEL_ENV = {
+    "FAKE_FIRST_RESPONSE_DELAY": ("first_response_delay", float),
+    "FAKE_TEXT_CHUNKS": ("text_chunks", int),
+    "FAKE_TEXT_CHUNK_INTERVAL": ("text_chunk_interval", float),
+    "FAKE_AUDIO_CHUNKS": ("audio_chunks", int),
+    "FAKE_AUDIO_CHUNK_BYTES": ("audio_chunk_bytes", int),
+    "FAKE_AUDIO_CHUNK_INTERVAL": ("audio_chunk_interval", float),
+    "FAKE_AUDIO_TONE_HZ": ("audio_tone_hz", float),
+    # Audio the fake model waits for before answering
+    "FAKE_AUDIO_BYTES_PER_TURN": ("audio_bytes_per_turn", int),
+    "FAKE_STAMP_TEXT": ("stamp_text", lambda value: value == "true"),
+    "FAKE_BARGE_IN": ("barge_in", lambda value: value == "true"),
+    "FAKE_HISTORY_DELAY": ("history_delay", float),
+    "FAKE_REALTIME_BYTES_PER_SECOND": ("realtime_bytes_per_second", float),
+}
+
+main.root_agent = create_fake_agent(**{
+    field: parse(os.environ[name])
+    for name, (field, parse) in FAKE_MODEL_ENV.items()
+    if name in os.environ
+})
+
+app = main.app
@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A minimal HTTP/1.1 client over asyncio streams for the load tests. A full
+# client spends more CPU per request than the server under test, so with
+# hundreds of simulated clients on one box it would measure itself.
+
+import asyncio
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=b"", content_type="application/json"):
+        """Sends a request and returns the status code and the response body"""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        self._writer.write(head.encode("ascii") + body)
+        status, headers = await self._read_head()
+        if headers.get("transfer-encoding") == "chunked":
+            raise ValueError("Chunked responses are not supported")
+        length = int(headers.get("content-length", "0"))
+        return status, await self._reader.readexactly(length)
+
+    async def open_stream(self, path):
+        """Sends a GET request for a streamed response and returns its status;
+        the body is then read with `read()`"""
+        head = f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n"
+        self._writer.write(head.encode("ascii"))
+        status, _ = await self._read_head()
+        return status
+
+    async def read(self, size=65536):
+        """Reads raw bytes of a streamed response; returns b"" at the end"""
+        return await self._reader.read(size)
+
+    async def read_chunk(self):
+        """Reads the next chunk of a chunked streamed response; returns b""
+        at the end"""
+        size = int((await self._reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+        data = await self._reader.readexactly(size + 2)
+        return data[:-2]
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+
+    async def _read_head(self):
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return status, headers
@@ -0,0 +1,266 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+import os
+import re
+import signal
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from stream_logging import StreamLog
+
+#
+# Graceful drain
+#
+# On SIGTERM uvicorn closes every WebSocket right away and cancels streaming
+# responses, so a restart cuts the turns in flight and the users start over
+# with a new live session. The Drainer takes over SIGTERM first: it refuses
+# new sessions, lets each live session finish its turn, saves the session's
+# resumption handle and ends the connection. Then it hands SIGTERM back to
+# uvicorn. The worker that picks a user up next starts the live session from
+# the saved handle, so the model resumes the conversation.
+#
+# The same store keeps the handles of sessions whose client just went away,
+# so a reconnect after a network blip resumes the live session too.
+#
+
+
+class TurnTracker:
+    """Tracks whether a live session is in the middle of a turn"""
+
+    def __init__(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def active(self):
+        return not self._idle.is_set()
+
+    def start(self):
+        """The user sent a message or the agent started answering"""
+        self._idle.clear()
+
+    def end(self):
+        """The turn completed or was interrupted"""
+        self._idle.set()
+
+    async def wait_idle(self):
+        await self._idle.wait()
+
+
+class Resumption(NamedTuple):
+    """A live session to resume: the model's handle and the ADK session"""
+
+    handle: str
+    session_id: Optional[str] = None
+
+
+class ResumptionStore:
+    """Keeps the resumption handles of live sessions per user.
+
+    Handles of sessions that merely disconnected stay in memory, so a client
+    that reconnects after a network blip resumes its live session instead of
+    starting a new one. Up to `max_entries` handles are kept, for up to `ttl`
+    seconds. The handles of drained sessions are also written to
+    `directory`, one file per user, for the worker that takes over. Point it
+    at storage that the replacement worker can read, e.g. a volume shared by
+    the workers of a box.
+    """
+
+    def __init__(self, directory, ttl=600.0, max_entries=10000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # user_id -> (Resumption, saved_at), oldest first
+        self._entries = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def remember(self, user_id, handle, session_id=None):
+        """Keeps the user's handle in memory"""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        now = time.monotonic()
+        self._entries[user_id] = (Resumption(handle, session_id), now)
+        self._entries.move_to_end(user_id)
+        # Entries are in the order they were saved, so the expired and the
+        # least recently saved ones are at the front
+        while self._entries:
+            _, saved_at = next(iter(self._entries.values()))
+            if now - saved_at > self.ttl:
+                self.expired += 1
+            elif len(self._entries) > self.max_entries:
+                self.evicted += 1
+            else:
+                break
+            self._entries.popitem(last=False)
+
+    def save(self, user_id, handle, session_id=None):
+        """Saves the user's handle for any worker; the file is replaced
+        atomically"""
+        self.remember(user_id, handle, session_id)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(user_id)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"handle": handle, "session_id": session_id, "saved_at": time.time()}, f)
+        os.replace(path + ".tmp", path)
+
+    def pop(self, user_id):
+        """Returns and forgets the user's Resumption, or None"""
+        resumption = self._pop_memory(user_id)
+        file_resumption = self._pop_file(user_id)
+        resumption = resumption or file_resumption
+        if resumption is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return resumption
+
+    def stats(self):
+        return {
+            "handles": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def _pop_memory(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return None
+        resumption, saved_at = entry
+        if time.monotonic() - saved_at > self.ttl:
+            self.expired += 1
+            return None
+        return resumption
+
+    def _pop_file(self, user_id):
+        path = self._path(user_id)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            os.remove(path)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not data.get("handle"):
+            return None
+        if time.time() - data.get("saved_at", 0) > self.ttl:
+            self.expired += 1
+            return None
+        return Resumption(data["handle"], data.get("session_id"))
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, re.sub(r"[^\w-]", "_", str(user_id)) + ".json")
+
+
+class Drainer:
+    """Drains the live sessions of the process on SIGTERM.
+
+    Every live session registers its TurnTracker and a `finish` coroutine
+    function that saves its resumption handle and ends its connection. On
+    SIGTERM, `draining` is set, each session gets until `timeout` seconds to
+    finish its turn, and then `finish` runs. A second SIGTERM shuts down
+    right away. A timeout of 0 leaves SIGTERM to the server.
+    """
+
+    def __init__(self, timeout, log=None):
+        self.timeout = timeout
+        self.log = log or StreamLog(logging.getLogger(__name__))
+        self.draining = False
+        self._sessions = {}
+        self._loop = None
+        self._previous_handler = None
+
+        # Counters
+        self.drained = 0
+        self.cut = 0
+
+    def install(self):
+        """Takes over SIGTERM; call it from the app's startup, after the
+        server installed its own handler"""
+        # Like uvicorn, only the main thread can handle signals
+        if self.timeout <= 0 or threading.current_thread() is not threading.main_thread():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._previous_handler = signal.signal(signal.SIGTERM, self._on_sigterm)
+
+    def register(self, key, turns, finish):
+        self._sessions[key] = (turns, finish)
+
+    def unregister(self, key, turns):
+        if key in self._sessions and self._sessions[key][0] is turns:
+            del self._sessions[key]
+
+    async def drain(self):
+        """Finishes every live session, waiting for turns in flight"""
+        self.draining = True
+        deadline = self._loop.time() + self.timeout if self._loop else 0
+        sessions = list(self._sessions.values())
+        await asyncio.gather(*(
+            self._drain_session(turns, finish, deadline) for turns, finish in sessions
+        ))
+
+    def stats(self):
+        return {
+            "draining": self.draining,
+            "sessions": len(self._sessions),
+            "drained": self.drained,
+            "cut": self.cut,
+        }
+
+    async def _drain_session(self, turns, finish, deadline):
+        if turns.active:
+            try:
+                await asyncio.wait_for(
+                    turns.wait_idle(), max(0.0, deadline - self._loop.time())
+                )
+            except asyncio.TimeoutError:
+                self.cut += 1
+        if not turns.active:
+            self.drained += 1
+        try:
+            await finish()
+        except Exception as e:
+            self.log.error("Error while draining a session: %s", e)
+
+    def _on_sigterm(self, signum, frame):
+        if self.draining:
+            self._shutdown(signum, frame)
+            return
+        self.draining = True
+        self.log.info("Draining %s live sessions", len(self._sessions))
+        self._loop.call_soon_threadsafe(self._start_drain, signum)
+
+    def _start_drain(self, signum):
+        task = self._loop.create_task(self.drain())
+        task.add_done_callback(lambda _: self._shutdown(signum, None))
+
+    def _shutdown(self, signum, frame):
+        # Hand the signal to the server, which shuts down gracefully
+        previous = self._previous_handler
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signal.SIGTERM, previous or signal.SIG_DFL)
+            signal.raise_signal(signum)
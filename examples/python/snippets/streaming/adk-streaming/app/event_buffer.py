@@ -0,0 +1,100 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import secrets
+from collections import deque
+
+
+class EventRingBuffer:
+    """Keeps the most recent SSE events of a session with increasing IDs.
+
+    Event numbers start at 1 and increase by one per event, so a client that
+    reconnects with the ID of event `n` is replayed every buffered event after
+    `n`. Followers wait for new events after the replay. The SSE ID of an
+    event is its number behind the buffer's random epoch, `<epoch>-<n>`, so
+    the ID of another session's event doesn't resume this one.
+    """
+
+    def __init__(self, capacity=512):
+        self._events = deque(maxlen=capacity)
+        self._appended = asyncio.Event()
+        self.epoch = secrets.token_hex(4)
+        self.last_id = 0
+        self.closed = False
+
+    def format_id(self, event_id):
+        """Returns the SSE ID of an event number"""
+        return f"{self.epoch}-{event_id}"
+
+    def parse_id(self, sse_id):
+        """Returns the event number of an SSE ID, or None if the ID isn't one
+        of this buffer's"""
+        epoch, _, event_id = (sse_id or "").partition("-")
+        if epoch != self.epoch or not event_id.isdigit():
+            return None
+        event_id = int(event_id)
+        return event_id if event_id <= self.last_id else None
+
+    def append(self, data):
+        """Adds an event and wakes up the followers; returns its ID"""
+        self.last_id += 1
+        self._events.append((self.last_id, data))
+        self._wake_followers()
+        return self.last_id
+
+    def close(self):
+        """Ends every follower once it has caught up"""
+        self.closed = True
+        self._wake_followers()
+
+    def can_replay(self, after_id):
+        """Returns True if every event after `after_id` is still buffered"""
+        if after_id > self.last_id:
+            return False
+        oldest_id = self._events[0][0] if self._events else self.last_id + 1
+        return after_id >= oldest_id - 1
+
+    def since(self, after_id):
+        """Returns the buffered (id, data) events after `after_id`"""
+        if not self._events or after_id >= self.last_id:
+            return []
+        # IDs are consecutive, so the position follows from the oldest ID
+        start = max(0, after_id - self._events[0][0] + 1)
+        return [self._events[i] for i in range(start, len(self._events))]
+
+    async def follow(self, after_id=0, gap=None):
+        """Yields the buffered events after `after_id`, then new events as
+        they are appended, until the buffer is closed.
+
+        When events after the last one yielded were dropped from the buffer,
+        because the follower lagged or reconnected late, (None, gap) comes
+        ahead of the events that are left.
+        """
+        while True:
+            appended = self._appended
+            if not self.can_replay(after_id):
+                yield None, gap
+                after_id = self._events[0][0] - 1
+            for event_id, data in self.since(after_id):
+                yield event_id, data
+                after_id = event_id
+            if self.closed:
+                return
+            if after_id >= self.last_id:
+                await appended.wait()
+
+    def _wake_followers(self):
+        appended, self._appended = self._appended, asyncio.Event()
+        appended.set()
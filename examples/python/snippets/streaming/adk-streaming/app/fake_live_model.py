@@ -0,0 +1,202 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+import asyncio
+import contextlib
+import math
+import time
+import uuid
+
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from websockets.exceptions import ConnectionClosedOK
+
+#
+# Fake live model
+#
+# A deterministic, local stand-in for a Gemini Live model. It plugs in behind
+# `runner.run_live` like any other `BaseLlm`, so the streaming apps can be
+# benchmarked without a live Gemini endpoint. Every user turn (a text message,
+# or enough realtime audio) is answered with partial text chunks, PCM audio
+# chunks and a final `turn_complete`, followed by a session resumption handle.
+# A connection resumed from a handle answers with "resumed" instead of "chunk"
+# words, so clients can tell a resumed session from a new one. A new
+# connection takes `history_delay` seconds per content of the conversation so
+# far, like a model reading in the history; a resumed one has it already.
+# With `realtime_bytes_per_second`, sending realtime audio takes as long as on
+# a link of that speed, so input can back up like on a slow connection. With
+# `barge_in`, a user turn that starts while the model is answering stops the
+# answer with `interrupted`, like a user talking over a Gemini Live model.
+#
+
+
+def tone(samples, frequency, sample_rate=24000):
+    """Returns 16-bit PCM of a sine tone"""
+    step = 2 * math.pi * frequency / sample_rate
+    return array.array("h", (int(8000 * math.sin(i * step)) for i in range(samples))).tobytes()
+
+
+class FakeLiveConnection(BaseLlmConnection):
+    """Live connection that answers each user turn with a scripted response"""
+
+    def __init__(self, model, resumed=False):
+        self._model = model
+        self._resumed = resumed
+        self._word = "resumed" if resumed else "chunk"
+        self._responses = asyncio.Queue()
+        self._turn_tasks = set()
+        self._audio_bytes = 0
+        self._closed = False
+
+    async def send_history(self, history):
+        if not self._resumed:
+            await asyncio.sleep(self._model.history_delay * len(history))
+
+    async def send_content(self, content):
+        # Function responses and other non-user content don't start a turn
+        if content.role == "user" and any(part.text for part in content.parts or []):
+            self._start_turn()
+
+    async def send_realtime(self, blob):
+        if self._model.realtime_bytes_per_second:
+            await asyncio.sleep(len(blob.data or b"") / self._model.realtime_bytes_per_second)
+        self._audio_bytes += len(blob.data or b"")
+        if self._audio_bytes >= self._model.audio_bytes_per_turn:
+            self._audio_bytes = 0
+            self._start_turn()
+
+    async def receive(self):
+        while True:
+            response = await self._responses.get()
+            if response is None:
+                # Like a Gemini Live connection, end with a normal close
+                raise ConnectionClosedOK(None, None)
+            yield response
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._turn_tasks:
+            task.cancel()
+        self._responses.put_nowait(None)
+
+    def _start_turn(self):
+        if self._closed:
+            return
+        if self._model.barge_in and self._turn_tasks:
+            for task in self._turn_tasks:
+                task.cancel()
+            self._emit(LlmResponse(interrupted=True))
+        task = asyncio.create_task(self._play_turn())
+        self._turn_tasks.add(task)
+        task.add_done_callback(self._turn_tasks.discard)
+
+    async def _play_turn(self):
+        model = self._model
+        await asyncio.sleep(model.first_response_delay)
+
+        # Partial text chunks, then the full text
+        words = []
+        for i in range(model.text_chunks):
+            # A stamped chunk carries its send time for latency measurements
+            word = f"{self._word}{i}"
+            word = f"{word}@{time.time():.6f} " if model.stamp_text else f"{word} "
+            words.append(word)
+            self._emit(LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=word)]),
+                partial=True,
+            ))
+            await asyncio.sleep(model.text_chunk_interval)
+        if words:
+            self._emit(LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text="".join(words))]),
+            ))
+
+        # PCM audio chunks: silence, or a tone that compresses like speech
+        if model.audio_tone_hz:
+            audio_chunk = tone(model.audio_chunk_bytes // 2, model.audio_tone_hz)
+        else:
+            audio_chunk = bytes(model.audio_chunk_bytes)
+        for _ in range(model.audio_chunks):
+            self._emit(LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(
+                    inline_data=types.Blob(
+                        mime_type="audio/pcm;rate=24000", data=audio_chunk
+                    )
+                )]),
+            ))
+            await asyncio.sleep(model.audio_chunk_interval)
+
+        self._emit(LlmResponse(turn_complete=True))
+        self._emit(LlmResponse(
+            live_session_resumption_update=types.LiveServerSessionResumptionUpdate(
+                new_handle=f"fake-{uuid.uuid4().hex}", resumable=True
+            ),
+        ))
+
+    def _emit(self, response):
+        if not self._closed:
+            self._responses.put_nowait(response)
+
+
+class FakeLiveLlm(BaseLlm):
+    """Deterministic live model with configurable response shape and rates"""
+
+    model: str = "fake-live"
+    first_response_delay: float = 0.05
+    text_chunks: int = 5
+    text_chunk_interval: float = 0.01
+    audio_chunks: int = 0
+    audio_chunk_bytes: int = 960  # 20ms of 24kHz 16-bit PCM
+    audio_chunk_interval: float = 0.02
+    audio_bytes_per_turn: int = 32000  # 1s of 16kHz 16-bit PCM
+    stamp_text: bool = False
+    audio_tone_hz: float = 0  # 0: silence
+    barge_in: bool = False
+    history_delay: float = 0.0  # seconds per content of history
+    realtime_bytes_per_second: float = 0  # 0: no limit
+
+    @classmethod
+    def supported_models(cls):
+        return [r"fake-live.*"]
+
+    async def generate_content_async(self, llm_request, stream=False):
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="ok")])
+        )
+
+    @contextlib.asynccontextmanager
+    async def connect(self, llm_request):
+        config = llm_request.live_connect_config
+        resumption = config.session_resumption if config else None
+        connection = FakeLiveConnection(self, resumed=bool(resumption and resumption.handle))
+        try:
+            yield connection
+        finally:
+            await connection.close()
+
+
+def create_fake_agent(**model_config):
+    """Creates an agent backed by the fake live model"""
+    return Agent(
+        name="fake_live_agent",
+        model=FakeLiveLlm(**model_config),
+        description="Agent backed by a local fake live model.",
+        instruction="Answer the question.",
+    )
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+
+from event_buffer import EventRingBuffer
+from stream_logging import StreamLog
+
+
+class LiveSession:
+    """A live agent session that outlives its SSE connections.
+
+    A background task pumps the SSE messages of the agent into a ring buffer.
+    SSE connections only follow the buffer, so a client that drops and
+    reconnects with `Last-Event-ID` is replayed what it missed and reattached
+    to the same `LiveRequestQueue`, instead of starting a new agent session.
+    """
+
+    def __init__(self, user_id, messages, live_request_queue, is_audio=False,
+                 buffer_size=512, on_close=None, turns=None, log=None):
+        self.user_id = user_id
+        self.live_request_queue = live_request_queue
+        self.is_audio = is_audio
+        self.turns = turns
+        self.buffer = EventRingBuffer(buffer_size)
+        self.subscribers = 0
+        self.closed = False
+        self._messages = messages
+        self._on_close = on_close
+        self._pump_task = None
+        self._close_timer = None
+        self.log = log or StreamLog(logging.getLogger(__name__))
+
+    def start(self):
+        """Starts pumping agent messages into the buffer"""
+        self._pump_task = asyncio.create_task(self._pump())
+
+    def attach(self):
+        """Registers an SSE connection following this session"""
+        self.subscribers += 1
+        if self._close_timer:
+            self._close_timer.cancel()
+            self._close_timer = None
+
+    def detach(self, grace_seconds):
+        """Unregisters an SSE connection; the session is closed if no client
+        reattaches within `grace_seconds`"""
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.closed:
+            self._close_timer = asyncio.get_running_loop().call_later(
+                grace_seconds, self.close
+            )
+
+    def close(self):
+        """Closes the LiveRequestQueue and ends the followers"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._close_timer:
+            self._close_timer.cancel()
+            self._close_timer = None
+        self.live_request_queue.close()
+        pump_task = self._pump_task
+        if pump_task and not pump_task.done() and pump_task is not asyncio.current_task():
+            pump_task.cancel()
+        self.buffer.close()
+        if self._on_close:
+            self._on_close(self)
+
+    async def _pump(self):
+        try:
+            async for data in self._messages:
+                self.buffer.append(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.log.error("Error in live session of client #%s: %s", self.user_id, e)
+        self.close()
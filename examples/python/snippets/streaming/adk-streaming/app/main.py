@@ -13,10 +13,12 @@
 # limitations under the License.
 
 import os
-import json
-import base64
+import asyncio
+import binascii
+import tempfile
 import warnings
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -26,17 +28,30 @@ from google.genai.types import (
     Blob,
 )
 
-from google.adk.runners import InMemoryRunner
 from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
 from google.genai import types
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from google_search_agent.agent import root_agent
+from runner_registry import RunnerRegistry
+from sqlite_session_service import SqliteSessionService
+from audio_coalescer import AudioCoalescer
+from live_session import LiveSession
+from drain import Drainer, ResumptionStore, TurnTracker
+from session_registry import SessionRegistry
+from pcm_batch import PCM_BATCH_MIME_TYPE, decode_pcm_batch
+from message_codec import MessageEncoder, get_codec
+from stream_logging import (
+    LOG_MODE_METRICS,
+    StreamLog,
+    parse_sample_rates,
+    setup_async_logging,
+)
 
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
@@ -49,28 +64,102 @@ load_dotenv()
 
 APP_NAME = "ADK Streaming example"
 
+# Duration of the audio frames sent to the client (0 disables coalescing)
+AUDIO_FRAME_MS = int(os.getenv("AUDIO_FRAME_MS", "40"))
+AGENT_AUDIO_SAMPLE_RATE = 24000
+
+# Recent SSE events kept per session for Last-Event-ID replay, and how long a
+# session waits for its client to reconnect
+SSE_REPLAY_BUFFER_SIZE = int(os.getenv("SSE_REPLAY_BUFFER_SIZE", "512"))
+SSE_RECONNECT_GRACE_SECONDS = float(os.getenv("SSE_RECONNECT_GRACE_SECONDS", "30"))
+
+# Bounds of the live session registry, see session_registry.py
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "300"))
+SESSION_REAP_INTERVAL_SECONDS = float(os.getenv("SESSION_REAP_INTERVAL_SECONDS", "10"))
+
+# Streaming logs, see stream_logging.py: LOG_MODE=metrics only counts hot
+# path events, and LOG_SAMPLE_RATES logs a fraction of a category's events
+LOG_MODE = os.getenv("LOG_MODE", "lines")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = parse_sample_rates(
+    os.getenv("LOG_SAMPLE_RATES", "agent_to_client.partial_text=0.1")
+)
+stream_log = StreamLog(
+    setup_async_logging("adk_streaming", LOG_QUEUE_SIZE, LOG_FORMAT),
+    sample_rates=LOG_SAMPLE_RATES,
+    metrics_only=LOG_MODE == LOG_MODE_METRICS,
+)
+
+# Sessions are kept in memory, or also written to the SQLite file at
+# SESSION_DB_PATH so they outlive the process, see sqlite_session_service.py.
+# The model's audio chunks are only written with SESSION_DB_KEEP_AUDIO=true.
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "")
+SESSION_DB_KEEP_AUDIO = os.getenv("SESSION_DB_KEEP_AUDIO", "false") == "true"
+session_service = (
+    SqliteSessionService(
+        SESSION_DB_PATH, keep_audio=SESSION_DB_KEEP_AUDIO, log=stream_log
+    )
+    if SESSION_DB_PATH else None
+)
+
+# One runner and session service shared by every connection; a session is
+# dropped when its live session closes, see runner_registry.py
+runner_registry = RunnerRegistry(session_service=session_service)
+
+# JSON codec of the transport messages, see message_codec.py: auto (orjson
+# if it is installed), orjson or json
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+codec = get_codec(JSON_CODEC)
+sse_encoder = MessageEncoder(codec, prefix=b"data: ", suffix=b"\n\n")
+REPLAY_GAP_MESSAGE = sse_encoder.message({"replay_gap": True})
+SENT_RESPONSE = codec.dumps({"status": "sent"})
+
+# Graceful drain, see drain.py: on SIGTERM the worker refuses new sessions,
+# lets the turns in flight complete for up to DRAIN_TIMEOUT_SECONDS (0 turns
+# draining off), and saves the resumption handles of its live sessions to
+# RESUMPTION_HANDLES_DIR for the worker that takes over
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "8"))
+RESUMPTION_HANDLES_DIR = os.getenv(
+    "RESUMPTION_HANDLES_DIR", os.path.join(tempfile.gettempdir(), "adk-streaming-sse-handles")
+)
+drainer = Drainer(DRAIN_TIMEOUT_SECONDS, log=stream_log)
+resumption_store = ResumptionStore(RESUMPTION_HANDLES_DIR)
+SERVER_RESTART_MESSAGE = sse_encoder.message({"server_restart": True})
+
 
+# --8<-- [start:start_agent_session]
 async def start_agent_session(user_id, is_audio=False):
     """Starts an agent session"""
 
-    # Create a Runner
-    runner = InMemoryRunner(
-        app_name=APP_NAME,
-        agent=root_agent,
-    )
+    # Get the shared Runner
+    runner = runner_registry.get_runner(APP_NAME, root_agent)
+
+    # The live session that a draining worker handed over, if any
+    resumption = resumption_store.pop(user_id)
 
-    # Create a Session
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,  # Replace with actual user ID
+    # Get the user's Session, or create one
+    session = await runner_registry.get_or_create_session(
+        APP_NAME,
+        user_id,  # Replace with actual user ID
+        session_id=resumption.session_id if resumption else None,
     )
 
-    # Set response modality
+    # Set response modality, and resume the live session. A worker that
+    # doesn't have the saved session, e.g. one that took over from a
+    # draining worker with in-memory sessions, resumes it in a new session:
+    # the model keeps the conversation, the old session's events stay behind
     modality = "AUDIO" if is_audio else "TEXT"
+    handle = resumption.handle if resumption else None
     run_config = RunConfig(
         response_modalities=[modality],
-        session_resumption=types.SessionResumptionConfig()
+        session_resumption=types.SessionResumptionConfig(handle=handle)
     )
+    if handle:
+        stream_log.info(
+            "Client #%s resumes its live session in session %s", user_id, session.id
+        )
 
     # Create a LiveRequestQueue for this session
     live_request_queue = LiveRequestQueue()
@@ -82,19 +171,40 @@ async def start_agent_session(user_id, is_audio=False):
         run_config=run_config,
     )
     return live_events, live_request_queue
+# --8<-- [end:start_agent_session]
 
 
-async def agent_to_client_sse(live_events):
+def save_resumption_handle(user_id, live_request_queue):
+    """Saves the resumption handle of a live session for the next worker"""
+    runner = runner_registry.get_runner(APP_NAME, root_agent)
+    handle = runner.resumption_handle(live_request_queue)
+    if handle:
+        resumption_store.save(user_id, handle, runner.live_session_id(live_request_queue))
+
+
+# --8<-- [start:agent_to_client_sse]
+async def agent_to_client_sse(live_events, coalescer, turns=None):
     """Agent to client communication via SSE"""
+    if turns is None:
+        turns = TurnTracker()
     async for event in live_events:
         # If the turn complete or interrupted, send it
         if event.turn_complete or event.interrupted:
-            message = {
-                "turn_complete": event.turn_complete,
-                "interrupted": event.interrupted,
-            }
-            yield f"data: {json.dumps(message)}\n\n"
-            print(f"[AGENT TO CLIENT]: {message}")
+            turns.end()
+            if event.interrupted:
+                # The user talked over the agent: its buffered audio is stale
+                coalescer.discard()
+            else:
+                # Send the rest of the buffered audio first
+                audio_frame = coalescer.flush()
+                if audio_frame:
+                    yield sse_encoder.audio(audio_frame)
+                    stream_log.count("agent_to_client.audio", len(audio_frame))
+            yield sse_encoder.control(event.turn_complete, event.interrupted)
+            stream_log.event(
+                "agent_to_client.control", "[AGENT TO CLIENT]: turn_complete: %s, interrupted: %s",
+                event.turn_complete, event.interrupted,
+            )
             continue
 
         # Read the Content and its first Part
@@ -103,18 +213,16 @@ async def agent_to_client_sse(live_events):
         )
         if not part:
             continue
+        turns.start()
 
-        # If it's audio, send Base64 encoded audio data
+        # If it's audio, coalesce it into frames and send them Base64 encoded
         is_audio = part.inline_data and part.inline_data.mime_type.startswith("audio/pcm")
         if is_audio:
             audio_data = part.inline_data and part.inline_data.data
             if audio_data:
-                message = {
-                    "mime_type": "audio/pcm",
-                    "data": base64.b64encode(audio_data).decode("ascii")
-                }
-                yield f"data: {json.dumps(message)}\n\n"
-                print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
+                for audio_frame in coalescer.add(audio_data):
+                    yield sse_encoder.audio(audio_frame)
+                    stream_log.count("agent_to_client.audio", len(audio_frame))
                 continue
 
         # If it's text and a parial text, send it
@@ -123,15 +231,31 @@ async def agent_to_client_sse(live_events):
                 "mime_type": "text/plain",
                 "data": part.text
             }
-            yield f"data: {json.dumps(message)}\n\n"
-            print(f"[AGENT TO CLIENT]: text/plain: {message}")
+            yield sse_encoder.message(message)
+            stream_log.event(
+                "agent_to_client.partial_text", "[AGENT TO CLIENT]: text/plain: %s", message
+            )
+# --8<-- [end:agent_to_client_sse]
 
 
 #
 # FastAPI web app
 #
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    """Runs the idle session reaper while the app is up, drains the live
+    sessions on SIGTERM, and writes the queued session events on shutdown"""
+    drainer.install()
+    active_sessions.start_reaper()
+    yield
+    await active_sessions.stop_reaper()
+    active_sessions.close_all()
+    if session_service is not None:
+        await session_service.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -144,8 +268,19 @@ app.add_middleware(
 STATIC_DIR = Path("static")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-# Store active sessions
-active_sessions = {}
+# Store active live sessions
+active_sessions = SessionRegistry(
+    max_sessions=MAX_SESSIONS,
+    idle_timeout=SESSION_IDLE_TIMEOUT_SECONDS,
+    reap_interval=SESSION_REAP_INTERVAL_SECONDS,
+    log=stream_log,
+)
+
+# Sessions released by closed live sessions
+release_tasks = set()
+
+# Audio coalescers of the connected clients
+audio_coalescers = {}
 
 
 @app.get("/")
@@ -154,33 +289,133 @@ async def root():
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
 
+@app.get("/stats/audio")
+async def audio_stats():
+    """Returns the achieved audio frame sizes and added latency per connection"""
+    return {user_id: coalescer.stats() for user_id, coalescer in audio_coalescers.items()}
+
+
+@app.get("/stats/sessions")
+async def session_stats():
+    """Returns the number of live sessions, the eviction counters and the
+    ADK sessions kept"""
+    return {**active_sessions.stats(), "runner_registry": runner_registry.stats()}
+
+
+@app.get("/stats/log")
+async def log_stats():
+    """Returns the streaming event counters and the dropped log records"""
+    return stream_log.stats()
+
+
+@app.get("/stats/session_db")
+async def session_db_stats():
+    """Returns the session events queued and written to SESSION_DB_PATH"""
+    return session_service.stats() if session_service is not None else {}
+
+
+@app.get("/stats/drain")
+async def drain_stats():
+    """Returns the drain state and the sessions drained or cut"""
+    return drainer.stats()
+
+
+# --8<-- [start:sse_endpoint]
 @app.get("/events/{user_id}")
-async def sse_endpoint(user_id: int, is_audio: str = "false"):
+async def sse_endpoint(
+    user_id: int, request: Request, is_audio: str = "false", last_event_id: str = None
+):
     """SSE endpoint for agent to client communication"""
 
-    # Start agent session
     user_id_str = str(user_id)
-    live_events, live_request_queue = await start_agent_session(user_id_str, is_audio == "true")
-
-    # Store the request queue for this user
-    active_sessions[user_id_str] = live_request_queue
 
-    print(f"Client #{user_id} connected via SSE, audio mode: {is_audio}")
+    # EventSource sends Last-Event-ID when it reconnects on its own; clients
+    # that reconnect by hand can pass it as a query parameter instead
+    last_event_id = request.headers.get("last-event-id", last_event_id)
+
+    # Reattach to the running session if the client only lost its
+    # connection: an event ID of an earlier session starts a new one
+    live_session = active_sessions.get(user_id_str)
+    after_id = live_session.buffer.parse_id(last_event_id) if live_session else None
+    if (
+        live_session
+        and after_id is not None
+        and live_session.is_audio == (is_audio == "true")
+    ):
+        stream_log.info("Client #%s reattached via SSE after event %s", user_id, after_id)
+        active_sessions.touch(user_id_str)
+    else:
+        # A draining worker takes no new sessions; the client retries and
+        # lands on the worker that replaces this one
+        if drainer.draining:
+            return Response(status_code=503, headers={"Retry-After": "1"})
+        if live_session:
+            live_session.close()
+        after_id = 0
+
+        # Start agent session
+        live_events, live_request_queue = await start_agent_session(user_id_str, is_audio == "true")
+
+        # Coalesce agent audio into fixed-duration frames
+        coalescer = AudioCoalescer(AUDIO_FRAME_MS, AGENT_AUDIO_SAMPLE_RATE)
+        turns = TurnTracker()
+
+        async def finish_for_drain():
+            # Hand the live session over and tell the client to reconnect now
+            save_resumption_handle(user_id_str, live_request_queue)
+            live_session.buffer.append(SERVER_RESTART_MESSAGE)
+            live_session.close()
+
+        def cleanup(closed_session):
+            drainer.unregister(user_id_str, turns)
+            active_sessions.remove(user_id_str, closed_session)
+            # Closed, reaped or evicted, the live session can't be reattached
+            # to: its ADK session goes with it
+            release_task = asyncio.create_task(
+                runner_registry.release_session(APP_NAME, user_id_str)
+            )
+            release_tasks.add(release_task)
+            release_task.add_done_callback(release_tasks.discard)
+            if audio_coalescers.get(user_id_str) is coalescer:
+                del audio_coalescers[user_id_str]
+            if coalescer.chunks_in:
+                stream_log.info("Client #%s audio frames: %s", user_id, coalescer.stats())
+            stream_log.info("Client #%s session closed", user_id)
+
+        # Store the live session for this user
+        live_session = LiveSession(
+            user_id_str,
+            agent_to_client_sse(live_events, coalescer, turns),
+            live_request_queue,
+            is_audio=is_audio == "true",
+            buffer_size=SSE_REPLAY_BUFFER_SIZE,
+            on_close=cleanup,
+            turns=turns,
+            log=stream_log,
+        )
+        active_sessions.add(user_id_str, live_session)
+        drainer.register(user_id_str, turns, finish_for_drain)
+        audio_coalescers[user_id_str] = coalescer
+        live_session.start()
 
-    def cleanup():
-        live_request_queue.close()
-        if user_id_str in active_sessions:
-            del active_sessions[user_id_str]
-        print(f"Client #{user_id} disconnected from SSE")
+        stream_log.info("Client #%s connected via SSE, audio mode: %s", user_id, is_audio)
 
     async def event_generator():
+        live_session.attach()
         try:
-            async for data in agent_to_client_sse(live_events):
-                yield data
+            # Events that are gone, before the replay or because the client
+            # lagged, are announced by a replay gap message without an ID
+            buffer = live_session.buffer
+            async for event_id, data in buffer.follow(after_id, REPLAY_GAP_MESSAGE):
+                if event_id is None:
+                    yield data
+                else:
+                    yield b"id: %s\n%s" % (buffer.format_id(event_id).encode(), data)
         except Exception as e:
-            print(f"Error in SSE stream: {e}")
+            stream_log.error("Error in SSE stream: %s", e)
         finally:
-            cleanup()
+            live_session.detach(SSE_RECONNECT_GRACE_SECONDS)
+            stream_log.info("Client #%s disconnected from SSE", user_id)
 
     return StreamingResponse(
         event_generator(),
@@ -189,9 +424,20 @@ async def sse_endpoint(user_id: int, is_audio: str = "false"):
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
+            "Access-Control-Allow-Headers": "Cache-Control, Last-Event-ID"
         }
     )
+# --8<-- [end:sse_endpoint]
+
+
+# --8<-- [start:send_message_endpoint]
+def send_to_agent(live_request_queue, mime_type, data):
+    """Pushes one client message into the LiveRequestQueue"""
+    if mime_type == "text/plain":
+        content = Content(role="user", parts=[Part.from_text(text=data)])
+        live_request_queue.send_content(content=content)
+    elif mime_type == "audio/pcm":
+        live_request_queue.send_realtime(Blob(data=data, mime_type=mime_type))
 
 
 @app.post("/send/{user_id}")
@@ -201,25 +447,96 @@ async def send_message_endpoint(user_id: int, request: Request):
     user_id_str = str(user_id)
 
     # Get the live request queue for this user
-    live_request_queue = active_sessions.get(user_id_str)
-    if not live_request_queue:
+    live_session = active_sessions.get(user_id_str)
+    if not live_session:
         return {"error": "Session not found"}
+    live_request_queue = live_session.live_request_queue
+    active_sessions.touch(user_id_str)
 
     # Parse the message
-    message = await request.json()
+    message = codec.loads(await request.body())
     mime_type = message["mime_type"]
     data = message["data"]
 
     # Send the message to the agent
     if mime_type == "text/plain":
-        content = Content(role="user", parts=[Part.from_text(text=data)])
-        live_request_queue.send_content(content=content)
-        print(f"[CLIENT TO AGENT]: {data}")
+        live_session.turns.start()
+        send_to_agent(live_request_queue, mime_type, data)
+        stream_log.event("client_to_agent.text", "[CLIENT TO AGENT]: %s", data)
     elif mime_type == "audio/pcm":
-        decoded_data = base64.b64decode(data)
-        live_request_queue.send_realtime(Blob(data=decoded_data, mime_type=mime_type))
-        print(f"[CLIENT TO AGENT]: audio/pcm: {len(decoded_data)} bytes")
+        # Decoded straight from the str, without base64.b64decode's ASCII copy
+        decoded_data = binascii.a2b_base64(data)
+        send_to_agent(live_request_queue, mime_type, decoded_data)
+        stream_log.count("client_to_agent.audio", len(decoded_data))
     else:
         return {"error": f"Mime type not supported: {mime_type}"}
 
-    return {"status": "sent"}
+    return Response(SENT_RESPONSE, media_type="application/json")
+# --8<-- [end:send_message_endpoint]
+
+
+def parse_message_batch(body):
+    """Parses a JSON array of `{mime_type, data}` messages into (mime_type,
+    data) pairs, with the audio decoded; raises ValueError if any message is
+    invalid"""
+    batch = codec.loads(body)
+    if not isinstance(batch, list):
+        raise ValueError("The batch must be a JSON array of messages")
+    messages = []
+    for index, message in enumerate(batch):
+        if not (
+            isinstance(message, dict)
+            and isinstance(message.get("mime_type"), str)
+            and isinstance(message.get("data"), str)
+        ):
+            raise ValueError(f"Message {index} needs a mime_type and data string")
+        mime_type = message["mime_type"]
+        data = message["data"]
+        if mime_type == "audio/pcm":
+            data = binascii.a2b_base64(data)
+        elif mime_type != "text/plain":
+            raise ValueError(f"Mime type not supported: {mime_type}")
+        messages.append((mime_type, data))
+    return messages
+
+
+@app.post("/send_batch/{user_id}")
+async def send_batch_endpoint(user_id: int, request: Request):
+    """HTTP endpoint for client to agent communication in batches.
+
+    Accepts a JSON array of `{mime_type, data}` messages, or a length-prefixed
+    PCM body (see pcm_batch.py), and sends every message to the agent in order.
+    An invalid batch is answered with 400 and nothing is sent.
+    """
+
+    user_id_str = str(user_id)
+
+    # Get the live request queue for this user
+    live_session = active_sessions.get(user_id_str)
+    if not live_session:
+        return {"error": "Session not found"}
+    live_request_queue = live_session.live_request_queue
+    active_sessions.touch(user_id_str)
+
+    # Parse the whole batch before sending anything, so a bad message does
+    # not leave the batch half sent
+    content_type = request.headers.get("content-type", "")
+    body = await request.body()
+    try:
+        if content_type.startswith((PCM_BATCH_MIME_TYPE, "application/octet-stream")):
+            messages = [("audio/pcm", chunk) for chunk in decode_pcm_batch(body)]
+        else:
+            messages = parse_message_batch(body)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    # Send the messages to the agent
+    for mime_type, data in messages:
+        send_to_agent(live_request_queue, mime_type, data)
+        if mime_type == "text/plain":
+            live_session.turns.start()
+            stream_log.event("client_to_agent.text", "[CLIENT TO AGENT]: %s", data)
+        else:
+            stream_log.count("client_to_agent.audio", len(data))
+
+    return {"status": "sent", "count": len(messages)}
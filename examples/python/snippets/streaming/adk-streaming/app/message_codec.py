@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, the standard library codec is used without it
+    orjson = None
+
+#
+# Transport message codec
+#
+# Every text, control and audio message of the streaming loops is JSON. The
+# codec is pluggable: orjson when it is installed, the standard library
+# otherwise, and both encode straight to UTF-8 bytes. The control messages
+# that end a turn are encoded once, and Base64 audio is joined between
+# pre-encoded fragments, so a message is built in a single bytes buffer
+# without intermediate strings.
+#
+
+CODEC_AUTO = "auto"
+CODEC_ORJSON = "orjson"
+CODEC_JSON = "json"
+
+AUDIO_MESSAGE_HEAD = b'{"mime_type":"audio/pcm","data":"'
+AUDIO_MESSAGE_TURN_HEAD = b'{"mime_type":"audio/pcm","turn":%d,"data":"'
+AUDIO_MESSAGE_TAIL = b'"}'
+
+
+class StdlibJsonCodec:
+    """The json module of the standard library, with compact separators"""
+
+    name = CODEC_JSON
+
+    def __init__(self):
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+        self._encode = encoder.encode
+        self.loads = json.loads
+
+    def dumps(self, obj):
+        return self._encode(obj).encode()
+
+
+class OrjsonCodec:
+    """orjson, which encodes to bytes without an intermediate string"""
+
+    name = CODEC_ORJSON
+
+    def __init__(self):
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+def get_codec(name=CODEC_AUTO):
+    """Returns the codec `name`; `auto` picks orjson when it is installed"""
+    if name == CODEC_AUTO:
+        name = CODEC_ORJSON if orjson else CODEC_JSON
+    if name == CODEC_ORJSON:
+        if orjson is None:
+            raise ValueError("The orjson codec needs the orjson package: pip install orjson")
+        return OrjsonCodec()
+    if name == CODEC_JSON:
+        return StdlibJsonCodec()
+    raise ValueError(f"Unknown JSON codec: {name}")
+
+
+class MessageEncoder:
+    """Encodes transport messages, each framed by `prefix` and `suffix`.
+
+    Messages are UTF-8 bytes, or str with `text=True` for transports that
+    only take text frames.
+    """
+
+    def __init__(self, codec, prefix=b"", suffix=b"", text=False):
+        self.codec = codec
+        self.prefix = prefix
+        self.suffix = suffix
+        self.text = text
+        self._framed = bool(prefix or suffix)
+        self._audio_head = prefix + AUDIO_MESSAGE_HEAD
+        self._audio_tail = AUDIO_MESSAGE_TAIL + suffix
+        # Every turn_complete and interrupted combination, encoded once, and
+        # split around the turn number for the messages that carry one
+        self._controls = {}
+        self._turn_controls = {}
+        for turn_complete in (None, False, True):
+            for interrupted in (None, False, True):
+                key = (turn_complete, interrupted)
+                self._controls[key] = self.message({
+                    "turn_complete": turn_complete,
+                    "interrupted": interrupted,
+                })
+                head, tail = self.message({
+                    "turn_complete": turn_complete,
+                    "interrupted": interrupted,
+                    "turn": 0,
+                }).rsplit("0" if text else b"0", 1)
+                self._turn_controls[key] = (head, tail)
+
+    def message(self, message):
+        """Encodes a JSON message"""
+        data = self.codec.dumps(message)
+        if self._framed:
+            data = b"".join((self.prefix, data, self.suffix))
+        return data.decode() if self.text else data
+
+    def control(self, turn_complete, interrupted, turn=None):
+        """Returns the pre-encoded turn_complete/interrupted message, with the
+        number of the turn it ends if given"""
+        if turn is None:
+            return self._controls[(turn_complete, interrupted)]
+        head, tail = self._turn_controls[(turn_complete, interrupted)]
+        if self.text:
+            return f"{head}{turn:d}{tail}"
+        return b"%s%d%s" % (head, turn, tail)
+
+    def audio(self, audio_data, turn=None):
+        """Encodes PCM audio as a Base64 audio/pcm message, tagged with the
+        number of its turn if given"""
+        head = self._audio_head
+        if turn is not None:
+            head = self.prefix + AUDIO_MESSAGE_TURN_HEAD % turn
+        data = b"".join((head, base64.b64encode(audio_data), self._audio_tail))
+        return data.decode("ascii") if self.text else data
@@ -0,0 +1,53 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+
+#
+# Length-prefixed PCM batches
+#
+# A batch body is a sequence of PCM chunks, each prefixed with its length in
+# bytes as a 4-byte unsigned integer in network byte order:
+#
+#   | length (uint32) | PCM bytes | length (uint32) | PCM bytes | ...
+#
+# Chunks keep their boundaries, so the agent receives the same realtime
+# blobs in the same order as if each had been POSTed on its own.
+#
+
+PCM_BATCH_MIME_TYPE = "application/x-pcm-batch"
+
+CHUNK_HEADER = struct.Struct("!I")
+
+
+def encode_pcm_batch(chunks):
+    """Encodes PCM chunks as a length-prefixed batch body"""
+    return b"".join(CHUNK_HEADER.pack(len(chunk)) + chunk for chunk in chunks)
+
+
+def decode_pcm_batch(body):
+    """Decodes a length-prefixed batch body into a list of PCM chunks"""
+    view = memoryview(body)
+    chunks = []
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < CHUNK_HEADER.size:
+            raise ValueError("Truncated PCM batch chunk header")
+        (length,) = CHUNK_HEADER.unpack_from(view, offset)
+        offset += CHUNK_HEADER.size
+        if len(view) - offset < length:
+            raise ValueError("Truncated PCM batch chunk")
+        chunks.append(bytes(view[offset:offset + length]))
+        offset += length
+    return chunks
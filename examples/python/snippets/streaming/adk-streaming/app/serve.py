@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Runs the app in several uvicorn worker processes behind the dispatcher,
+# which sends every request of a user to the worker that owns the user's
+# live session (see dispatcher.py). A worker that exits is restarted on the
+# same port, so the user to worker mapping never changes.
+#
+# SIGHUP restarts the workers one at a time without downtime, e.g. to deploy
+# new code: the replacement starts on a spare port and takes over the
+# worker's users once it accepts connections, then the old worker gets
+# SIGTERM and drains its live sessions (see drain.py).
+#
+# Run from the app folder:
+#   python serve.py --workers 4 --port 8000
+#   kill -HUP <pid of serve.py>
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from dispatcher import Dispatcher
+from stream_logging import StreamLog, setup_async_logging
+
+WORKER_HOST = "127.0.0.1"
+
+# How often the worker processes are checked
+SUPERVISE_INTERVAL_SECONDS = 1.0
+
+# How long the workers get to shut down before they are killed
+SHUTDOWN_GRACE_SECONDS = 10.0
+
+stream_log = StreamLog(setup_async_logging("adk_streaming_serve"))
+
+
+def start_worker(app, port):
+    """Starts one uvicorn worker process"""
+    return subprocess.Popen([
+        sys.executable, "-m", "uvicorn", app,
+        "--host", WORKER_HOST, "--port", str(port),
+    ])
+
+
+async def wait_for_workers(ports):
+    """Waits until every worker accepts connections"""
+    for port in ports:
+        while True:
+            try:
+                _, writer = await asyncio.open_connection(WORKER_HOST, port)
+            except OSError:
+                await asyncio.sleep(0.2)
+                continue
+            writer.close()
+            break
+
+
+async def supervise(app, workers, dispatcher):
+    """Restarts the workers that exited"""
+    while True:
+        await asyncio.sleep(SUPERVISE_INTERVAL_SECONDS)
+        for node, process in workers.items():
+            if process.poll() is not None:
+                _, port = dispatcher.workers[node]
+                stream_log.info(
+                    "Worker on port %s exited with %s, restarting", port, process.returncode
+                )
+                workers[node] = start_worker(app, port)
+
+
+async def restart_workers(app, workers, dispatcher, spare_ports):
+    """Replaces the workers one at a time, each by a process on its spare
+    port, while the old process drains"""
+    for node, old_process in list(workers.items()):
+        _, old_port = dispatcher.workers[node]
+        port = spare_ports[old_port]
+        process = start_worker(app, port)
+        try:
+            await wait_for_workers([port])
+        except asyncio.CancelledError:
+            process.terminate()
+            raise
+        workers[node] = process
+        dispatcher.replace_worker(node, (WORKER_HOST, port))
+        await stop_workers([old_process])
+        stream_log.info("Worker on port %s replaced by port %s", old_port, port)
+
+
+async def stop_workers(processes):
+    """Terminates the workers, killing those that outlive the grace period"""
+    for process in processes:
+        process.terminate()
+    deadline = time.monotonic() + SHUTDOWN_GRACE_SECONDS
+    for process in processes:
+        while process.poll() is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+async def serve(args):
+    worker_ports = [args.worker_base_port + i for i in range(args.workers)]
+    dispatcher = Dispatcher(
+        [(WORKER_HOST, port) for port in worker_ports],
+        max_body_size=args.max_body_size,
+        log=stream_log,
+    )
+    workers = {
+        node: start_worker(args.app, port) for node, (_, port) in dispatcher.workers.items()
+    }
+
+    # Restarts alternate between the worker ports and the block after them
+    spare_ports = {}
+    for port in worker_ports:
+        spare_ports[port] = port + args.workers
+        spare_ports[port + args.workers] = port
+
+    # Stop on SIGTERM as on Ctrl+C, restart the workers on SIGHUP
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+    restart_task = None
+
+    def restart():
+        nonlocal restart_task
+        if restart_task is None or restart_task.done():
+            restart_task = asyncio.create_task(
+                restart_workers(args.app, workers, dispatcher, spare_ports)
+            )
+
+    loop.add_signal_handler(signal.SIGHUP, restart)
+
+    try:
+        await wait_for_workers(worker_ports)
+        stream_log.info(
+            "Dispatching http://%s:%s to %s workers on ports %s-%s",
+            args.host, args.port, args.workers, worker_ports[0], worker_ports[-1],
+        )
+        await asyncio.gather(
+            dispatcher.serve(args.host, args.port),
+            supervise(args.app, workers, dispatcher),
+        )
+    finally:
+        if restart_task:
+            restart_task.cancel()
+        await stop_workers(list(workers.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the app in several workers with per-user affinity")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--worker-base-port", type=int, default=9000,
+                        help="Port of the first worker; the others follow, and "
+                             "restarts use the block of ports after them")
+    parser.add_argument("--app", default="main:app",
+                        help="ASGI app of the workers")
+    parser.add_argument("--max-body-size", type=int, default=1 << 20,
+                        help="Largest request body the dispatcher relays, in bytes")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
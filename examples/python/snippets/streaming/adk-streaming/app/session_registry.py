@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from stream_logging import StreamLog
+
+
+class SessionRegistry:
+    """Bounded registry of live sessions with idle reaping and LRU eviction.
+
+    Sessions are kept in least recently active order. A background reaper
+    closes sessions without client activity for `idle_timeout` seconds, and
+    adding a session beyond `max_sessions` evicts the least recently active
+    one, so memory stays bounded by configuration rather than by clients
+    disconnecting cleanly. A session with `subscribers`, e.g. a client that
+    only listens to a long answer, is active. `on_discard(user_id, session)`
+    is called for every reaped or evicted session.
+    """
+
+    def __init__(self, max_sessions=1000, idle_timeout=300.0, reap_interval=10.0,
+                 on_discard=None, log=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.on_discard = on_discard
+        self.log = log or StreamLog(logging.getLogger(__name__))
+        self._sessions = OrderedDict()
+        self._last_activity = {}
+        self._reaper_task = None
+
+        # Counters
+        self.evicted_lru = 0
+        self.reaped_idle = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        """Returns the user's session, or None"""
+        return self._sessions.get(user_id)
+
+    def add(self, user_id, session):
+        """Registers a session, closing the user's previous one and evicting
+        the least recently active sessions beyond the cap"""
+        previous = self._sessions.pop(user_id, None)
+        if previous is not None and previous is not session:
+            previous.close()
+        while len(self._sessions) >= self.max_sessions:
+            evicted_user_id, evicted = self._sessions.popitem(last=False)
+            self._last_activity.pop(evicted_user_id, None)
+            self.evicted_lru += 1
+            self.log.info("Evicting least recently active session of client #%s", evicted_user_id)
+            self._discard(evicted_user_id, evicted)
+        self._sessions[user_id] = session
+        self._last_activity[user_id] = time.monotonic()
+
+    def remove(self, user_id, session):
+        """Unregisters the user's session if it is still the registered one"""
+        if self._sessions.get(user_id) is session:
+            del self._sessions[user_id]
+            self._last_activity.pop(user_id, None)
+
+    def touch(self, user_id):
+        """Records client activity for the user's session"""
+        if user_id in self._sessions:
+            self._sessions.move_to_end(user_id)
+            self._last_activity[user_id] = time.monotonic()
+
+    def reap_idle(self, now=None):
+        """Closes the sessions without activity for `idle_timeout` seconds;
+        a session that clients listen to counts as active"""
+        now = time.monotonic() if now is None else now
+        reaped = 0
+        # Sessions are in activity order, so stop at the first active one
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - self._last_activity[user_id] < self.idle_timeout:
+                break
+            if getattr(session, "subscribers", 0) > 0:
+                self._sessions.move_to_end(user_id)
+                self._last_activity[user_id] = now
+                continue
+            del self._sessions[user_id]
+            del self._last_activity[user_id]
+            self.log.info("Reaping idle session of client #%s", user_id)
+            self._discard(user_id, session)
+            reaped += 1
+        self.reaped_idle += reaped
+        return reaped
+
+    def start_reaper(self):
+        """Starts the background reaper task"""
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._reap_periodically())
+
+    async def stop_reaper(self):
+        """Stops the background reaper task"""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+    def close_all(self):
+        """Closes every session"""
+        while self._sessions:
+            user_id, session = self._sessions.popitem(last=False)
+            self._last_activity.pop(user_id, None)
+            session.close()
+
+    def stats(self):
+        """Returns the session count and the eviction counters"""
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "evicted_lru": self.evicted_lru,
+            "reaped_idle": self.reaped_idle,
+        }
+
+    def _discard(self, user_id, session):
+        session.close()
+        if self.on_discard:
+            self.on_discard(user_id, session)
+
+    async def _reap_periodically(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                self.log.error("Error while reaping idle sessions: %s", e)
@@ -0,0 +1,397 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+
+from stream_logging import StreamLog
+
+#
+# Persistent sessions
+#
+# SqliteSessionService keeps the sessions in memory like
+# InMemorySessionService, and writes them behind to a SQLite file in WAL
+# mode. The runner awaits append_event for every event of a live stream, so
+# the service never touches the file on the event loop: events are queued in
+# memory and written by one writer thread, a turn's events in one
+# transaction when the turn completes or is interrupted. Writes and reads
+# run in order on that thread; while a write is in flight, the next turns
+# queue up and go in the following transaction.
+#
+# Sessions that are not in memory, after a restart or written by another
+# worker, are loaded from the file when they are first read.
+#
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+INSERT_SESSION = (
+    "INSERT OR REPLACE INTO sessions (app_name, user_id, id, state, last_update_time) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+UPDATE_SESSION = (
+    "UPDATE sessions SET state = ?, last_update_time = ? "
+    "WHERE app_name = ? AND user_id = ? AND id = ?"
+)
+DELETE_SESSION = "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?"
+INSERT_EVENT = (
+    "INSERT INTO events (app_name, user_id, session_id, id, timestamp, event) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+DELETE_EVENTS = "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+UPSERT_APP_STATE = "INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)"
+UPSERT_USER_STATE = "INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)"
+
+
+def is_audio_only(event):
+    """True for an event that only carries audio, like the live model's
+    audio chunks"""
+    if event.actions and event.actions.state_delta:
+        return False
+    parts = event.content.parts if event.content else None
+    return bool(parts) and all(
+        part.inline_data is not None
+        and (part.inline_data.mime_type or "").startswith("audio/")
+        for part in parts
+    )
+
+
+class SqliteSessionService(InMemorySessionService):
+    """Session service that persists sessions to a SQLite file.
+
+    Events are written in one transaction per turn, or once `max_buffered_events`
+    are queued, and at most `max_delay` seconds after they were appended for
+    runs without turns. With `keep_audio` off, events that only carry audio
+    stay in memory and are not written: the transcriptions and the text of
+    the turn are, and the audio would be most of the bytes.
+    """
+
+    def __init__(self, path, max_buffered_events=256, max_delay=1.0, keep_audio=False,
+                 log=None):
+        super().__init__()
+        self.path = path
+        self.log = log or StreamLog(logging.getLogger(__name__))
+        self.max_buffered_events = max_buffered_events
+        self.max_delay = max_delay
+        self.keep_audio = keep_audio
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="session-db")
+        self._db = None
+        self._pending = []
+        self._buffered_events = 0
+        self._dirty_sessions = set()
+        self._dirty_app_states = set()
+        self._dirty_user_states = set()
+        self._loaded_states = set()
+        self._writing = None
+        self._flush_due = False
+        self._timer = None
+
+        # Counters; the write counters are updated by the writer thread
+        self.events_buffered = 0
+        self.events_skipped = 0
+        self.sessions_loaded = 0
+        self.transactions = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.write_errors = 0
+
+        self._executor.submit(self._open)
+
+    #
+    # Session service
+    #
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        await self._load_states(app_name, user_id)
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        stored = self.sessions[app_name][user_id][session.id]
+        self._pending.append((INSERT_SESSION, (
+            app_name, user_id, stored.id, json.dumps(stored.state), stored.last_update_time,
+        )))
+        self._flush()
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        if self._stored_session(app_name, user_id, session_id) is None:
+            await self._load_session(app_name, user_id, session_id)
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def list_sessions(self, *, app_name, user_id):
+        await self._load_states(app_name, user_id)
+        rows = await self._read(self._read_sessions, app_name, user_id)
+        response = await super().list_sessions(app_name=app_name, user_id=user_id)
+        in_memory = {session.id for session in response.sessions}
+        for session_id, state, last_update_time in rows:
+            if session_id not in in_memory:
+                session = Session(
+                    app_name=app_name, user_id=user_id, id=session_id,
+                    state=json.loads(state), last_update_time=last_update_time,
+                )
+                response.sessions.append(self._merge_state(app_name, user_id, session))
+        return response
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        key = (app_name, user_id, session_id)
+        self._dirty_sessions.discard(key)
+        self._pending.append((DELETE_EVENTS, key))
+        self._pending.append((DELETE_SESSION, key))
+        self._flush()
+
+    async def unload_session(self, *, app_name, user_id, session_id):
+        """Drops a session from memory, keeping it in the file; it is loaded
+        again when it is next read"""
+        # The session's queued writes take its state with them
+        self._flush(force=True)
+        self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+
+    async def append_event(self, session, event):
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        if event.partial or self._stored_session(*key) is None:
+            return event
+
+        if self.keep_audio or not is_audio_only(event):
+            self._pending.append((INSERT_EVENT, (
+                *key, event.id, event.timestamp, event.model_dump_json(exclude_none=True),
+            )))
+            self._buffered_events += 1
+            self.events_buffered += 1
+        else:
+            self.events_skipped += 1
+        self._dirty_sessions.add(key)
+        if event.actions and event.actions.state_delta:
+            for name in event.actions.state_delta:
+                if name.startswith("app:"):
+                    self._dirty_app_states.add(session.app_name)
+                elif name.startswith("user:"):
+                    self._dirty_user_states.add((session.app_name, session.user_id))
+
+        if (event.turn_complete or event.interrupted
+                or self._buffered_events >= self.max_buffered_events):
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return event
+
+    async def close(self):
+        """Writes what is queued and closes the file"""
+        self._flush(force=True)
+        await self._read(self._close)
+        self._executor.shutdown()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "queued_statements": len(self._pending),
+            "events_buffered": self.events_buffered,
+            "events_skipped": self.events_skipped,
+            "sessions_loaded": self.sessions_loaded,
+            "transactions": self.transactions,
+            "rows_written": self.rows_written,
+            "bytes_written": self.bytes_written,
+            "write_seconds": round(self.write_seconds, 3),
+            "write_errors": self.write_errors,
+        }
+
+    #
+    # Write behind, on the event loop
+    #
+
+    def _stored_session(self, app_name, user_id, session_id):
+        return self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+    def _flush(self, force=False):
+        """Hands the queued writes to the writer thread as one transaction.
+
+        Unless forced, writes wait for the transaction in flight and go with
+        the next one.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._writing is not None and not force:
+            self._flush_due = True
+            return
+        statements = self._take_pending()
+        if not statements:
+            return
+        self._flush_due = False
+        writing = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._write, statements
+        )
+        self._writing = writing
+        writing.add_done_callback(self._on_written)
+
+    def _take_pending(self):
+        statements, self._pending = self._pending, []
+        self._buffered_events = 0
+        for app_name, user_id, session_id in self._dirty_sessions:
+            stored = self._stored_session(app_name, user_id, session_id)
+            if stored is not None:
+                statements.append((UPDATE_SESSION, (
+                    json.dumps(stored.state), stored.last_update_time,
+                    app_name, user_id, session_id,
+                )))
+        for app_name in self._dirty_app_states:
+            statements.append((UPSERT_APP_STATE, (
+                app_name, json.dumps(self.app_state.get(app_name, {})),
+            )))
+        for app_name, user_id in self._dirty_user_states:
+            statements.append((UPSERT_USER_STATE, (
+                app_name, user_id, json.dumps(self.user_state.get(app_name, {}).get(user_id, {})),
+            )))
+        self._dirty_sessions.clear()
+        self._dirty_app_states.clear()
+        self._dirty_user_states.clear()
+        return statements
+
+    def _on_written(self, writing):
+        if writing is self._writing:
+            self._writing = None
+        if not writing.cancelled() and writing.exception() is not None:
+            self.write_errors += 1
+            self.log.error("Failed to write sessions to %s: %r", self.path, writing.exception())
+        if self._flush_due and self._writing is None:
+            self._flush()
+
+    async def _read(self, read, *args):
+        """Runs a read on the writer thread, after the queued writes"""
+        self._flush(force=True)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, read, *args)
+
+    async def _load_states(self, app_name, user_id):
+        if (app_name, user_id) in self._loaded_states:
+            return
+        app_state, user_state = await self._read(self._read_states, app_name, user_id)
+        if (app_name, user_id) in self._loaded_states:
+            return
+        self._loaded_states.add((app_name, user_id))
+        # State changed in this process since is newer than the file's
+        self.app_state.setdefault(app_name, {})
+        for name, value in app_state.items():
+            self.app_state[app_name].setdefault(name, value)
+        self.user_state.setdefault(app_name, {}).setdefault(user_id, {})
+        for name, value in user_state.items():
+            self.user_state[app_name][user_id].setdefault(name, value)
+
+    async def _load_session(self, app_name, user_id, session_id):
+        await self._load_states(app_name, user_id)
+        session = await self._read(self._read_session, app_name, user_id, session_id)
+        if session is not None and self._stored_session(app_name, user_id, session_id) is None:
+            self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+            self.sessions_loaded += 1
+
+    #
+    # The writer thread
+    #
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode, NORMAL syncs at checkpoints, not at every commit
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Other workers may be writing the same file
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+
+    def _close(self):
+        self._db.close()
+
+    def _write(self, statements):
+        start = time.perf_counter()
+        with self._db:
+            for sql, params in statements:
+                self._db.execute(sql, params)
+        self.write_seconds += time.perf_counter() - start
+        self.transactions += 1
+        self.rows_written += len(statements)
+        self.bytes_written += sum(
+            len(param) for _, params in statements for param in params if isinstance(param, str)
+        )
+
+    def _read_states(self, app_name, user_id):
+        row = self._db.execute(
+            "SELECT state FROM app_states WHERE app_name = ?", (app_name,)
+        ).fetchone()
+        app_state = json.loads(row[0]) if row else {}
+        row = self._db.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ).fetchone()
+        return app_state, json.loads(row[0]) if row else {}
+
+    def _read_sessions(self, app_name, user_id):
+        return self._db.execute(
+            "SELECT id, state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ).fetchall()
+
+    def _read_session(self, app_name, user_id, session_id):
+        row = self._db.execute(
+            "SELECT state, last_update_time FROM sessions "
+            "WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        events = self._db.execute(
+            "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+            "ORDER BY rowid",
+            (app_name, user_id, session_id),
+        ).fetchall()
+        return Session(
+            app_name=app_name, user_id=user_id, id=session_id,
+            state=json.loads(row[0]), last_update_time=row[1],
+            events=[Event.model_validate_json(event) for (event,) in events],
+        )
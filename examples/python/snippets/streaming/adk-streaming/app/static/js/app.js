@@ -12,9 +12,17 @@ const sse_url =
   "http://" + window.location.host + "/events/" + sessionId;
 const send_url =
   "http://" + window.location.host + "/send/" + sessionId;
+const send_batch_url =
+  "http://" + window.location.host + "/send_batch/" + sessionId;
 let eventSource = null;
 let is_audio = false;
 
+// ID of the last SSE event received, used to resume the session on reconnect
+let lastEventId = null;
+
+// Set when the server is restarting, to reconnect right away
+let serverRestarting = false;
+
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
 const messageInput = document.getElementById("message");
@@ -24,13 +32,19 @@ let currentMessageId = null;
 // SSE handlers
 function connectSSE() {
   // Connect to SSE endpoint
-  eventSource = new EventSource(sse_url + "?is_audio=" + is_audio);
+  let url = sse_url + "?is_audio=" + is_audio;
+  if (lastEventId !== null) {
+    url += "&last_event_id=" + lastEventId;
+  }
+  eventSource = new EventSource(url);
 
   // Handle connection open
   eventSource.onopen = function () {
     // Connection opened messages
     console.log("SSE connection opened.");
     document.getElementById("messages").textContent = "Connection opened";
+    currentMessageId = null;
+    serverRestarting = false;
 
     // Enable the Send button
     document.getElementById("sendButton").disabled = false;
@@ -39,10 +53,23 @@ function connectSSE() {
 
   // Handle incoming messages
   eventSource.onmessage = function (event) {
+    // Remember the event ID for resuming after a reconnect
+    if (event.lastEventId) {
+      lastEventId = event.lastEventId;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
 
+    // The server is restarting: its live session was handed over, so
+    // reconnect for a new one without waiting
+    if (message_from_server.server_restart) {
+      serverRestarting = true;
+      lastEventId = null;
+      return;
+    }
+
     // Check if the turn is complete
     // if turn complete, add new message
     if (
@@ -99,7 +126,7 @@ function connectSSE() {
     setTimeout(function () {
       console.log("Reconnecting...");
       connectSSE();
-    }, 5000);
+    }, serverRestarting ? 500 : 5000);
   };
 }
 connectSSE();
@@ -143,6 +170,39 @@ async function sendMessage(message) {
   }
 }
 
+// Send PCM chunks to the server in one length-prefixed binary batch
+async function sendAudioBatch(chunks) {
+  // Each chunk is prefixed with its length as a big-endian uint32
+  let totalLength = 0;
+  for (const chunk of chunks) {
+    totalLength += 4 + chunk.length;
+  }
+  const body = new Uint8Array(totalLength);
+  const view = new DataView(body.buffer);
+  let offset = 0;
+  for (const chunk of chunks) {
+    view.setUint32(offset, chunk.length);
+    body.set(chunk, offset + 4);
+    offset += 4 + chunk.length;
+  }
+
+  try {
+    const response = await fetch(send_batch_url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/x-pcm-batch',
+      },
+      body: body
+    });
+
+    if (!response.ok) {
+      console.error('Failed to send audio batch:', response.statusText);
+    }
+  } catch (error) {
+    console.error('Error sending audio batch:', error);
+  }
+}
+
 // Decode Base64 data to Array
 function base64ToArray(base64) {
   const binaryString = window.atob(base64);
@@ -196,6 +256,7 @@ startAudioButton.addEventListener("click", () => {
   startAudioButton.disabled = true;
   startAudio();
   is_audio = true;
+  lastEventId = null; // the audio mode starts a new session
   eventSource.close(); // close current connection
   connectSSE(); // reconnect with the audio mode
 });
@@ -222,21 +283,10 @@ function sendBufferedAudio() {
   for (const chunk of audioBuffer) {
     totalLength += chunk.length;
   }
-  
-  // Combine all chunks into a single buffer
-  const combinedBuffer = new Uint8Array(totalLength);
-  let offset = 0;
-  for (const chunk of audioBuffer) {
-    combinedBuffer.set(chunk, offset);
-    offset += chunk.length;
-  }
-  
-  // Send the combined audio data
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(combinedBuffer.buffer),
-  });
-  console.log("[CLIENT TO AGENT] sent %s bytes", combinedBuffer.byteLength);
+
+  // Send the buffered chunks in one binary batch
+  sendAudioBatch(audioBuffer);
+  console.log("[CLIENT TO AGENT] sent %s bytes in %s chunks", totalLength, audioBuffer.length);
   
   // Clear the buffer
   audioBuffer = [];
@@ -254,14 +304,3 @@ function stopAudioRecording() {
     sendBufferedAudio();
   }
 }
-
-// Encode an array buffer with Base64
-function arrayBufferToBase64(buffer) {
-  let binary = "";
-  const bytes = new Uint8Array(buffer);
-  const len = bytes.byteLength;
-  for (let i = 0; i < len; i++) {
-    binary += String.fromCharCode(bytes[i]);
-  }
-  return window.btoa(binary);
-}
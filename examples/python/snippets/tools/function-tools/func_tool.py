@@ -56,11 +56,14 @@ stock_price_agent = Agent(
 )
 
 
-# Session and Runner
+# Session and Runner, set up once and reused by every query
+session_service = InMemorySessionService()
+runner = Runner(agent=stock_price_agent, app_name=APP_NAME, session_service=session_service)
+
 async def setup_session_and_runner():
-    session_service = InMemorySessionService()
-    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
-    runner = Runner(agent=stock_price_agent, app_name=APP_NAME, session_service=session_service)
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    if session is None:
+        session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
     return session, runner
 
 # Agent Interaction